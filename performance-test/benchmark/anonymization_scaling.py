@@ -0,0 +1,77 @@
+"""
+Compares how the anonymization of an already analyzed text scales with the number of entities it holds,
+between Presidio's AnonymizerEngine and the single-pass path used by the service (src.anonymization_engine).
+
+The texts are reports listing fiscal codes, IBANs and emails, like the exports that hold hundreds of them.
+The time per entity of the single-pass path should stay flat as the number of entities grows.
+Run from the root of the repository:
+
+    PYTHONPATH=. python performance-test/benchmark/anonymization_scaling.py
+    PYTHONPATH=. python performance-test/benchmark/anonymization_scaling.py --entities 100,1000,5000 --repeat 3
+"""
+import argparse
+import copy
+import json
+import sys
+import time
+
+from sample_corpus import FISCAL_CODES
+
+IBANS = ["IT60X0542811101000000123456", "IT47J0990650025128761820997"]
+LINE_TEMPLATE = "Posizione {index}: codice fiscale {fiscal_code}, iban {iban}, contatto utente{index}@example.com.\n"
+
+
+def build_report(lines: int) -> str:
+    return "".join(
+        LINE_TEMPLATE.format(index=index, fiscal_code=FISCAL_CODES[index % len(FISCAL_CODES)],
+                             iban=IBANS[index % len(IBANS)])
+        for index in range(lines)
+    )
+
+
+def best_time(function, analyzer_results: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # AnonymizerEngine modifies the results it receives
+        results = copy.deepcopy(analyzer_results)
+        start_time = time.perf_counter()
+        function(results)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", default="30,100,300,1000,3000",
+                        help="comma separated approximate numbers of entities per text")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measure, the fastest one is reported")
+    args = parser.parse_args()
+
+    from src.anonymizer_logic import ANONYMIZER, AnonymizationMode, analyze_text, current_profile
+    profile = current_profile()
+
+    report = []
+    for entities in [int(value) for value in args.entities.split(",")]:
+        text = build_report(max(1, entities // 3))
+        analyzer_results = analyze_text(text, AnonymizationMode.REGEX)
+        presidio_time = best_time(
+            lambda results: ANONYMIZER.anonymize(text=text, analyzer_results=results, operators=profile.operators),
+            analyzer_results, args.repeat)
+        single_pass_time = best_time(lambda results: profile.anonymizer.anonymize(text, results),
+                                     analyzer_results, args.repeat)
+        report.append({
+            "entities": len(analyzer_results),
+            "textLength": len(text),
+            "presidioTime": round(presidio_time, 6),
+            "singlePassTime": round(single_pass_time, 6),
+            "presidioMicrosPerEntity": round(presidio_time / len(analyzer_results) * 1e6, 2),
+            "singlePassMicrosPerEntity": round(single_pass_time / len(analyzer_results) * 1e6, 2),
+            "speedup": round(presidio_time / single_pass_time, 1),
+        })
+        print(json.dumps(report[-1]), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Micro-benchmarks of the anonymization core, run offline on the synthetic corpus of sample_corpus.py:
+
+- anonymize/<mode>/<size>/<density>: anonymize_text_with_presidio, per text
+- recognizer/<name>/<size>: analyze of every pattern recognizer of the analyzer, per text
+- operator/<entity type>: the operator of the entity type in the anonymization policy, per value
+
+Sizes are texts of 1, 10 and 100 sentences; densities are texts with no PII, a mix of sentences with and
+without PII, and only sentences holding PII. Every benchmark is timed over several rounds, each lasting at least
+--min-time seconds, and the median and fastest time per call are reported in microseconds.
+The result cache, request coalescing and profiling are disabled, so only the core is measured.
+
+The results can be saved as a JSON baseline and later compared with a new run: benchmarks slower than the baseline
+by more than --threshold are reported as regressions and make the script exit with status 1.
+Baselines only compare runs on the same machine. Run from the root of the repository:
+
+    PYTHONPATH=. python performance-test/benchmark/core_benchmarks.py --save baseline.json
+    PYTHONPATH=. python performance-test/benchmark/core_benchmarks.py --compare baseline.json --filter recognizer/
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from sample_corpus import DENSITIES, generate_corpus
+
+# Sentences per text
+SIZES = {"short": 1, "medium": 10, "long": 100}
+TEXTS_PER_BENCHMARK = 10
+
+OPERATOR_SAMPLES = {
+    "PERSON": "Mario Rossi",
+    "ITALIAN_ADDRESS": "Via Giuseppe Verdi, 12",
+    "IT_VEHICLE_PLATE": "AB123CD",
+    "MEDICAL_INFO": "diabete",
+    "EMAIL_ADDRESS": "mario.rossi@example.com",
+    "PHONE_NUMBER": "+39 333 123 4567",
+    "IT_FISCAL_CODE": "RSSMRA80A01H501U",
+    "IT_DRIVER_LICENSE": "U1H11A111A",
+    "IT_IDENTITY_CARD": "CA00000AA",
+    "IT_PASSPORT": "YA1234567",
+    "IT_VAT_CODE": "07643520567",
+    "CREDIT_CARD": "4111 1111 1111 1111",
+    "IBAN_CODE": "IT60X0542811101000000123456",
+    "CRYPTO": "16Yeky6GMjeNkAiNcBY7ZhrLoMSgg1BoyZ",
+}
+
+
+def time_benchmark(function, rounds: int, min_time: float) -> dict:
+    # Calls per round, so that a round lasts at least min_time
+    function()
+    calls = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= min_time:
+            break
+        calls = max(calls * 2, int(calls * min_time / elapsed) + 1) if elapsed else calls * 10
+
+    timings = [elapsed / calls]
+    for _ in range(rounds - 1):
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append((time.perf_counter() - start_time) / calls)
+    return {
+        "median": round(statistics.median(timings) * 1e6, 3),
+        "min": round(min(timings) * 1e6, 3),
+        "rounds": rounds,
+        "callsPerRound": calls,
+    }
+
+
+def collect_benchmarks() -> dict:
+    """
+    Returns the function of every benchmark by name. Each function processes a single text or value.
+    """
+    os.environ["ANONYMIZER_CACHE_ENABLED"] = "false"
+    os.environ["ANONYMIZER_COALESCING_ENABLED"] = "false"
+    os.environ["ANONYMIZER_PROFILING_ENABLED"] = "false"
+    from presidio_analyzer.predefined_recognizers import SpacyRecognizer
+    from presidio_anonymizer.operators import OperatorType
+    from src.anonymizer_logic import ANONYMIZER, AnonymizationMode, anonymize_text_with_presidio, current_policy
+    policy = current_policy()
+    profile = policy.profile()
+
+    def cycle(texts, function):
+        # Every call processes the next text of the corpus
+        position = {"index": 0}
+
+        def run():
+            function(texts[position["index"] % len(texts)])
+            position["index"] += 1
+
+        return run
+
+    benchmarks = {}
+    for mode in AnonymizationMode:
+        for size_name, sentences in SIZES.items():
+            for density in DENSITIES:
+                texts = [sample.text for sample in generate_corpus(
+                    size=TEXTS_PER_BENCHMARK, sentences_per_text=sentences, density=density)]
+                benchmarks[f"anonymize/{mode.value}/{size_name}/{density}"] = cycle(
+                    texts, lambda text, mode=mode: anonymize_text_with_presidio(text, mode))
+
+    for name, named_profile in policy.profiles.items():
+        if named_profile is profile:
+            continue
+        texts = [sample.text for sample in generate_corpus(
+            size=TEXTS_PER_BENCHMARK, sentences_per_text=SIZES["medium"])]
+        benchmarks[f"profile/{name}/medium"] = cycle(
+            texts, lambda text, named_profile=named_profile: anonymize_text_with_presidio(
+                text, AnonymizationMode.FULL, named_profile))
+
+    for recognizer in profile.analyzer.registry.recognizers:
+        # The spaCy recognizer only reads the entities found by the NLP engine, timed by the anonymize benchmarks
+        if isinstance(recognizer, SpacyRecognizer):
+            continue
+        for size_name, sentences in SIZES.items():
+            texts = [sample.text for sample in generate_corpus(size=TEXTS_PER_BENCHMARK, sentences_per_text=sentences)]
+            benchmarks[f"recognizer/{recognizer.name}/{size_name}"] = cycle(
+                texts, lambda text, recognizer=recognizer: recognizer.analyze(
+                    text=text, entities=recognizer.supported_entities, nlp_artifacts=None))
+
+    for entity_type, config in profile.operators.items():
+        if entity_type not in OPERATOR_SAMPLES:
+            continue
+        operator = ANONYMIZER.operators_factory.create_operator_class(config.operator_name, OperatorType.Anonymize)
+        params = {**config.params, "entity_type": entity_type}
+        benchmarks[f"operator/{entity_type}"] = lambda operator=operator, params=params, \
+            value=OPERATOR_SAMPLES[entity_type]: operator.operate(text=value, params=params)
+    return benchmarks
+
+
+def metadata(rounds: int, min_time: float) -> dict:
+    from src.anonymizer_logic import SPACY_MODEL_NAME
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spacyModel": SPACY_MODEL_NAME,
+        "rounds": rounds,
+        "minTime": min_time,
+    }
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> dict:
+    """
+    Compares the median of every benchmark with the baseline: a ratio above 1 + threshold is a regression.
+    """
+    comparison = []
+    for name, result in results.items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            continue
+        ratio = result["median"] / reference["median"] if reference["median"] else None
+        comparison.append({
+            "name": name,
+            "baselineMedian": reference["median"],
+            "median": result["median"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "regression": ratio is not None and ratio > 1 + threshold,
+        })
+    return {
+        "baseline": baseline["metadata"],
+        "threshold": threshold,
+        "benchmarks": comparison,
+        "regressions": [entry["name"] for entry in comparison if entry["regression"]],
+        "missing": [name for name in baseline["benchmarks"] if name not in results],
+        "new": [name for name in results if name not in baseline["benchmarks"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run the benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per round")
+    parser.add_argument("--save", metavar="PATH", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown over the baseline median reported as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        baseline["benchmarks"] = {name: result for name, result in baseline["benchmarks"].items()
+                                  if args.filter in name}
+
+    results = {}
+    for name, function in collect_benchmarks().items():
+        if args.filter not in name:
+            continue
+        results[name] = time_benchmark(function, args.rounds, args.min_time)
+        print(json.dumps({"name": name, **results[name]}), file=sys.stderr)
+
+    report = {"metadata": metadata(args.rounds, args.min_time), "benchmarks": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+            baseline_file.write("\n")
+
+    if baseline is None:
+        print(json.dumps(report, indent=2))
+        return
+    comparison = compare(baseline, results, args.threshold)
+    print(json.dumps(comparison, indent=2))
+    if comparison["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Local load test: starts the service with gunicorn on this machine, once per worker configuration, and runs the
+k6 profiles of performance-test/src/test-types (constant, load, spike, stress) against it, sending the texts of
+a synthetic corpus (sample_corpus.py) of varied length and PII density instead of a single fixed text.
+No shared environment, subscription key or InfluxDB is needed.
+
+The load is generated in Python by default. With --k6 and k6 on the PATH, the profile runs through
+performance-test/src/anonymizer.js instead, fed with the same corpus.
+
+Configurations are <worker class>:<workers>[:<threads>], where the worker class is sync, gthread or uvicorn
+(ASGI serving, see src/asgi.py). For every configuration and profile, the report holds the throughput and the
+latency percentiles of every stage of the profile, i.e. of every level of virtual users or arrival rate, so the
+throughput-vs-latency curve of each configuration can be compared when sizing the pods.
+Run from the root of the repository:
+
+    PYTHONPATH=. python performance-test/benchmark/load_test.py --config sync:1 --config sync:2 --profile spike
+    PYTHONPATH=. python performance-test/benchmark/load_test.py --config gthread:2:4 --profile load --time-scale 0.2
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from sample_corpus import DENSITIES, generate_corpus
+
+TEST_TYPES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "test-types")
+K6_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "anonymizer.js")
+WORKER_APPS = {
+    "sync": ("src.warmup:create_app()", "sync"),
+    "gthread": ("src.warmup:create_app()", "gthread"),
+    "uvicorn": ("src.asgi:app", "uvicorn_worker.UvicornWorker"),
+}
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(duration: str) -> float:
+    # k6 durations like "30s", "2m" or "1m30s", in seconds
+    seconds = 0.0
+    number = ""
+    index = 0
+    while index < len(duration):
+        if duration[index].isdigit() or duration[index] == ".":
+            number += duration[index]
+            index += 1
+            continue
+        unit = "ms" if duration.startswith("ms", index) else duration[index]
+        seconds += float(number) * DURATION_UNITS[unit]
+        number = ""
+        index += len(unit)
+    return seconds
+
+
+def build_corpus(size: int, seed: int) -> list:
+    # Texts of 1 to 10 sentences, of every PII density
+    rng = random.Random(seed)
+    return [
+        generate_corpus(size=1, seed=rng.randrange(1 << 30), sentences_per_text=rng.choice([1, 1, 2, 3, 5, 10]),
+                        density=rng.choice(list(DENSITIES)))[0].text
+        for _ in range(size)
+    ]
+
+
+def load_profile(name: str, time_scale: float) -> dict:
+    """
+    Returns the stages of a k6 test type: (duration, start virtual users, end virtual users) of a ramping profile,
+    or (duration, rate per second, maximum virtual users) of a constant arrival rate scenario.
+    """
+    with open(os.path.join(TEST_TYPES_DIR, f"{name}.json"), encoding="utf-8") as profile_file:
+        options = json.load(profile_file)
+    if "stages" in options:
+        stages = []
+        vus = 0
+        for stage in options["stages"]:
+            stages.append((parse_duration(stage["duration"]) * time_scale, vus, stage["target"]))
+            vus = stage["target"]
+        return {"executor": "ramping-vus", "stages": stages, "options": options}
+    scenario = next(iter(options["scenarios"].values()))
+    rate = scenario["rate"] / parse_duration(scenario.get("timeUnit", "1s"))
+    return {
+        "executor": "constant-arrival-rate",
+        "stages": [(parse_duration(scenario["duration"]) * time_scale, rate, scenario["maxVUs"])],
+        "options": options,
+    }
+
+
+class LoadGenerator:
+    """
+    Sends anonymization requests to the local server following a profile and records the latency of each one.
+
+    :param host: server host
+    :param port: server port
+    :param texts: texts sent in turn by the virtual users
+    :param mode: anonymization mode of the requests
+    """
+
+    def __init__(self, host: str, port: int, texts: list, mode: str):
+        self.host = host
+        self.port = port
+        self.texts = texts
+        self.mode = mode
+        # (end time, latency, success) of every request
+        self.samples = []
+        self.dropped = 0
+        self._target_vus = 0
+        self._stopped = threading.Event()
+
+    def _request(self, connection: http.client.HTTPConnection, text: str) -> bool:
+        body = json.dumps({"text": text, "mode": self.mode})
+        try:
+            connection.request("POST", "/anonymize", body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            return False
+
+    def _timed_request(self, connection: http.client.HTTPConnection, text: str):
+        start_time = time.perf_counter()
+        success = self._request(connection, text)
+        end_time = time.perf_counter()
+        self.samples.append((end_time, end_time - start_time, success))
+
+    def _ramping_vu(self, index: int):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        rng = random.Random(index)
+        while not self._stopped.is_set():
+            if index >= self._target_vus:
+                time.sleep(0.05)
+                continue
+            self._timed_request(connection, rng.choice(self.texts))
+        connection.close()
+
+    def run_ramping(self, stages: list) -> float:
+        max_vus = max(end for _, _, end in stages)
+        threads = [threading.Thread(target=self._ramping_vu, args=(index,), daemon=True) for index in range(max_vus)]
+        for thread in threads:
+            thread.start()
+        start_time = time.perf_counter()
+        for duration, start_vus, end_vus in stages:
+            stage_start = time.perf_counter()
+            while (elapsed := time.perf_counter() - stage_start) < duration:
+                self._target_vus = round(start_vus + (end_vus - start_vus) * elapsed / duration)
+                time.sleep(0.1)
+        self._stopped.set()
+        for thread in threads:
+            thread.join()
+        return start_time
+
+    def run_constant_rate(self, duration: float, rate: float, max_vus: int) -> float:
+        # Like k6, an iteration is dropped when every virtual user is busy
+        idle_vus = threading.Semaphore(max_vus)
+        rng = random.Random(0)
+
+        def iteration(text: str):
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self._timed_request(connection, text)
+            finally:
+                connection.close()
+                idle_vus.release()
+
+        threads = []
+        start_time = time.perf_counter()
+        for index in range(int(duration * rate)):
+            delay = start_time + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not idle_vus.acquire(blocking=False):
+                self.dropped += 1
+                continue
+            thread = threading.Thread(target=iteration, args=(rng.choice(self.texts),), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return start_time
+
+
+def summarize(samples: list, duration: float) -> dict:
+    latencies = sorted(latency * 1000 for _, latency, _ in samples)
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "throughput": round(sum(1 for _, _, success in samples if success) / duration, 2) if duration else None,
+        "errorRate": round(sum(1 for _, _, success in samples if not success) / len(latencies), 4),
+        "latencyMean": round(statistics.mean(latencies), 2),
+        "latencyP50": round(latencies[len(latencies) // 2], 2),
+        "latencyP95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        "latencyP99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "latencyMax": round(latencies[-1], 2),
+    }
+
+
+def run_python_profile(port: int, texts: list, mode: str, profile: dict) -> dict:
+    generator = LoadGenerator("127.0.0.1", port, texts, mode)
+    if profile["executor"] == "ramping-vus":
+        start_time = generator.run_ramping(profile["stages"])
+    else:
+        duration, rate, max_vus = profile["stages"][0]
+        start_time = generator.run_constant_rate(duration, rate, max_vus)
+
+    stages = []
+    stage_start = start_time
+    for duration, start, end in profile["stages"]:
+        samples = [sample for sample in generator.samples if stage_start <= sample[0] < stage_start + duration]
+        level = {"vus": f"{start}->{end}"} if profile["executor"] == "ramping-vus" else {"rate": start, "maxVus": end}
+        stages.append({**level, "duration": round(duration, 1), **summarize(samples, duration)})
+        stage_start += duration
+    total_duration = sum(duration for duration, _, _ in profile["stages"])
+    return {"stages": stages, "total": summarize(generator.samples, total_duration), "dropped": generator.dropped}
+
+
+def run_k6_profile(port: int, texts: list, mode: str, profile: dict, work_dir: str) -> dict:
+    corpus_path = os.path.join(work_dir, "corpus.json")
+    vars_path = os.path.join(work_dir, "vars.json")
+    test_type_path = os.path.join(work_dir, "test-type.json")
+    summary_path = os.path.join(work_dir, "summary.json")
+    with open(corpus_path, "w", encoding="utf-8") as corpus_file:
+        json.dump({"mode": mode, "texts": texts}, corpus_file)
+    with open(vars_path, "w", encoding="utf-8") as vars_file:
+        json.dump({"environment": [{"env": "local", "anonymizeUri": f"http://127.0.0.1:{port}/anonymize"}]},
+                  vars_file)
+    options = dict(profile["options"])
+    if profile["executor"] == "ramping-vus":
+        options["stages"] = [{"duration": f"{duration}s", "target": end} for duration, _, end in profile["stages"]]
+    else:
+        scenario_name, scenario = next(iter(options["scenarios"].items()))
+        options["scenarios"] = {scenario_name: {**scenario, "duration": f"{profile['stages'][0][0]}s"}}
+    with open(test_type_path, "w", encoding="utf-8") as test_type_file:
+        json.dump(options, test_type_file)
+
+    subprocess.run(["k6", "run", "--quiet", "--summary-export", summary_path, "--env", f"VARS={vars_path}",
+                    "--env", f"TEST_TYPE={test_type_path}", "--env", f"CORPUS={corpus_path}", K6_SCRIPT],
+                   check=False)
+    with open(summary_path, encoding="utf-8") as summary_file:
+        metrics = json.load(summary_file)["metrics"]
+    duration = metrics["http_req_duration"]
+    return {"total": {
+        "requests": metrics["http_reqs"]["count"],
+        "throughput": round(metrics["http_reqs"]["rate"], 2),
+        "errorRate": round(metrics["http_req_failed"]["value"], 4),
+        "latencyMean": round(duration["avg"], 2),
+        "latencyP50": round(duration["med"], 2),
+        "latencyP95": round(duration["p(95)"], 2),
+        "latencyP99": round(duration.get("p(99)", duration["max"]), 2),
+        "latencyMax": round(duration["max"], 2),
+    }}
+
+
+class LocalServer:
+    """
+    The service started with gunicorn and its configuration file, on a local port.
+    """
+
+    def __init__(self, worker_type: str, workers: int, threads: int, port: int, work_dir: str, extra_env: dict):
+        app, worker_class = WORKER_APPS[worker_type]
+        self.port = port
+        self.env = {
+            **os.environ,
+            **extra_env,
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+            "GUNICORN_WORKERS": str(workers),
+            "GUNICORN_THREADS": str(threads),
+            "GUNICORN_APP": app,
+            "GUNICORN_WORKER_CLASS": worker_class,
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(work_dir, "prometheus"),
+        }
+        self.log_path = os.path.join(work_dir, f"server-{worker_type}-{workers}-{threads}.log")
+        self.process = None
+
+    def start(self, timeout: float):
+        with open(self.log_path, "w", encoding="utf-8") as log_file:
+            self.process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "src/gunicorn_config.py"],
+                                            env=self.env, stdout=log_file, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"The server exited with status {self.process.returncode}, see {self.log_path}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+                connection.request("GET", "/ready")
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        raise RuntimeError(f"The server didn't start in {timeout} seconds, see {self.log_path}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=60)
+
+
+def parse_config(config: str) -> tuple:
+    worker_type, workers, *threads = config.split(":")
+    if worker_type not in WORKER_APPS:
+        raise argparse.ArgumentTypeError(f"unknown worker class '{worker_type}', use one of {sorted(WORKER_APPS)}")
+    return worker_type, int(workers), int(threads[0]) if threads else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", dest="configs", type=parse_config,
+                        help="<sync|gthread|uvicorn>:<workers>[:<threads>], can be repeated (default sync:1, sync:2)")
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help="k6 test type of performance-test/src/test-types, can be repeated (default spike)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="factor applied to the profile durations")
+    parser.add_argument("--mode", default="full", choices=["full", "regex"], help="anonymization mode")
+    parser.add_argument("--corpus-size", type=int, default=500, help="number of texts sent in turn")
+    parser.add_argument("--port", type=int, default=3900, help="local port of the server")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="seconds to wait for the server")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="environment variable of the server (e.g. ANONYMIZER_COALESCING_ENABLED=true)")
+    parser.add_argument("--k6", action="store_true", help="generate the load with k6 instead of Python")
+    args = parser.parse_args()
+    configs = args.configs or [("sync", 1, 1), ("sync", 2, 1)]
+    profiles = args.profiles or ["spike"]
+    extra_env = dict(variable.split("=", 1) for variable in args.env)
+    if args.k6 and shutil.which("k6") is None:
+        parser.error("k6 is not installed, see https://grafana.com/docs/k6/latest/set-up/install-k6/")
+
+    texts = build_corpus(args.corpus_size, seed=42)
+    work_dir = tempfile.mkdtemp(prefix="anonymizer-load-test-")
+    print(f"Server logs in {work_dir}", file=sys.stderr)
+    report = []
+    for worker_type, workers, threads in configs:
+        server = LocalServer(worker_type, workers, threads, args.port, work_dir, extra_env)
+        server.start(args.startup_timeout)
+        try:
+            # Warm-up, so lazy initializations of every worker are not measured
+            LoadGenerator("127.0.0.1", args.port, texts, args.mode).run_constant_rate(2, 10 * workers, 4 * workers)
+            for profile_name in profiles:
+                profile = load_profile(profile_name, args.time_scale)
+                if args.k6:
+                    result = run_k6_profile(args.port, texts, args.mode, profile, work_dir)
+                else:
+                    result = run_python_profile(args.port, texts, args.mode, profile)
+                report.append({"workerClass": worker_type, "workers": workers, "threads": threads,
+                               "profile": profile_name, **result})
+                print(json.dumps(report[-1]), file=sys.stderr)
+        finally:
+            server.stop()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
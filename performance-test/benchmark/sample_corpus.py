@@ -0,0 +1,103 @@
+"""
+Synthetic Italian corpus, similar to the messages the service anonymizes, with the position of every PII it holds.
+The texts are generated from a fixed seed, so every benchmark run works on the same corpus.
+"""
+import random
+from typing import List, NamedTuple, Tuple
+
+FIRST_NAMES = [
+    "Mario", "Giulia", "Luca", "Francesca", "Marco", "Chiara", "Alessandro", "Sara", "Giuseppe", "Valentina",
+    "Andrea", "Elena", "Roberto", "Martina", "Stefano", "Federica", "Paolo", "Silvia", "Antonio", "Laura",
+]
+LAST_NAMES = [
+    "Rossi", "Bianchi", "Russo", "Ferrari", "Esposito", "Romano", "Colombo", "Ricci", "Marino", "Greco",
+    "Bruno", "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Giordano", "Rizzo", "Lombardi", "Moretti",
+]
+STREETS = ["Via Roma", "Viale Europa", "Piazza Garibaldi", "Corso Italia", "Via Giuseppe Verdi", "Largo Augusto"]
+EMAIL_DOMAINS = ["example.com", "posta.it", "mail.example.org"]
+PLATES = ["AB123CD", "EF456GH", "ZZ987YX"]
+FISCAL_CODES = ["RSSMRA80A01H501U", "BNCGLI85M41F205X", "VRDLCU90T10L219K"]
+
+# {person}, {email}, {address}, {plate} and {fiscal_code} are replaced with a generated value
+TEMPLATES = [
+    "Buongiorno, sono {person} e ho pagato due volte lo stesso avviso. Potete rimborsarmi?",
+    "Il sottoscritto {person}, codice fiscale {fiscal_code}, chiede la rettifica della posizione debitoria.",
+    "Si prega di inviare la ricevuta a {email} per conto di {person}.",
+    "La multa per il veicolo targato {plate} risulta già pagata da {person}.",
+    "Residente in {address}, {person} segnala un errore nell'importo dell'avviso.",
+    "Gentile {person}, la sua richiesta è stata presa in carico dall'ente creditore.",
+    "Ho ricevuto un avviso di pagamento della TARI ma l'importo non è corretto.",
+    "Il pagamento con carta non va a buon fine, il sito restituisce un errore generico.",
+    "Vorrei sapere se il bollettino scade a fine mese o se posso pagarlo la prossima settimana.",
+    "Scrivo per conto di mia madre, {person}, che non riesce ad accedere all'app.",
+]
+
+
+# Templates by density of PII: none, as many as the service usually sees, only sentences holding PII
+DENSITIES = {
+    "none": [template for template in TEMPLATES if "{" not in template],
+    "mixed": TEMPLATES,
+    "dense": [template for template in TEMPLATES if "{" in template],
+}
+
+
+class Sample(NamedTuple):
+    text: str
+    # (entity type, start, end) of every PII in the text
+    entities: List[Tuple[str, int, int]]
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _email(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower().replace(' ', '')}" \
+           f"@{rng.choice(EMAIL_DOMAINS)}"
+
+
+GENERATORS = {
+    "person": ("PERSON", _person),
+    "email": ("EMAIL_ADDRESS", _email),
+    "address": ("ITALIAN_ADDRESS", lambda rng: f"{rng.choice(STREETS)} {rng.randint(1, 200)}"),
+    "plate": ("IT_VEHICLE_PLATE", lambda rng: rng.choice(PLATES)),
+    "fiscal_code": ("IT_FISCAL_CODE", lambda rng: rng.choice(FISCAL_CODES)),
+}
+
+
+def render(template: str, rng: random.Random) -> Sample:
+    text = ""
+    entities = []
+    rest = template
+    while "{" in rest:
+        before, _, rest = rest.partition("{")
+        placeholder, _, rest = rest.partition("}")
+        entity_type, generate = GENERATORS[placeholder]
+        value = generate(rng)
+        text += before
+        entities.append((entity_type, len(text), len(text) + len(value)))
+        text += value
+    return Sample(text + rest, entities)
+
+
+def generate_corpus(size: int = 500, seed: int = 42, sentences_per_text: int = 1,
+                    density: str = "mixed") -> List[Sample]:
+    """
+    Generates size samples, each made of sentences_per_text sentences picked at random from the templates
+    of the given density.
+    """
+    templates = DENSITIES[density]
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = ""
+        entities = []
+        for _ in range(sentences_per_text):
+            if text:
+                text += " "
+            sentence = render(rng.choice(templates), rng)
+            entities.extend((entity_type, start + len(text), end + len(text))
+                            for entity_type, start, end in sentence.entities)
+            text += sentence.text
+        corpus.append(Sample(text, entities))
+    return corpus
@@ -0,0 +1,115 @@
+"""
+Compares spaCy models and pipeline trimming on the sample corpus: model load time, memory,
+analysis latency and PERSON recall/precision.
+
+Every configuration runs in its own process, so the memory of a model doesn't leak into the next measure.
+Run from the root of the repository:
+
+    PYTHONPATH=. python performance-test/benchmark/spacy_pipeline.py
+    PYTHONPATH=. python performance-test/benchmark/spacy_pipeline.py --config it_core_news_sm:parser --size 1000
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_CONFIGS = [
+    "it_core_news_lg:",
+    "it_core_news_lg:parser",
+    "it_core_news_md:parser",
+    "it_core_news_sm:parser",
+]
+
+
+def run_config(model_name: str, excluded_components: list, size: int) -> dict:
+    import spacy
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+    from sample_corpus import generate_corpus
+    from src.analyzer_registry import build_pruned_registry
+    from src.nlp_engine import TrimmedSpacyNlpEngine
+    from src.process_memory import read_process_memory
+
+    if not spacy.util.is_package(model_name):
+        return {"error": f"model {model_name} is not installed: python -m spacy download {model_name}"}
+
+    baseline_memory = read_process_memory()
+    start_time = time.perf_counter()
+    nlp_engine = NlpEngineProvider(nlp_engines=(TrimmedSpacyNlpEngine,), nlp_configuration={
+        "nlp_engine_name": "spacy",
+        "models": [{"lang_code": "it", "model_name": model_name, "exclude": excluded_components}]
+    }).create_engine()
+    analyzer = AnalyzerEngine(
+        registry=build_pruned_registry(entities=["PERSON"], nlp_engine=nlp_engine),
+        nlp_engine=nlp_engine,
+        supported_languages=["it"]
+    )
+    load_time = time.perf_counter() - start_time
+    loaded_memory = read_process_memory()
+
+    corpus = generate_corpus(size=size)
+    # Warm-up, so lazy initializations are not measured
+    analyzer.analyze(text=corpus[0].text, language="it", entities=["PERSON"])
+
+    latencies = []
+    expected = found = matched = 0
+    for sample in corpus:
+        analysis_start_time = time.perf_counter()
+        results = analyzer.analyze(text=sample.text, language="it", entities=["PERSON"])
+        latencies.append((time.perf_counter() - analysis_start_time) * 1000)
+
+        persons = [(start, end) for entity_type, start, end in sample.entities if entity_type == "PERSON"]
+        expected += len(persons)
+        found += len(results)
+        # A person counts as detected when a PERSON result overlaps it
+        matched += sum(1 for start, end in persons if any(r.start < end and start < r.end for r in results))
+
+    latencies.sort()
+    memory_key = "rss" if "rss" in loaded_memory else "maxRss"
+    return {
+        "pipeline": nlp_engine.nlp["it"].pipe_names,
+        "loadTime": round(load_time, 3),
+        "modelMemory": loaded_memory[memory_key] - baseline_memory[memory_key],
+        "latencyMean": round(statistics.mean(latencies), 3),
+        "latencyP50": round(latencies[len(latencies) // 2], 3),
+        "latencyP95": round(latencies[int(len(latencies) * 0.95)], 3),
+        "personRecall": round(matched / expected, 4) if expected else None,
+        "personPrecision": round(matched / found, 4) if found else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", dest="configs",
+                        help="<model name>:<comma separated components to exclude>, can be repeated")
+    parser.add_argument("--size", type=int, default=500, help="number of texts in the corpus")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    configs = args.configs or DEFAULT_CONFIGS
+
+    if args.single:
+        model_name, _, excluded = configs[0].partition(":")
+        excluded_components = [component for component in excluded.split(",") if component]
+        print(json.dumps(run_config(model_name, excluded_components, args.size)))
+        return
+
+    report = []
+    for config in configs:
+        process = subprocess.run(
+            [sys.executable, __file__, "--single", "--config", config, "--size", str(args.size)],
+            capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            result = {"error": process.stderr.strip().splitlines()[-1]}
+        else:
+            result = json.loads(process.stdout.strip().splitlines()[-1])
+        report.append({"config": config, **result})
+        print(json.dumps(report[-1]), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,23 @@ export function setup() {
 
 const MIXED_PII_TEXT = "Multa per Mario Rossi il giorno 12/07/2025 alle ore 11:00, codice fiscale GTRQWF12L23B157A e carta identita n. AA00000AA, domiciliato in Piazza San Pietro n. 35. Pagato attraverso iban IT47J0990650025128761820997 per autovettura targata XX000XX. Contatti numero telefonico 3313516333 ed email test@pagopa.it. Per assistenza andare sul sito web www.test.it";
 const MIXED_ANONYMIZED_TEXT = "Multa per <PERSON> il giorno <ANONYMIZED> alle ore 11:00, codice fiscale <FISCAL_CODE> e carta identita n. <ANONYMIZED>, domiciliato in <ADDRESS>. Pagato attraverso iban <ANONYMIZED> per autovettura targata <PLATE_NUMBER>. Contatti numero telefonico <PHONE> ed email <EMAIL>. Per assistenza andare sul sito web <ANONYMIZED>";
+// Optional synthetic corpus ({"mode": ..., "texts": [...]}) written by performance-test/benchmark/load_test.py:
+// each iteration sends one of its texts instead of MIXED_PII_TEXT
+const corpus = __ENV.CORPUS ? new SharedArray('corpus', function () {
+  return [JSON.parse(open(__ENV.CORPUS))];
+})[0] : null;
+
 export default function (data) {
   // 3. VU code
+  if (corpus) {
+    const text = corpus.texts[Math.floor(Math.random() * corpus.texts.length)];
+    const corpusResponse = anonymizePII(anonymizeUri, subKey, text, corpus.mode);
+    check(corpusResponse, {
+      'Anonymize status is 200': (response) => response.status === 200
+    });
+    return;
+  }
+
   let response = anonymizePII(anonymizeUri, subKey, MIXED_PII_TEXT);
 
   console.log("Anonymize call, Status " + response.status);
@@ -1,9 +1,12 @@
 import http from 'k6/http';
 
-export function anonymizePII(anonymizeUri, subKey, inputText) {
+export function anonymizePII(anonymizeUri, subKey, inputText, mode) {
     const formData = {
         text: inputText
       };
+    if (mode) {
+        formData.mode = mode;
+    }
 
       let headers = { 
         'Ocp-Apim-Subscription-Key': subKey,
@@ -0,0 +1,132 @@
+import inspect
+import logging
+import time
+from functools import partial
+from typing import Iterable, Optional, Set, Type
+from presidio_analyzer import EntityRecognizer, PatternRecognizer, RecognizerRegistry
+from presidio_analyzer.nlp_engine import NlpEngine
+from presidio_analyzer.recognizer_registry.recognizers_loader_utils import (
+    RecognizerConfigurationLoader,
+    RecognizerListLoader,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _declared_entities(recognizer_cls: Type[EntityRecognizer], kwargs: dict) -> Optional[Set[str]]:
+    """
+    Returns the entities a predefined recognizer will detect, read from its configuration or from the defaults of its
+    constructor, without building it. None when they can't be known before building it.
+    """
+    if kwargs.get("supported_entity"):
+        return {kwargs["supported_entity"]}
+    if kwargs.get("supported_entities"):
+        return set(kwargs["supported_entities"])
+    parameters = inspect.signature(recognizer_cls.__init__).parameters
+    if "supported_entity" in parameters and isinstance(parameters["supported_entity"].default, str):
+        return {parameters["supported_entity"].default}
+    if "supported_entities" in parameters and parameters["supported_entities"].default:
+        return set(parameters["supported_entities"].default)
+    if getattr(recognizer_cls, "ENTITIES", None):
+        return set(recognizer_cls.ENTITIES)
+    return None
+
+
+def _predefined_recognizers(language: str, nlp_engine: NlpEngine, global_regex_flags: int):
+    """
+    Yields the predefined recognizers of the language, as (name, declared entities, factory) tuples, the same way
+    Presidio's RecognizerRegistry.load_predefined_recognizers builds them, without building them.
+    """
+    configuration = RecognizerConfigurationLoader.get(registry_configuration={
+        "global_regex_flags": global_regex_flags,
+        "supported_languages": [language]
+    })
+    predefined, _ = RecognizerListLoader._split_recognizers(configuration["recognizers"])
+    for recognizer_conf in predefined:
+        if not RecognizerListLoader._is_recognizer_enabled(recognizer_conf):
+            continue
+        name = RecognizerListLoader._get_recognizer_name(recognizer_conf=recognizer_conf)
+        recognizer_cls = RecognizerListLoader._get_existing_recognizer_cls(recognizer_name=name)
+        conf = {
+            key: value for key, value in RecognizerListLoader._get_recognizer_items(recognizer_conf=recognizer_conf)
+            if key not in ["enabled", "type", "supported_languages", "name"]
+        }
+        for language_conf in RecognizerListLoader._get_recognizer_languages(
+                recognizer_conf=recognizer_conf, supported_languages=[language]):
+            if language_conf["supported_language"] != language:
+                continue
+            kwargs = {**conf, **language_conf}
+            yield name, _declared_entities(recognizer_cls, kwargs), partial(recognizer_cls, **kwargs)
+
+    nlp_recognizer_cls = RecognizerRegistry._get_nlp_recognizer(nlp_engine)
+    kwargs = {"supported_language": language, "supported_entities": nlp_engine.get_supported_entities()}
+    yield nlp_recognizer_cls.__name__, _declared_entities(nlp_recognizer_cls, kwargs), partial(nlp_recognizer_cls,
+                                                                                               **kwargs)
+
+
+def build_pruned_registry(
+        entities: Iterable[str],
+        nlp_engine: NlpEngine,
+        custom_recognizers: Iterable[EntityRecognizer] = (),
+        language: str = "it"
+) -> RecognizerRegistry:
+    """
+    Builds a recognizer registry holding only the recognizers that detect at least one of the given entities.
+    Presidio's default registry builds every predefined recognizer for the language (URL, DATE_TIME, IP, ...)
+    even if their results are then thrown away: here the predefined recognizers detecting none of the entities are
+    never built. Building a recognizer loads it, so the first request doesn't pay for it, and the build time of each
+    kept recognizer is reported at startup.
+    """
+    start_time = time.perf_counter()
+    entities = set(entities)
+    registry = RecognizerRegistry(supported_languages=[language])
+
+    loaded = []
+    pruned = []
+    report = []
+    for name, declared_entities, factory in _predefined_recognizers(language, nlp_engine, registry.global_regex_flags):
+        if declared_entities is not None and not entities.intersection(declared_entities):
+            pruned.append(name)
+            continue
+        load_start_time = time.perf_counter()
+        recognizer = factory()
+        load_time = time.perf_counter() - load_start_time
+        if not entities.intersection(recognizer.supported_entities):
+            pruned.append(recognizer.name)
+            continue
+        if isinstance(recognizer, PatternRecognizer):
+            recognizer.global_regex_flags = registry.global_regex_flags
+        loaded.append(recognizer)
+        report.append({
+            "name": recognizer.name,
+            "entities": sorted(entities.intersection(recognizer.supported_entities)),
+            "loadTime": round(load_time * 1000, 3)
+        })
+
+    for recognizer in custom_recognizers:
+        if not entities.intersection(recognizer.supported_entities):
+            pruned.append(recognizer.name)
+            continue
+        load_start_time = time.perf_counter()
+        if not recognizer.is_loaded:
+            recognizer.load()
+            recognizer.is_loaded = True
+        loaded.append(recognizer)
+        report.append({
+            "name": recognizer.name,
+            "entities": sorted(entities.intersection(recognizer.supported_entities)),
+            "loadTime": round((time.perf_counter() - load_start_time) * 1000, 3)
+        })
+    registry.recognizers = loaded
+
+    detected_entities = {entity for recognizer in loaded for entity in recognizer.supported_entities}
+    missing_entities = sorted(entities - detected_entities)
+    if missing_entities:
+        logger.warning("No recognizer loaded for entities %s", missing_entities)
+
+    logger.info("Recognizer registry built with %d recognizers", len(loaded), extra={
+        "recognizers": report,
+        "prunedRecognizers": pruned,
+        "buildTime": round((time.perf_counter() - start_time) * 1000, 3)
+    })
+    return registry
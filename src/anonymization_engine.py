@@ -0,0 +1,160 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Tuple
+
+from presidio_anonymizer import AnonymizerEngine, OperatorConfig
+from presidio_anonymizer.entities import InvalidParamError, RecognizerResult
+from presidio_anonymizer.operators import Operator, OperatorType
+
+# Same check as AnonymizerEngine._merge_entities_with_whitespace_between
+SPACES_REGEX = re.compile(r"^( )+$")
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    entity_type: str
+    score: float
+    # Position of the result in the analyzer output, breaking ties like Presidio does
+    position: int
+
+
+def _merge_same_type(analyzer_results: List[RecognizerResult]) -> List[Span]:
+    # Results of the same type sharing at least a character become a single one, with the highest score
+    spans_by_type = defaultdict(list)
+    for position, result in enumerate(analyzer_results):
+        spans_by_type[result.entity_type].append((result.start, result.end, result.score, position))
+
+    merged = []
+    for entity_type, spans in spans_by_type.items():
+        spans.sort()
+        current = None
+        for start, end, score, position in spans:
+            if current and start < current[1] and start < end:
+                current = [current[0], max(current[1], end), max(current[2], score), max(current[3], position)]
+                continue
+            if current:
+                merged.append(Span(current[0], current[1], entity_type, current[2], current[3]))
+            current = [start, end, score, position]
+        if current:
+            merged.append(Span(current[0], current[1], entity_type, current[2], current[3]))
+    return merged
+
+
+def _remove_contained(spans: List[Span]) -> List[Span]:
+    # Of the results with the same indexes only the highest score survives (the last one on ties),
+    # and results contained in another one are dropped
+    kept = []
+    max_end = -1
+    spans = sorted(spans, key=lambda span: (span.start, -span.end, span.score, span.position))
+    for index, span in enumerate(spans):
+        if index + 1 < len(spans) and spans[index + 1][:2] == span[:2]:
+            continue
+        if max_end < span.end:
+            kept.append(span)
+        max_end = max(max_end, span.end)
+    return kept
+
+
+def _merge_whitespace_separated(text: str, spans: List[Span]) -> List[Span]:
+    # Consecutive results (in analyzer order) of the same type separated only by spaces become a single one
+    merged = []
+    for span in sorted(spans, key=lambda span: span.position):
+        if merged:
+            previous = merged[-1]
+            if previous.entity_type == span.entity_type and SPACES_REGEX.search(text[previous.end:span.start]):
+                merged.pop()
+                span = span._replace(start=previous.start)
+        merged.append(span)
+    return merged
+
+
+def resolve_conflicts(text: str, analyzer_results: List[RecognizerResult]) -> List[Span]:
+    """
+    Returns the spans to anonymize, sorted by position in the text, resolving the conflicts among the analyzer
+    results as AnonymizerEngine does with the default MERGE_SIMILAR_OR_CONTAINED strategy, in O(n log n)
+    instead of comparing every result with every other one.
+    Partially overlapping results of different types are all kept.
+    """
+    for result in analyzer_results:
+        if result.start > len(text) or result.end > len(text):
+            raise InvalidParamError(
+                f"Invalid analyzer result, start: {result.start} and end: {result.end}, "
+                f"while text length is only {len(text)}."
+            )
+    spans = _merge_whitespace_separated(text, _remove_contained(_merge_same_type(analyzer_results)))
+    # Presidio replaces from the last span backwards: spans with the same indexes end up in reverse analyzer order
+    return sorted(spans, key=lambda span: (span.start, span.end, -span.position))
+
+
+class SinglePassAnonymizer:
+    """
+    Anonymizes a text given its analyzer results with the operators of an AnonymizerEngine, producing the same
+    text as AnonymizerEngine.anonymize.
+
+    AnonymizerEngine compares every result with every other one to resolve conflicts and rebuilds the whole
+    text for each replaced entity, which is quadratic in the number of entities. Here conflicts are resolved
+    after sorting once, and the output is assembled with a single join over the slices of the original text.
+    Operators are created and validated once per entity type instead of once per entity.
+
+    :param engine: engine holding the registered operators
+    :param operators: operator configuration by entity type, with an optional DEFAULT
+    """
+
+    def __init__(self, engine: AnonymizerEngine, operators: Dict[str, OperatorConfig]):
+        self.engine = engine
+        self.operators = operators
+        self._prepared: Dict[str, Tuple[Operator, dict]] = {}
+
+    def _operator(self, entity_type: str) -> Tuple[Operator, dict]:
+        prepared = self._prepared.get(entity_type)
+        if prepared is None:
+            config = self.operators.get(entity_type) or self.operators.get("DEFAULT") or OperatorConfig("replace")
+            operator = self.engine.operators_factory.create_operator_class(config.operator_name, OperatorType.Anonymize)
+            params = {**config.params, "entity_type": entity_type}
+            operator.validate(params=params)
+            prepared = self._prepared[entity_type] = (operator, params)
+        return prepared
+
+    def anonymize(self, text: str, analyzer_results: List[RecognizerResult]) -> str:
+        """
+        Returns the anonymized text. The analyzer results are not modified.
+        """
+        return self._replace(text, resolve_conflicts(text, analyzer_results))
+
+    def anonymize_with_spans(self, text: str,
+                             analyzer_results: List[RecognizerResult]) -> Tuple[str, Dict[str, list]]:
+        """
+        Returns the anonymized text and the spans it replaced, as returned by spans().
+        """
+        spans = resolve_conflicts(text, analyzer_results)
+        return self._replace(text, spans), self._columns(spans)
+
+    def spans(self, text: str, analyzer_results: List[RecognizerResult]) -> Dict[str, list]:
+        """
+        Returns the spans that anonymize() would replace, without running any operator, in columnar form:
+        a list per field ("type", "start", "end", "score", "operator"), the i-th span made of the i-th item of
+        each list. Offsets refer to the original text.
+        """
+        return self._columns(resolve_conflicts(text, analyzer_results))
+
+    def _columns(self, spans: List[Span]) -> Dict[str, list]:
+        return {
+            "type": [span.entity_type for span in spans],
+            "start": [span.start for span in spans],
+            "end": [span.end for span in spans],
+            "score": [span.score for span in spans],
+            "operator": [self._operator(span.entity_type)[0].operator_name() for span in spans],
+        }
+
+    def _replace(self, text: str, spans: List[Span]) -> str:
+        pieces = []
+        cursor = 0
+        for index, span in enumerate(spans):
+            operator, params = self._operator(span.entity_type)
+            pieces.append(text[cursor:span.start])
+            pieces.append(operator.operate(text=text[span.start:span.end], params=params))
+            # A span overlapping the next one only replaces the text before it
+            cursor = min(span.end, spans[index + 1].start) if index + 1 < len(spans) else span.end
+        pieces.append(text[cursor:])
+        return "".join(pieces)
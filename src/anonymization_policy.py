@@ -0,0 +1,500 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+from presidio_analyzer import AnalyzerEngine, EntityRecognizer, Pattern, RecognizerRegistry
+from presidio_analyzer.nlp_engine import NlpEngine
+from presidio_anonymizer import AnonymizerEngine, OperatorConfig
+from presidio_anonymizer.operators import OperatorType
+
+from src.analyzer_registry import build_pruned_registry
+from src.anonymization_engine import SinglePassAnonymizer
+from src.cache import config_fingerprint
+from src.recognizers import WORD_REGEX, CandidatePrefilter, LinearPatternRecognizer, TokenCheck, ends_with_any, \
+    has_backtracking_quantifier, short_with_digit, starts_with_any
+
+logger = logging.getLogger(__name__)
+
+ERROR_MESSAGE = "error.message"
+ERROR_TYPE = "error.type"
+ERROR_STACK_TRACE = "error.stack_trace"
+
+DEFAULT_POLICY_FILE = os.path.join(os.path.dirname(__file__), "default_policy.yaml")
+
+POLICY_FIELDS = {"entities", "wordLists", "recognizers", "operators", "profiles"}
+PROFILE_FIELDS = {"entities", "operators"}
+RECOGNIZER_FIELDS = {"name", "entity", "patternName", "regex", "score", "context", "candidates"}
+OPERATOR_FIELDS = {"type", "params"}
+ENTITY_REGEX = re.compile(r"^[A-Z][A-Z0-9_]*$")
+PROFILE_NAME_REGEX = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+# The entities and operators at the top of the policy, used by the requests that don't choose a profile
+DEFAULT_PROFILE = "default"
+# "{{name}}" in a recognizer regex stands for the alternatives of the word list
+WORD_LIST_PLACEHOLDER_REGEX = re.compile(r"\{\{(\w+)}}")
+
+# Prefilter checks, by the name used in the policy, and whether they take a word list or a number
+CANDIDATE_CHECKS = {
+    "endsWith": (ends_with_any, "wordList"),
+    "startsWith": (starts_with_any, "wordList"),
+    "shortWithDigit": (short_with_digit, "length"),
+}
+
+
+class PolicyError(ValueError):
+    """
+    Raised when an anonymization policy can't be read or is not valid.
+    """
+
+
+def read_policy_file(path: str) -> dict:
+    """
+    Reads a policy document from a YAML (.yaml, .yml) or JSON file.
+    """
+    try:
+        with open(path, encoding="utf-8") as policy_file:
+            if path.endswith((".yaml", ".yml")):
+                return yaml.safe_load(policy_file)
+            return json.load(policy_file)
+    except OSError as e:
+        raise PolicyError(f"Can't read the policy file {path}: {e}") from e
+    except (yaml.YAMLError, json.JSONDecodeError) as e:
+        raise PolicyError(f"Invalid policy file {path}: {e}") from e
+
+
+def policy_version(document: dict) -> str:
+    """
+    Returns the version of a policy: a digest of its content, independent of the file format and of the key order.
+    """
+    serialized = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise PolicyError(message)
+
+
+def _check_fields(value: Any, where: str, allowed: set, required: set = frozenset()):
+    _check(isinstance(value, dict), f"{where} should be an object")
+    unknown = sorted(set(value) - allowed)
+    _check(not unknown, f"{where} has unknown fields {unknown}")
+    missing = sorted(required - set(value))
+    _check(not missing, f"{where} is missing the fields {missing}")
+
+
+def _expand_word_lists(regex: str, word_lists: Dict[str, List[str]]) -> str:
+    # Words are joined as regex alternatives, as they are: a word may itself be a (non backtracking) regex
+    return WORD_LIST_PLACEHOLDER_REGEX.sub(lambda match: "|".join(word_lists[match.group(1)]), regex)
+
+
+def _validate_word_lists(word_lists: Any) -> Dict[str, List[str]]:
+    _check(isinstance(word_lists, dict), "wordLists should be an object")
+    for name, words in word_lists.items():
+        _check(isinstance(words, list) and words, f"wordLists.{name} should be a non empty list")
+        for word in words:
+            # The prefilter matches the first word of each entry
+            _check(isinstance(word, str) and WORD_REGEX.match(word.casefold()) is not None,
+                   f"wordLists.{name}: '{word}' should be a text starting with a letter or a digit")
+    return word_lists
+
+
+def _validate_recognizer(recognizer: Any, index: int, entities: List[str], word_lists: Dict[str, List[str]]):
+    where = f"recognizers[{index}]"
+    _check_fields(recognizer, where, RECOGNIZER_FIELDS, {"name", "entity", "regex", "score"})
+    _check(isinstance(recognizer["name"], str) and recognizer["name"], f"{where}.name should be a non empty text")
+    _check(recognizer["entity"] in entities, f"{where}.entity '{recognizer['entity']}' is not one of the entities")
+    score = recognizer["score"]
+    _check(isinstance(score, (int, float)) and not isinstance(score, bool) and 0 <= score <= 1,
+           f"{where}.score should be a number between 0 and 1")
+
+    regex = recognizer["regex"]
+    _check(isinstance(regex, str), f"{where}.regex should be a text")
+    for name in WORD_LIST_PLACEHOLDER_REGEX.findall(regex):
+        _check(name in word_lists, f"{where}.regex uses the unknown word list '{name}'")
+    expanded_regex = _expand_word_lists(regex, word_lists)
+    try:
+        re.compile(expanded_regex)
+    except re.error as e:
+        raise PolicyError(f"{where}.regex is not a valid regex: {e}") from e
+    _check(not has_backtracking_quantifier(expanded_regex),
+           f"{where}.regex should not backtrack: use possessive quantifiers ('*+', '++', '{{n,}}+') or atomic "
+           f"groups '(?>...)' instead of unbounded greedy or lazy ones")
+
+    context = recognizer.get("context")
+    _check(context is None or context in word_lists, f"{where}.context should be the name of a word list")
+
+    candidates = recognizer.get("candidates")
+    if candidates is not None:
+        _check(isinstance(candidates, dict) and len(candidates) == 1 and next(iter(candidates)) in CANDIDATE_CHECKS,
+               f"{where}.candidates should have a single check among {sorted(CANDIDATE_CHECKS)}")
+        check, value = next(iter(candidates.items()))
+        if CANDIDATE_CHECKS[check][1] == "wordList":
+            _check(value in word_lists, f"{where}.candidates.{check} should be the name of a word list")
+        else:
+            _check(isinstance(value, int) and not isinstance(value, bool) and value > 0,
+                   f"{where}.candidates.{check} should be a positive integer")
+
+
+def _validate_entities(entities: Any, where: str):
+    _check(isinstance(entities, list) and entities, f"{where} should be a non empty list")
+    for entity in entities:
+        _check(isinstance(entity, str) and ENTITY_REGEX.match(entity) is not None,
+               f"{where}: '{entity}' should be an uppercase name like IT_FISCAL_CODE")
+    _check(len(set(entities)) == len(entities), f"{where} should not be repeated")
+
+
+def _validate_operators(operators: Any, entities: List[str], anonymizer_engine: AnonymizerEngine,
+                        prefix: str = "operators"):
+    _check(isinstance(operators, dict), f"{prefix} should be an object")
+    for entity_type, operator in operators.items():
+        where = f"{prefix}.{entity_type}"
+        _check(entity_type == "DEFAULT" or entity_type in entities,
+               f"{where}: '{entity_type}' is not one of the entities")
+        _check_fields(operator, where, OPERATOR_FIELDS, {"type"})
+        params = operator.get("params", {})
+        _check(isinstance(params, dict), f"{where}.params should be an object")
+        try:
+            operator_class = anonymizer_engine.operators_factory.create_operator_class(operator["type"],
+                                                                                       OperatorType.Anonymize)
+            operator_class.validate(params={**params, "entity_type": entity_type})
+        except Exception as e:
+            raise PolicyError(f"{where}: {e}") from e
+
+
+def _validate_profiles(profiles: Any, entities: List[str], anonymizer_engine: AnonymizerEngine):
+    _check(isinstance(profiles, dict), "profiles should be an object")
+    for name, profile in profiles.items():
+        where = f"profiles.{name}"
+        _check(PROFILE_NAME_REGEX.match(name) is not None and name != DEFAULT_PROFILE,
+               f"{where}: profile names should be lowercase letters, digits, '-' and '_', and not "
+               f"'{DEFAULT_PROFILE}'")
+        _check_fields(profile, where, PROFILE_FIELDS)
+        profile_entities = profile.get("entities", entities)
+        _validate_entities(profile_entities, f"{where}.entities")
+        unknown_entities = [entity for entity in profile_entities if entity not in entities]
+        _check(not unknown_entities, f"{where}.entities {unknown_entities} are not among the policy entities")
+        _validate_operators(profile.get("operators", {}), profile_entities, anonymizer_engine, f"{where}.operators")
+
+
+def validate_policy(document: Any, anonymizer_engine: AnonymizerEngine):
+    """
+    Checks that a policy document is well formed: known fields, entity names, word lists, regexes that compile,
+    operators registered in the anonymizer engine with valid params, profiles restricted to the policy entities.
+    Raises PolicyError on the first problem.
+    """
+    _check_fields(document, "The policy", POLICY_FIELDS, {"entities"})
+    entities = document["entities"]
+    _validate_entities(entities, "entities")
+
+    word_lists = _validate_word_lists(document.get("wordLists", {}))
+    recognizers = document.get("recognizers", [])
+    _check(isinstance(recognizers, list), "recognizers should be a list")
+    for index, recognizer in enumerate(recognizers):
+        _validate_recognizer(recognizer, index, entities, word_lists)
+    names = [recognizer["name"] for recognizer in recognizers]
+    _check(len(set(names)) == len(names), "recognizers should have different names")
+
+    _validate_operators(document.get("operators", {}), entities, anonymizer_engine)
+    _validate_profiles(document.get("profiles", {}), entities, anonymizer_engine)
+
+
+def _candidate_check(candidates: Optional[dict], word_lists: Dict[str, List[str]]) -> TokenCheck:
+    if candidates is None:
+        # Without a check the pattern runs on every text
+        return lambda token: True
+    check, value = next(iter(candidates.items()))
+    build_check, argument = CANDIDATE_CHECKS[check]
+    return build_check(word_lists[value] if argument == "wordList" else value)
+
+
+class CompiledProfile:
+    """
+    A profile of an anonymization policy compiled into what the analysis needs: the custom recognizers of its
+    entities, the analyzer with the registry of its entities and the single pass anonymizer with its operators.
+    A narrow profile only runs the recognizers of its own entities.
+
+    :param name: profile name
+    :param entities: entities anonymized by the profile
+    :param operators: operator definitions by entity type, as in the policy document
+    :param registry: registry with the recognizers of the policy entities, shared by every profile of the policy:
+        the profile keeps those detecting its entities, without building them again
+    :param custom_recognizers: custom recognizers of the policy by name
+    :param ner_entities: entities that only the spaCy NER model can detect, skipped by the regex-only mode
+    :param nlp_engine: NLP engine shared by every profile, so that a new policy never loads the spaCy model again
+    :param anonymizer_engine: engine holding the registered operators
+    :param fingerprint: digest of everything that determines the anonymized output of the profile
+    :param language: language of the recognizers
+    """
+
+    def __init__(self, name: str, entities: List[str], operators: Dict[str, dict], registry: RecognizerRegistry,
+                 custom_recognizers: Dict[str, EntityRecognizer], ner_entities: List[str], nlp_engine: NlpEngine,
+                 anonymizer_engine: AnonymizerEngine, fingerprint: str, language: str = "it"):
+        self.name = name
+        self.entities = list(entities)
+        self.regex_entities = [entity for entity in self.entities if entity not in ner_entities]
+        # Without any of them, the profile never needs the spaCy pipeline
+        self.ner_entities = [entity for entity in self.entities if entity in ner_entities]
+        self.operators = {
+            entity_type: OperatorConfig(operator["type"], operator.get("params", {}))
+            for entity_type, operator in operators.items()
+        }
+        self.fingerprint = fingerprint
+
+        entities = set(self.entities)
+        self.custom_recognizers = {
+            name: recognizer for name, recognizer in custom_recognizers.items()
+            if entities.intersection(recognizer.supported_entities)
+        }
+        # The registry only holds the recognizers needed for the profile entities
+        self.analyzer = AnalyzerEngine(
+            registry=RecognizerRegistry(
+                recognizers=[recognizer for recognizer in registry.recognizers
+                             if entities.intersection(recognizer.supported_entities)],
+                global_regex_flags=registry.global_regex_flags,
+                supported_languages=[language]
+            ),
+            nlp_engine=nlp_engine,
+            supported_languages=[language]
+        )
+        # Same output as AnonymizerEngine.anonymize with the operators, in linear time in the number of entities
+        self.anonymizer = SinglePassAnonymizer(anonymizer_engine, self.operators)
+
+
+class CompiledPolicy:
+    """
+    An anonymization policy with all its profiles compiled: the default one, made of the entities and operators
+    at the top of the policy, and the named ones. A named profile without entities or operators has those of
+    the policy. The recognizers of the policy entities are built once, in a pruned registry shared by the profiles.
+    Compiled policies are never modified: a new version of the policy is a new CompiledPolicy.
+
+    :param version: digest of the policy document
+    :param document: validated policy document
+    :param ner_entities: entities that only the spaCy NER model can detect, skipped by the regex-only mode
+    :param nlp_engine: NLP engine shared by every policy, so that a new policy never loads the spaCy model again
+    :param anonymizer_engine: engine holding the registered operators
+    :param engine_fingerprint: digest of the configuration outside the policy that determines the output
+    :param language: language of the recognizers
+    """
+
+    def __init__(self, version: str, document: dict, ner_entities: List[str], nlp_engine: NlpEngine,
+                 anonymizer_engine: AnonymizerEngine, engine_fingerprint: str, language: str = "it"):
+        self.version = version
+        self.recognizers = [recognizer["name"] for recognizer in document.get("recognizers", [])]
+        word_lists = document.get("wordLists", {})
+
+        # Candidate words of all the custom recognizers are looked up in a single tokenization of the text
+        prefilter = CandidatePrefilter()
+        custom_recognizers = {
+            recognizer["name"]: LinearPatternRecognizer(
+                prefilter=prefilter,
+                candidate_check=_candidate_check(recognizer.get("candidates"), word_lists),
+                supported_entity=recognizer["entity"],
+                name=recognizer["name"],
+                patterns=[Pattern(name=recognizer.get("patternName", recognizer["name"]),
+                                  regex=_expand_word_lists(recognizer["regex"], word_lists),
+                                  score=recognizer["score"])],
+                supported_language=language,
+                context=word_lists.get(recognizer.get("context"))
+            )
+            for recognizer in document.get("recognizers", [])
+        }
+        registry = build_pruned_registry(entities=document["entities"], nlp_engine=nlp_engine,
+                                         custom_recognizers=custom_recognizers.values(), language=language)
+        detected_entities = {entity for recognizer in registry.recognizers for entity in recognizer.supported_entities}
+        missing_entities = sorted(set(document["entities"]) - detected_entities)
+        _check(not missing_entities, f"No recognizer detects the entities {missing_entities}")
+
+        definitions = {
+            DEFAULT_PROFILE: {"entities": document["entities"], "operators": document.get("operators", {})},
+            **document.get("profiles", {}),
+        }
+        self.profiles = {
+            name: CompiledProfile(
+                name=name,
+                entities=definition.get("entities", document["entities"]),
+                operators=definition.get("operators", document.get("operators", {})),
+                registry=registry,
+                custom_recognizers=custom_recognizers,
+                ner_entities=ner_entities,
+                nlp_engine=nlp_engine,
+                anonymizer_engine=anonymizer_engine,
+                # Changing the policy changes every cache key, so results of another policy are never reused
+                fingerprint=config_fingerprint(engine=engine_fingerprint, policy=document, profile=name),
+                language=language
+            )
+            for name, definition in definitions.items()
+        }
+
+    def profile(self, name: Optional[str] = None) -> CompiledProfile:
+        """
+        Returns the profile with the given name, or the default one. Raises ValueError for an unknown name.
+        """
+        profile = self.profiles.get(name or DEFAULT_PROFILE)
+        if profile is None:
+            raise ValueError(f"Unknown profile '{name}': use one of {sorted(self.profiles)}")
+        return profile
+
+
+class PolicyStore:
+    """
+    Holds the active anonymization policy, read from a file, and replaces it when the file changes.
+
+    Every reload_interval seconds, the first call to get() checks the file in a background thread, so no request
+    waits for it: a changed file is read, validated and compiled, then swapped in with a single assignment.
+    Requests keep the policy they started with, so a request is never served by two versions.
+    An invalid file is logged and ignored, the active policy stays in place.
+    The last cache_size compiled policies are kept by version, so switching back to a previous one is immediate.
+    Policies are compiled outside the lock, which only guards the swap, so info() never waits for a compilation.
+    Forked processes start without the background thread, which is created on demand.
+
+    :param compile_policy: returns the compiled policy of a validated document and its version
+    :param validate: raises PolicyError if a document is not valid
+    :param path: the policy file
+    :param reload_interval: seconds between the checks of the policy file, 0 to never check it
+    :param cache_size: number of compiled policies kept
+    """
+
+    def __init__(self, compile_policy: Callable[[dict, str], CompiledPolicy], validate: Callable[[Any], None],
+                 path: str, reload_interval: float = 0, cache_size: int = 4):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.cache_size = max(cache_size, 1)
+        self.loaded_at = None
+        self.current: Optional[CompiledPolicy] = None
+        self._compile_policy = compile_policy
+        self._validate = validate
+        self._compiled: "OrderedDict[str, CompiledPolicy]" = OrderedDict()
+        self._file_state = None
+        self._next_check = 0.0
+        self._checking = False
+        self._lock = threading.Lock()
+        # A thread checking the file when the process forks (e.g. a gunicorn worker forked from a preloaded master)
+        # doesn't exist in the child, which must not inherit its in-progress flag, or the lock if it held it
+        reference = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: reference() is not None and reference()._after_fork())
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._checking = False
+        self._next_check = 0.0
+
+    def get(self) -> CompiledPolicy:
+        """
+        Returns the active policy, loading it on the first call.
+        """
+        policy = self.current
+        if policy is None:
+            return self.reload()
+        if self.reload_interval > 0 and time.monotonic() >= self._next_check:
+            self._start_check()
+        return policy
+
+    def reload(self) -> CompiledPolicy:
+        """
+        Reads the policy file and activates it. Raises PolicyError if it can't, leaving the active policy in place.
+        """
+        start_time = time.perf_counter()
+        file_state = self._read_file_state()
+        # Set before validating: an invalid file is not checked again until it changes
+        self._file_state = file_state
+        document = read_policy_file(self.path)
+        version = policy_version(document)
+        with self._lock:
+            policy = self._compiled.get(version)
+        cached = policy is not None
+        if not cached:
+            self._validate(document)
+            policy = self._compile_policy(document, version)
+
+        with self._lock:
+            self._compiled[version] = policy
+            self._compiled.move_to_end(version)
+            while len(self._compiled) > self.cache_size:
+                self._compiled.popitem(last=False)
+            self._next_check = time.monotonic() + self.reload_interval
+            # A newer file read meanwhile (by a concurrent reload) wins
+            activated = self.current is not policy and self._file_state == file_state
+            if activated:
+                self.current = policy
+                self.loaded_at = datetime.now(timezone.utc)
+
+        if activated:
+            logger.info("Anonymization policy activated", extra={
+                "policyVersion": version,
+                "policyFile": self.path,
+                "cached": cached,
+                "loadTime": round((time.perf_counter() - start_time) * 1000, 3)
+            })
+        return policy
+
+    def _read_file_state(self) -> tuple:
+        # A file replaced or rewritten (e.g. a Kubernetes ConfigMap update) changes at least one of these
+        try:
+            file_stat = os.stat(self.path)
+        except OSError as e:
+            raise PolicyError(f"Can't read the policy file {self.path}: {e}") from e
+        return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+    def _start_check(self):
+        with self._lock:
+            if self._checking or time.monotonic() < self._next_check:
+                return
+            self._checking = True
+            self._next_check = time.monotonic() + self.reload_interval
+        try:
+            threading.Thread(target=self._check, name="policy-reload", daemon=True).start()
+        except Exception:
+            self._checking = False
+            raise
+
+    def _check(self):
+        try:
+            if self._read_file_state() != self._file_state:
+                self.reload()
+        except Exception as e:
+            # Not retried until the file changes again
+            logger.exception("Error reloading the anonymization policy, the active one is kept", extra={
+                "policyVersion": self.current.version,
+                "policyFile": self.path,
+                ERROR_MESSAGE: str(e),
+                ERROR_TYPE: type(e).__name__,
+                ERROR_STACK_TRACE: traceback.format_exc()
+            })
+        finally:
+            self._checking = False
+
+    def info(self) -> dict:
+        """
+        Returns the version, file and activation time of the active policy, with the entities of its default
+        profile, its custom recognizers and its profiles, and the versions of the compiled policies kept,
+        the most recently used last.
+        """
+        policy = self.get()
+        with self._lock:
+            compiled_versions = list(self._compiled)
+        return {
+            "version": policy.version,
+            "file": self.path,
+            "loadedAt": self.loaded_at.isoformat(timespec="seconds"),
+            "entities": policy.profile().entities,
+            "recognizers": policy.recognizers,
+            "profiles": [
+                {
+                    "name": name,
+                    "entities": profile.entities,
+                    "recognizers": [recognizer.name for recognizer in profile.analyzer.registry.recognizers],
+                }
+                for name, profile in policy.profiles.items()
+            ],
+            "compiledVersions": compiled_versions,
+        }
@@ -1,198 +1,401 @@
-import re
-from presidio_analyzer import Pattern, PatternRecognizer, AnalyzerEngine
-from presidio_analyzer.nlp_engine import NlpEngineProvider
-from presidio_anonymizer import AnonymizerEngine, OperatorConfig
-from src.utils import it_toponym, it_medical_info
-
-# Italian Address Recognizer
-# Matches common Italian street address formats.
-italian_address_patterns = [
-    Pattern(
-        name="Address (Type + Name + Number)",
-        regex="(" + "|".join(it_toponym) + ") +[A-ZÀ-Üa-zà-ü0-9'’\.\-\s]*,?\s*\d*[A-ZÀ-Üa-zà-ü0-9'’\.\-\s]*?",
-        score=0.9
-    ),
-]
-# Using "ITALIAN_ADDRESS" as entity type to clearly indicate its specificity.
-address_recognizer = PatternRecognizer(
-    supported_entity="ITALIAN_ADDRESS",
-    name="ItalianAddressRecognizer",
-    patterns=italian_address_patterns,
-    supported_language="it",  # This recognizer is for Italian
-    context=it_toponym  # Context words in Italian
-)
-
-# Italian Vehicle Plate Recognizer
-# Matches various Italian vehicle plate formats.
-plate_pattern = Pattern(name="IT_VEHICLE_PLATE_PATTERN",
-                        regex=r"\b([A-Za-z]{2} ?\d{3} ?[A-Za-z]{2}|\d{2} ?[A-Za-z]{2} ?\d{2}|[A-Za-z]{2} ?\d{5}|\d{2} ?[A-Za-z]{3} ?\d{2})\b",
-                        score=0.8)
-plate_recognizer = PatternRecognizer(patterns=[plate_pattern],
-                                     supported_entity="IT_VEHICLE_PLATE",
-                                     name="ItalianVehiclePlateRecognizer",
-                                     supported_language="it")  # This recognizer is for Italian
-
-# NAV (Numero Avviso) Recognizer
-# Matches a specific 18-digit number format.
-# nav_pattern = Pattern(name="NAV_PATTERN",
-#                       regex=r"\b[0-3]\d{17}\b",
-#                       score=0.85)
-# nav_recognizer = PatternRecognizer(patterns=[nav_pattern],
-#                                    supported_entity="NAV",
-#                                    name="NavRecognizer",
-#                                    supported_language="it") # This recognizer is for Italian
-
-# # IUV (Identificativo Univoco di Versamento - Unique Payment Identifier) Recognizer
-# # Matches a specific 17-digit number format.
-# iuv_pattern = Pattern(name="IUV_PATTERN",
-#                       regex=r"\b\d{17}\b", # Simplified from original, assuming it's exactly 17 digits
-#                       score=0.8)
-# iuv_recognizer = PatternRecognizer(patterns=[iuv_pattern],
-#                                    supported_entity="IUV",
-#                                    name="IuvRecognizer",
-#                                    supported_language="it") # This recognizer is for Italian
-
-# Medical Information Recognizer
-# This pattern is for Italian "visita medica".
-medical_patterns = [
-    Pattern(
-        name="MEDICAL_INFO_PATTERN",
-        regex=r"\W(" + "|".join(it_medical_info) + ")",
-        score=0.7
-    ),
-]
-medical_recognizer = PatternRecognizer(
-    supported_entity="MEDICAL_INFO",  # Generic entity for medical-related information
-    name="MedicalInfoRecognizer",
-    patterns=medical_patterns,
-    supported_language="it",  # This recognizer is for Italian
-    context=it_medical_info  # Context words in Italian
-)
+import os
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+from presidio_analyzer import RecognizerResult
+from presidio_analyzer.nlp_engine import NlpEngineProvider, NlpArtifacts
+from presidio_anonymizer import AnonymizerEngine
+from src.anonymization_policy import DEFAULT_POLICY_FILE, CompiledPolicy, CompiledProfile, PolicyStore, \
+    validate_policy
+from src.cache import build_result_cache, cache_key, config_fingerprint
+from src.coalescer import MicroBatchCoalescer
+from src.metrics import observe_input_size, observe_stage, record_entities, stage_timer
+from src.nlp_engine import TrimmedSpacyNlpEngine, parse_components
+from src.operators import NATIVE_OPERATORS
+from src.profiling import RecognizerProfiler
 
 # --- Presidio Configuration ---
 
 # 1. NLP Engine (spaCy)
 # Ensure you have the Italian model downloaded: python -m spacy download it_core_news_lg
 # If you plan to process English text, change "it" to "en" and use an English model like "en_core_web_lg".
+# The smaller it_core_news_sm / it_core_news_md models trade some PERSON recall for latency and memory.
+SPACY_MODEL_NAME = os.getenv("SPACY_MODEL_NAME", "it_core_news_lg")
+# Pipeline components not loaded at all: Presidio only needs the tokens, the lemmas and the entities.
+# The lemmas come from morphologizer, tagger, attribute_ruler and lemmatizer, the entities from ner.
+SPACY_EXCLUDED_COMPONENTS = parse_components(os.getenv("SPACY_EXCLUDED_COMPONENTS", "parser"))
 NLP_CONFIG = {
     "nlp_engine_name": "spacy",
-    "models": [{"lang_code": "it", "model_name": "it_core_news_lg"}]
+    "models": [{"lang_code": "it", "model_name": SPACY_MODEL_NAME, "exclude": SPACY_EXCLUDED_COMPONENTS}]
 }
-PROVIDER = NlpEngineProvider(nlp_configuration=NLP_CONFIG)
+PROVIDER = NlpEngineProvider(nlp_engines=(TrimmedSpacyNlpEngine,), nlp_configuration=NLP_CONFIG)
 NLP_ENGINE = PROVIDER.create_engine()
 
-# 2. Analyzer Engine
-ANALYZER = AnalyzerEngine(
+# Entities that only the spaCy NER model can detect
+NER_ENTITIES = ["PERSON", "LOCATION", "NRP"]
+
+# Per-recognizer profiling: every recognizer and the spaCy pipeline are timed, for all the requests or only for
+# those sending the profiling header (see RecognizerProfiler)
+PROFILER = RecognizerProfiler(enabled=os.getenv("ANONYMIZER_PROFILING_ENABLED", "false").lower() == "true")
+PROFILER.instrument_nlp_engine(NLP_ENGINE)
+
+# Texts analyzed together run the spaCy pipeline at once through `nlp.pipe`, this many at a time
+NLP_BATCH_SIZE = int(os.getenv("ANONYMIZER_NLP_BATCH_SIZE", "32"))
+
+# Empty NLP results, passed to the analyzer to skip the spaCy pipeline entirely.
+# Pattern and checksum recognizers don't need them and context enhancement is skipped without tokens.
+EMPTY_NLP_ARTIFACTS = NlpArtifacts(
+    entities=[],
+    tokens=[],
+    tokens_indices=[],
+    lemmas=[],
     nlp_engine=NLP_ENGINE,
-    supported_languages=["it"]  # Specify that the analyzer supports Italian
+    language="it"
 )
-# Add custom recognizers
-ANALYZER.registry.add_recognizer(address_recognizer)
-ANALYZER.registry.add_recognizer(plate_recognizer)
-# ANALYZER.registry.add_recognizer(nav_recognizer)
-# ANALYZER.registry.add_recognizer(iuv_recognizer)
-ANALYZER.registry.add_recognizer(medical_recognizer)
-# Presidio's default recognizers for "it" will also be active.
-
-# 3. Anonymizer Engine
+
+# 2. Anonymizer Engine
 ANONYMIZER = AnonymizerEngine()
 
-anonymize_keep_words_initials_lambda = lambda text: " ".join(
-    [
-        (word[0] + "*" * (len(word) - 1)) if word else ""
-        for word in str(text).split(' ')
-    ]
+# Native operators: registered once, parametrized in the policy operators instead of a custom lambda per entity type
+for native_operator in NATIVE_OPERATORS:
+    ANONYMIZER.add_anonymizer(native_operator)
+
+# 3. Anonymization policy
+# Entities, custom recognizers, word lists, operators and named profiles are read from a policy file (by default
+# default_policy.yaml). The recognizers of the policy entities are built once, and every profile is compiled into an
+# analyzer with those of its entities and an anonymizer. A changed file is compiled again and swapped in, sharing the
+# spaCy model and the engines above.
+# Digest of the configuration outside the policy that determines the anonymized output
+ENGINE_FINGERPRINT = config_fingerprint(
+    model=SPACY_MODEL_NAME,
+    excluded_components=SPACY_EXCLUDED_COMPONENTS,
+    native_operators={operator.__name__: operator.operate for operator in NATIVE_OPERATORS}
 )
 
-anonymize_fiscal_code_lambda = lambda text: (text[:8] + "*" * (len(text) - 8)) if text else ""
-
-anonymize_keep_first_3_char_lambda = lambda text: (text[:3] + "*" * (len(text) - 3)) if text else ""
-
-anonymize_keep_ends_2_char_lambda = lambda text: (text[:2] + "*" * (len(text) - 4) + text[-2:]) if text else ""
-
-anonymize_keep_only_alpha_lambda = lambda text: re.sub(r'[,.:\d]+', '', text).strip() if text else ""
-
-anonymize_keep_last_3_char_lambda = lambda text: ("*" * (len(text.replace(" ", "")) - 3) + text[-3:]) if text else ""
-
-anonymize_keep_last_4_char_lambda = lambda text: ("*" * (len(text.replace(" ", "")) - 4) + text[-4:]) if text else ""
-
-anonymize_keep_last_4_char_without_replacing_space_lambda = lambda text: (re.sub(r"\d", "*", text))[:-4] + text[
-                                                                                                           -4:] if text else ""
-
-anonymize_email_lambda = lambda text: str(text).split("@")[0][0] + "*" * (len(str(text).split("@")[0]) - 2) + \
-                                      str(text).split("@")[0][-1] + "@" + str(text).split("@")[-1] if text else ""
-
-anonymize_keep_first_five_and_last_four_lambda = lambda text: (
-        text[:5] + "*" * (len(text) - 9) + text[-4:]) if text else ""
-
-# 4. Anonymization Operators
-# Defines how recognized PII should be replaced.
-DEFAULT_OPERATORS = {
-    # "DEFAULT": OperatorConfig("custom", {"lambda": anonymize_keep_initials_lambda}),
-    "DEFAULT": OperatorConfig("replace", {"new_value": "<ANONYMIZED>"}),
-    # You can define specific operators for different entity types:
-    "PERSON": OperatorConfig("custom", {"lambda": anonymize_keep_words_initials_lambda}),
-    "ITALIAN_ADDRESS": OperatorConfig("custom", {"lambda": anonymize_keep_only_alpha_lambda}),
-    "IT_VEHICLE_PLATE": OperatorConfig("custom", {"lambda": anonymize_keep_first_3_char_lambda}),
-    # "NAV_NUMBER": OperatorConfig("replace", {"new_value": "<NAV>"}),
-    # "IUV_CODE": OperatorConfig("replace", {"new_value": "<IUV>"}),
-    "MEDICAL_INFO": OperatorConfig("custom", {"lambda": lambda _: ""}),
-    "EMAIL_ADDRESS": OperatorConfig("custom", {"lambda": anonymize_email_lambda}),
-    "PHONE_NUMBER": OperatorConfig("custom", {"lambda": anonymize_keep_last_4_char_lambda}),
-    "IT_FISCAL_CODE": OperatorConfig("custom", {"lambda": anonymize_fiscal_code_lambda}),
-    "IT_DRIVER_LICENSE": OperatorConfig("custom", {"lambda": anonymize_keep_ends_2_char_lambda}),
-    "IT_IDENTITY_CARD": OperatorConfig("custom", {"lambda": anonymize_keep_ends_2_char_lambda}),
-    "IT_PASSPORT": OperatorConfig("custom", {"lambda": anonymize_keep_ends_2_char_lambda}),
-    "IT_VAT_CODE": OperatorConfig("custom", {"lambda": anonymize_keep_last_3_char_lambda}),
-    "CREDIT_CARD": OperatorConfig("custom", {"lambda": anonymize_keep_last_4_char_without_replacing_space_lambda}),
-    "IBAN_CODE": OperatorConfig("custom", {"lambda": anonymize_keep_first_five_and_last_four_lambda}),
-    "CRYPTO": OperatorConfig("custom", {"lambda": anonymize_keep_last_3_char_lambda})
-}
 
-# 5. Entities to target for anonymization
-# This list includes Presidio's built-in entities for Italian and your custom ones.
-ENTITIES_TO_ANONYMIZE = [
-    # Presidio built-in (many are language-agnostic or have 'it' versions)
-    "PERSON",
-    "EMAIL_ADDRESS",
-    "PHONE_NUMBER",
-    "CREDIT_CARD",  # Language agnostic
-    "IBAN_CODE",  # Language agnostic, but format can be country specific
-    # "URL",         # Language agnostic
-    # "DATE_TIME",   # Language agnostic but recognizes formats common in the language
-    "CRYPTO",  # Language agnostic
-    # "NRP",         # National Registration P. (general, may need specific IT)
-    # "LOCATION",
-
-    # Presidio Italian-specific built-in
-    "IT_FISCAL_CODE",
-    "IT_VAT_CODE",  # Presidio uses IT_VAT_CODE
-    "IT_DRIVER_LICENSE",
-    "IT_PASSPORT",
-    "IT_IDENTITY_CARD",
-
-    # custom entities (ensure names match `supported_entity` in recognizers)
-    "ITALIAN_ADDRESS",
-    "IT_VEHICLE_PLATE",
-    # "NAV",
-    # "IUV",
-    "MEDICAL_INFO"
-]
-
-
-def anonymize_text_with_presidio(text_to_anonymize: str) -> str:
-    """
-    Anonymizes the input text using the configured Presidio Analyzer and Anonymizer.
+def _compile_policy(document: dict, version: str) -> CompiledPolicy:
+    policy = CompiledPolicy(
+        version=version,
+        document=document,
+        ner_entities=NER_ENTITIES,
+        nlp_engine=NLP_ENGINE,
+        anonymizer_engine=ANONYMIZER,
+        engine_fingerprint=ENGINE_FINGERPRINT,
+        language="it"
+    )
+    for profile in policy.profiles.values():
+        PROFILER.instrument_recognizers(profile.analyzer.registry.recognizers)
+    return policy
+
+
+POLICY_STORE = PolicyStore(
+    compile_policy=_compile_policy,
+    validate=lambda document: validate_policy(document, ANONYMIZER),
+    path=os.getenv("ANONYMIZER_POLICY_FILE") or DEFAULT_POLICY_FILE,
+    reload_interval=float(os.getenv("ANONYMIZER_POLICY_RELOAD_SECONDS", "30")),
+    cache_size=int(os.getenv("ANONYMIZER_POLICY_CACHE_SIZE", "4"))
+)
+# Loaded right away: the service doesn't start with an invalid policy
+POLICY_STORE.reload()
+
+
+def current_policy() -> CompiledPolicy:
+    """
+    Returns the active anonymization policy. A request should read it once and use it throughout.
+    """
+    return POLICY_STORE.get()
+
+
+def current_profile(name: Optional[str] = None) -> CompiledProfile:
+    """
+    Returns a profile of the active anonymization policy, the default one without a name.
+    Raises ValueError if the policy has no profile with that name.
+    """
+    return current_policy().profile(name)
+
+
+def policy_info() -> dict:
+    """
+    Returns the version and the content summary of the active anonymization policy of this process.
+    """
+    return POLICY_STORE.info()
+
+
+def reload_policy() -> dict:
+    """
+    Reads the policy file again and activates it in this process, raising PolicyError if it is not valid.
+    """
+    POLICY_STORE.reload()
+    return POLICY_STORE.info()
+
+
+# 4. Result cache
+# Optional cache of the anonymized texts, keyed by a digest of the text, the mode and the profile fingerprint.
+RESULT_CACHE = build_result_cache(
+    enabled=os.getenv("ANONYMIZER_CACHE_ENABLED", "false").lower() == "true",
+    max_entries=int(os.getenv("ANONYMIZER_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("ANONYMIZER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("ANONYMIZER_CACHE_TTL_SECONDS", "3600")),
+    redis_url=os.getenv("ANONYMIZER_CACHE_REDIS_URL"),
+    redis_timeout=int(os.getenv("ANONYMIZER_CACHE_REDIS_TIMEOUT_MS", "50")) / 1000
+)
+
+
+class AnonymizationMode(str, Enum):
+    # Pattern recognizers and spaCy NER
+    FULL = "full"
+    # Pattern and checksum recognizers only, without running the spaCy pipeline
+    REGEX = "regex"
+
+
+def analyze_text(text_to_analyze: str, mode: AnonymizationMode = AnonymizationMode.FULL,
+                 profile: Optional[CompiledProfile] = None) -> List[RecognizerResult]:
+    """
+    Detects the PII entities in the input text, with the given profile or else the default one of the active
+    policy.
+    In regex mode the spaCy pipeline is skipped, so entities that need NER (e.g. PERSON) are not detected.
+    Profiles without such entities always skip it.
+    """
+    profile = profile or current_profile()
+    if mode == AnonymizationMode.REGEX or not profile.ner_entities:
+        entities = profile.regex_entities
+        nlp_artifacts = EMPTY_NLP_ARTIFACTS
+    else:
+        entities = profile.entities
+        # Run here rather than inside the analyzer, so its time is measured apart from the recognizers'
+        with stage_timer("nlp"):
+            nlp_artifacts = NLP_ENGINE.process_text(text_to_analyze, "it")
+    with stage_timer("recognizers"):
+        analyzer_results = profile.analyzer.analyze(
+            text=text_to_analyze,
+            entities=entities,
+            language="it",  # Crucial to specify the language of the text
+            nlp_artifacts=nlp_artifacts
+        )
+    record_entities(analyzer_results)
+    return analyzer_results
+
+
+def _analyze_batch(texts_to_analyze: List[str], profile: CompiledProfile) -> List[List[RecognizerResult]]:
+    # Full mode analysis of many texts, running the spaCy pipeline over all of them at once through `nlp.pipe`
+    nlp_time = recognizers_time = 0.0
+    nlp_artifacts_batch = NLP_ENGINE.process_batch(texts=texts_to_analyze, language="it", batch_size=NLP_BATCH_SIZE)
+    batch_analyzer_results = []
+    for text_to_analyze in texts_to_analyze:
+        start_time = time.perf_counter()
+        _, nlp_artifacts = next(nlp_artifacts_batch)
+        nlp_end_time = time.perf_counter()
+        analyzer_results = profile.analyzer.analyze(
+            text=text_to_analyze,
+            entities=profile.entities,
+            language="it",
+            nlp_artifacts=nlp_artifacts
+        )
+        nlp_time += nlp_end_time - start_time
+        recognizers_time += time.perf_counter() - nlp_end_time
+        record_entities(analyzer_results)
+        batch_analyzer_results.append(analyzer_results)
+    observe_stage("nlp", nlp_time)
+    observe_stage("recognizers", recognizers_time)
+    return batch_analyzer_results
+
+
+def result_cache_stats() -> dict:
+    """
+    Returns the counters of the result cache of this process.
+    """
+    if RESULT_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **RESULT_CACHE.stats()}
+
+
+def profiling_stats() -> dict:
+    """
+    Returns the time spent by each recognizer and by the spaCy pipeline in this process, with profiling on.
+    """
+    return {"enabled": PROFILER.enabled, "components": PROFILER.stats()}
+
+
+def reset_profiling_stats() -> dict:
+    """
+    Returns the profiling statistics of this process and starts collecting them again.
+    """
+    stats = profiling_stats()
+    PROFILER.reset()
+    return stats
+
+
+def set_request_profiling(active: bool):
+    """
+    Turns profiling on or off for the request served by the current thread.
+    """
+    PROFILER.set_request_profiling(active)
+
+
+def _result_cache_key(text: str, mode: AnonymizationMode, profile: CompiledProfile) -> str:
+    return cache_key(profile.fingerprint, AnonymizationMode(mode).value, text)
+
+
+def _analyze_texts(texts_to_analyze: List[str], mode: AnonymizationMode,
+                   profile: CompiledProfile) -> List[List[RecognizerResult]]:
+    if mode == AnonymizationMode.REGEX or not profile.ner_entities:
+        return [analyze_text(text, mode, profile) for text in texts_to_analyze]
+    return _analyze_batch(texts_to_analyze, profile)
+
+
+def _anonymize_texts(texts_to_anonymize: List[str], mode: AnonymizationMode,
+                     profile: Optional[CompiledProfile] = None) -> List[str]:
+    # Uncached batch anonymization, shared by the batch API and the request coalescer
+    if not texts_to_anonymize:
+        return []
+    profile = profile or current_profile()
+    batch_analyzer_results = _analyze_texts(texts_to_anonymize, mode, profile)
+    with stage_timer("anonymization"):
+        return [
+            profile.anonymizer.anonymize(text_to_anonymize, analyzer_results)
+            for text_to_anonymize, analyzer_results in zip(texts_to_anonymize, batch_analyzer_results)
+        ]
+
+
+def _anonymize_coalesced(items: List[Tuple[CompiledProfile, str]]) -> List[str]:
+    # Coalesced texts keep the profile of their request: a batch mixing profiles, or straddling a policy swap,
+    # is split by profile
+    indexes_by_profile = {}
+    for index, (profile, _) in enumerate(items):
+        indexes_by_profile.setdefault(profile, []).append(index)
+    anonymized_texts = [None] * len(items)
+    for profile, indexes in indexes_by_profile.items():
+        texts = [items[index][1] for index in indexes]
+        for index, anonymized_text in zip(indexes, _anonymize_texts(texts, AnonymizationMode.FULL, profile)):
+            anonymized_texts[index] = anonymized_text
+    return anonymized_texts
+
+
+def warm_up(texts: List[str]):
+    """
+    Runs the texts through every analysis path, bypassing the result cache and the request coalescer, so that the
+    lazy initializations of spaCy and of the recognizers are not paid by the first requests. The spaCy pipeline is
+    shared by every profile, so the named profiles only run their recognizers, in regex mode.
+    """
+    policy = current_policy()
+    profile = policy.profile()
+    for mode in AnonymizationMode:
+        _anonymize_texts(texts, mode, profile)
+    for text in texts:
+        profile.anonymizer.anonymize(text, analyze_text(text, profile=profile))
+    for named_profile in policy.profiles.values():
+        if named_profile is not profile:
+            _anonymize_texts(texts, AnonymizationMode.REGEX, named_profile)
+
+
+# 5. Request coalescing
+# Optional micro-batching of the concurrent single-text requests in full mode (see MicroBatchCoalescer).
+COALESCER = MicroBatchCoalescer(
+    process_batch=_anonymize_coalesced,
+    max_batch_size=int(os.getenv("ANONYMIZER_COALESCING_MAX_BATCH_SIZE", "16")),
+    max_wait=int(os.getenv("ANONYMIZER_COALESCING_MAX_WAIT_MS", "5")) / 1000
+) if os.getenv("ANONYMIZER_COALESCING_ENABLED", "false").lower() == "true" else None
+
+
+def coalescer_stats() -> dict:
+    """
+    Returns the batch sizes observed by the request coalescer of this process.
+    """
+    if COALESCER is None:
+        return {"enabled": False}
+    return {"enabled": True, **COALESCER.stats()}
+
+
+def anonymize_text_with_presidio(text_to_anonymize: str, mode: AnonymizationMode = AnonymizationMode.FULL,
+                                 profile: Optional[CompiledProfile] = None) -> str:
+    """
+    Anonymizes the input text using the analyzer and the operators of the given profile, or else of the default
+    profile of the active policy.
     The current configuration is primarily for Italian text.
+    When the result cache is enabled, a text already anonymized with the same mode and profile is not analyzed
+    again.
+    When request coalescing is enabled, texts in full mode are analyzed together with the concurrent requests.
     """
-    analyzer_results = ANALYZER.analyze(
-        text=text_to_anonymize,
-        entities=ENTITIES_TO_ANONYMIZE,
-        language="it"  # Crucial to specify the language of the text
-    )
-    anonymized_result = ANONYMIZER.anonymize(
-        text=text_to_anonymize,
-        analyzer_results=analyzer_results,
-        operators=DEFAULT_OPERATORS
-    )
-    return anonymized_result.text
+    observe_input_size(text_to_anonymize)
+    profile = profile or current_profile()
+    key = None
+    if RESULT_CACHE is not None:
+        key = _result_cache_key(text_to_anonymize, mode, profile)
+        cached_text = RESULT_CACHE.get(key)
+        if cached_text is not None:
+            return cached_text
+
+    if COALESCER is not None and mode == AnonymizationMode.FULL:
+        anonymized_text = COALESCER.submit((profile, text_to_anonymize))
+    else:
+        analyzer_results = analyze_text(text_to_anonymize, mode, profile)
+        with stage_timer("anonymization"):
+            anonymized_text = profile.anonymizer.anonymize(text_to_anonymize, analyzer_results)
+    if key is not None:
+        RESULT_CACHE.set(key, anonymized_text)
+    return anonymized_text
+
+
+def anonymize_texts_with_presidio(texts_to_anonymize: List[str],
+                                  mode: AnonymizationMode = AnonymizationMode.FULL,
+                                  profile: Optional[CompiledProfile] = None) -> List[str]:
+    """
+    Anonymizes a list of texts with the given profile, or else the default one of the active policy, returning the
+    anonymized texts in the same order.
+    All texts go through the spaCy pipeline together (`nlp.pipe`), which is much
+    cheaper than calling `anonymize_text_with_presidio` once per text.
+    When the result cache is enabled, only the texts not found in the cache are analyzed.
+    """
+    for text in texts_to_anonymize:
+        observe_input_size(text)
+    profile = profile or current_profile()
+    keys = [None] * len(texts_to_anonymize)
+    anonymized_texts = [None] * len(texts_to_anonymize)
+    if RESULT_CACHE is not None:
+        keys = [_result_cache_key(text, mode, profile) for text in texts_to_anonymize]
+        anonymized_texts = [RESULT_CACHE.get(key) for key in keys]
+
+    missing_indexes = [index for index, text in enumerate(anonymized_texts) if text is None]
+    missing_texts = [texts_to_anonymize[index] for index in missing_indexes]
+    for index, anonymized_text in zip(missing_indexes, _anonymize_texts(missing_texts, mode, profile)):
+        anonymized_texts[index] = anonymized_text
+        if keys[index] is not None:
+            RESULT_CACHE.set(keys[index], anonymized_text)
+    return anonymized_texts
+
+
+def anonymize_texts_with_spans(texts_to_anonymize: List[str],
+                               mode: AnonymizationMode = AnonymizationMode.FULL,
+                               profile: Optional[CompiledProfile] = None) -> List[Tuple[str, Dict[str, list]]]:
+    """
+    Anonymizes a list of texts like `anonymize_texts_with_presidio`, returning for each one the anonymized text
+    and the spans it replaced in columnar form (see SinglePassAnonymizer.spans).
+    Spans are not kept by the result cache, so these texts are always analyzed.
+    """
+    for text in texts_to_anonymize:
+        observe_input_size(text)
+    if not texts_to_anonymize:
+        return []
+    profile = profile or current_profile()
+    batch_analyzer_results = _analyze_texts(texts_to_anonymize, mode, profile)
+    with stage_timer("anonymization"):
+        return [
+            profile.anonymizer.anonymize_with_spans(text_to_anonymize, analyzer_results)
+            for text_to_anonymize, analyzer_results in zip(texts_to_anonymize, batch_analyzer_results)
+        ]
+
+
+def analyze_texts_with_presidio(texts_to_analyze: List[str], mode: AnonymizationMode = AnonymizationMode.FULL,
+                                profile: Optional[CompiledProfile] = None) -> List[Dict[str, list]]:
+    """
+    Detects the entities of a list of texts without anonymizing them, returning for each text the spans that
+    would be anonymized in columnar form (see SinglePassAnonymizer.spans). No operator is run.
+    """
+    for text in texts_to_analyze:
+        observe_input_size(text)
+    if not texts_to_analyze:
+        return []
+    profile = profile or current_profile()
+    batch_analyzer_results = _analyze_texts(texts_to_analyze, mode, profile)
+    return [profile.anonymizer.spans(text, analyzer_results)
+            for text, analyzer_results in zip(texts_to_analyze, batch_analyzer_results)]
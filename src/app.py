@@ -3,26 +3,106 @@ import traceback
 import json
 import time
 import uuid
+from itertools import count
 from http import HTTPStatus
-from flask import current_app, make_response, g
+from typing import Any, Dict, List, Optional
+from flask import current_app, make_response, g, request, stream_with_context
 from flask_openapi3 import OpenAPI, Info, Tag, Server, ServerVariable
 from pydantic import BaseModel, Field, ValidationError
 from flask.wrappers import Response as FlaskResponse
-from configparser import ConfigParser
-from src.anonymizer_logic import anonymize_text_with_presidio
+from src.anonymization_policy import PolicyError
+from src.anonymizer_logic import anonymize_text_with_presidio, anonymize_texts_with_presidio, AnonymizationMode, \
+    result_cache_stats, coalescer_stats, profiling_stats, reset_profiling_stats, set_request_profiling, \
+    policy_info, reload_policy, current_profile, anonymize_texts_with_spans, analyze_texts_with_presidio
+from src.json_anonymizer import JsonPolicies, anonymize_json
+from src.logging_setup import LEAN_LOGGING
+from src.metrics import observe_stage, render_metrics, request_entity_count, request_finished, request_started
+from src.service_info import SERVICE_INFO
+from src.streaming import anonymize_stream, chunks_to_ndjson, read_ndjson_texts, read_text_blocks, \
+    StreamFormatError
 from functools import wraps
 
 ERROR_MESSAGE = "error.message"
 ERROR_TYPE = "error.type"
 ERROR_STACK_TRACE = "error.stack_trace"
+ANONYMIZE_BATCH_MAX_TEXTS = int(os.getenv("ANONYMIZE_BATCH_MAX_TEXTS", "1000"))
+STREAM_CHUNK_SIZE = int(os.getenv("ANONYMIZE_STREAM_CHUNK_SIZE", "5000"))
+STREAM_OVERLAP = int(os.getenv("ANONYMIZE_STREAM_OVERLAP", "200"))
+STREAM_READ_SIZE = int(os.getenv("ANONYMIZE_STREAM_READ_SIZE", "65536"))
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Requests sending this header with value "true" are profiled even when profiling is not always on
+PROFILING_HEADER = "X-Anonymizer-Profiling"
+# Anonymization profile of the request, when the body doesn't name one
+PROFILE_HEADER = "X-Anonymizer-Profile"
+# Probe calls (/info, /ready) are logged one out of every APP_PROBE_LOG_EVERY, never when 0
+PROBE_LOG_EVERY = int(os.getenv("APP_PROBE_LOG_EVERY", "100"))
+MODE_DESCRIPTION = ("Detection mode: 'full' uses pattern recognizers and spaCy NER, "
+                    "'regex' only uses pattern and checksum recognizers (no PERSON detection) and is much faster")
+SPANS_DESCRIPTION = "Whether to return the spans of the anonymized entities, with offsets in the original text"
+PROFILE_DESCRIPTION = (f"Anonymization profile of the policy: which entities are detected and how they are "
+                       f"anonymized. When missing, the {PROFILE_HEADER} header or else the default profile")
 
 
 class AnonymizeRequest(BaseModel):
     text: str = Field(..., description="Text to be anonymized")
+    mode: AnonymizationMode = Field(AnonymizationMode.FULL, description=MODE_DESCRIPTION)
+    profile: Optional[str] = Field(None, description=PROFILE_DESCRIPTION)
+    spans: bool = Field(False, description=SPANS_DESCRIPTION)
+
+
+class EntitySpans(BaseModel):
+    type: List[str] = Field(..., description="Entity type of each span")
+    start: List[int] = Field(..., description="Offset of the first character of each span in the original text")
+    end: List[int] = Field(..., description="Offset after the last character of each span in the original text")
+    score: List[float] = Field(..., description="Detection confidence of each span")
+    operator: List[str] = Field(..., description="Operator anonymizing each span")
 
 
 class AnonymizeResponse(BaseModel):
     text: str = Field(..., description="Anonymized text")
+    spans: Optional[EntitySpans] = Field(
+        None, description="Only when requested: the anonymized entities, one item of each list per entity")
+
+
+class AnonymizeBatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=ANONYMIZE_BATCH_MAX_TEXTS, description="Texts to be anonymized")
+    mode: AnonymizationMode = Field(AnonymizationMode.FULL, description=MODE_DESCRIPTION)
+    profile: Optional[str] = Field(None, description=PROFILE_DESCRIPTION)
+    spans: bool = Field(False, description=SPANS_DESCRIPTION)
+
+
+class AnonymizeBatchResponse(BaseModel):
+    texts: List[str] = Field(..., description="Anonymized texts, in the same order as the request")
+    spans: Optional[List[EntitySpans]] = Field(
+        None, description="Only when requested: the anonymized entities of each text, in the same order")
+
+
+class AnalyzeRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=ANONYMIZE_BATCH_MAX_TEXTS, description="Texts to be analyzed")
+    mode: AnonymizationMode = Field(AnonymizationMode.FULL, description=MODE_DESCRIPTION)
+    profile: Optional[str] = Field(None, description=PROFILE_DESCRIPTION)
+
+
+class AnalyzeResponse(BaseModel):
+    spans: List[EntitySpans] = Field(
+        ..., description="Entities that would be anonymized in each text, in the same order as the request")
+
+
+class AnonymizeJsonRequest(BaseModel):
+    document: Any = Field(..., description="JSON document whose string fields are to be anonymized")
+    policies: Dict[str, str] = Field(
+        {}, description="Policy by JSON path (e.g. '$.debtor.fiscalCode', '$.positions[*].description'): 'skip', "
+                        "'regex', 'full' or an entity type like 'IT_FISCAL_CODE', anonymizing the whole field as "
+                        "that entity without running any detection")
+    defaultPolicy: str = Field("full", description="Policy of the string fields not matched by any path")
+
+
+class AnonymizeJsonResponse(BaseModel):
+    document: Any = Field(..., description="Anonymized JSON document")
+
+
+class AnonymizeStreamQuery(BaseModel):
+    mode: AnonymizationMode = Field(AnonymizationMode.FULL, description=MODE_DESCRIPTION)
 
 
 class InfoResponse(BaseModel):
@@ -31,12 +111,87 @@ class InfoResponse(BaseModel):
     environment: str
 
 
+class ReadyResponse(BaseModel):
+    status: str = Field(..., description="'ready' once the engines are loaded and warm, "
+                                         "otherwise (with 503) 'loading', 'warming' or 'failed'")
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether the result cache is enabled")
+    hits: Optional[int] = Field(None, description="Texts found in the local cache")
+    misses: Optional[int] = Field(None, description="Texts not found (or expired) in the local cache")
+    evictions: Optional[int] = Field(None, description="Results removed to stay within the size limits")
+    expirations: Optional[int] = Field(None, description="Results found expired")
+    entries: Optional[int] = Field(None, description="Results currently cached")
+    bytes: Optional[int] = Field(None, description="Size of the results currently cached")
+    sharedHits: Optional[int] = Field(None, description="Local misses found in the shared cache")
+    sharedMisses: Optional[int] = Field(None, description="Local misses not found in the shared cache")
+    sharedErrors: Optional[int] = Field(None, description="Failed shared cache operations")
+
+
+class CoalescerStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether request coalescing is enabled")
+    batches: Optional[int] = Field(None, description="Batches processed")
+    items: Optional[int] = Field(None, description="Texts processed")
+    meanBatchSize: Optional[float] = Field(None, description="Mean number of texts per batch")
+    batchSizes: Optional[Dict[str, int]] = Field(None, description="Number of batches processed per batch size")
+
+
+class ComponentProfile(BaseModel):
+    name: str = Field(..., description="Recognizer name, or 'spacy' for the spaCy pipeline")
+    calls: int = Field(..., description="Profiled calls")
+    totalTime: float = Field(..., description="Cumulative time of the profiled calls, in milliseconds")
+    meanTime: float = Field(..., description="Mean time of a call, in milliseconds")
+    results: int = Field(..., description="Entities returned by the profiled calls")
+
+
+class ProfilingStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether every request is profiled, not only those sending the header")
+    components: List[ComponentProfile] = Field(
+        ..., description="Profile of each recognizer and of the spaCy pipeline, the slowest first")
+
+
+class ProfileInfo(BaseModel):
+    name: str = Field(..., description="Profile name, 'default' for the entities and operators of the policy")
+    entities: List[str] = Field(..., description="Entities anonymized by the profile")
+    recognizers: List[str] = Field(..., description="Recognizers compiled for the profile, built-in ones included")
+
+
+class PolicyResponse(BaseModel):
+    version: str = Field(..., description="Version of the active anonymization policy, a digest of its content")
+    file: str = Field(..., description="Policy file")
+    loadedAt: str = Field(..., description="When the policy was activated, in ISO 8601 format")
+    entities: List[str] = Field(..., description="Entities anonymized by the policy")
+    recognizers: List[str] = Field(..., description="Custom recognizers defined by the policy")
+    profiles: List[ProfileInfo] = Field(..., description="Profiles of the policy, each with its own recognizers")
+    compiledVersions: List[str] = Field(
+        ..., description="Versions of the compiled policies kept in memory, the most recently used last")
+
+
 class ErrorResponse(BaseModel):
     error: str
 
 
+# Required field reported when the request body is not even a JSON object
+REQUIRED_FIELD_BY_MODEL = {
+    AnonymizeRequest.__name__: "text",
+    AnonymizeBatchRequest.__name__: "texts",
+    AnonymizeJsonRequest.__name__: "document",
+    AnalyzeRequest.__name__: "texts",
+}
+
+
 def validation_error_callback(e: ValidationError) -> FlaskResponse:
-    validation_error_object = ErrorResponse(error="Missing required field 'text'")
+    error = next((error for error in e.errors() if error.get("loc")), None)
+    if error is None:
+        message = f"Missing required field '{REQUIRED_FIELD_BY_MODEL.get(e.title, 'text')}'"
+    elif error["type"] == "missing":
+        message = f"Missing required field '{error['loc'][0]}'"
+    else:
+        # e.g. "Invalid field 'texts.1': Input should be a valid string"
+        field = ".".join(str(location) for location in error["loc"])
+        message = f"Invalid field '{field}': {error['msg']}"
+    validation_error_object = ErrorResponse(error=message)
     response = make_response(validation_error_object.model_dump_json())
     response.headers["Content-Type"] = "application/json"
     response.status_code = getattr(current_app, "validation_error_status", HTTPStatus.BAD_REQUEST)
@@ -47,6 +202,10 @@ def validation_error_callback(e: ValidationError) -> FlaskResponse:
 info = Info(title="Anonymizer API", version="1.0.0")
 info_tag = Tag(name="Info", description="Liveness & readiness endpoints")
 anonymize_tag = Tag(name="Anonymize", description="Text anonymization endpoints")
+analyze_tag = Tag(name="Analyze", description="Entity detection endpoints, without anonymization")
+# The operational endpoints are left out of the OpenAPI spec (doc_ui=False): the spec is imported in APIM,
+# and they must only be reachable inside the cluster
+admin_tag = Tag(name="Admin", description="Operational endpoints")
 
 api_key = {
     "type": "apiKey",
@@ -85,6 +244,21 @@ app = OpenAPI(
 )
 
 
+@app.before_request
+def start_request_timer():
+    g.request_start_time = time.perf_counter()
+    set_request_profiling(request.headers.get(PROFILING_HEADER, "").lower() == "true")
+
+
+@app.after_request
+def observe_serialization_time(response: FlaskResponse) -> FlaskResponse:
+    # The dict returned by the endpoint is turned into the JSON response between the view and this hook
+    view_end_time = g.get("view_end_time")
+    if view_end_time is not None:
+        observe_stage("serialization", time.perf_counter() - view_end_time)
+    return response
+
+
 def serialize_kwargs(kwargs):
     serialized = {}
     for k, v in kwargs.items():
@@ -97,6 +271,27 @@ def serialize_kwargs(kwargs):
     return json.dumps(serialized)
 
 
+def text_size(value: Any) -> int:
+    # Characters of the strings of a JSON value, without serializing it
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(text_size(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(text_size(item) for item in value)
+    return 0
+
+
+def response_log_fields(body) -> dict:
+    # Streamed responses are sent after the operation is logged and never logged
+    if isinstance(body, FlaskResponse) or not body:
+        return {"response": "{}"}
+    if LEAN_LOGGING:
+        return {"requestSize": request.content_length, "responseSize": text_size(body),
+                "entities": request_entity_count()}
+    return {"response": json.dumps(body)}
+
+
 # Wrap API method to log execution metadata
 def execution_logging_decorator(method_name: str):
     def decorator(func):
@@ -113,6 +308,11 @@ def execution_logging_decorator(method_name: str):
                 The result of the original function, typically a (body, status_code) tuple.
             """
             start_time_ms = int(time.time() * 1000)
+            start_time = time.perf_counter()
+            # Time spent reading and validating the request before reaching the endpoint
+            if "request_start_time" in g:
+                observe_stage("parse", start_time - g.request_start_time)
+            request_started(method_name)
             request_id = str(uuid.uuid4())
             operation_id = str(uuid.uuid4())
 
@@ -143,7 +343,7 @@ def execution_logging_decorator(method_name: str):
                         "responseTime": response_time,
                         "status": "OK",
                         "httpCode": 200,
-                        "response": "{}" if not body else json.dumps(body)
+                        **response_log_fields(body)
                     })
                 else:
                     error = body.get("error")
@@ -155,9 +355,12 @@ def execution_logging_decorator(method_name: str):
                         "faultDetail": error
                     })
 
+                g.view_end_time = time.perf_counter()
+                request_finished(method_name, status_code, g.view_end_time - start_time)
                 return response
 
             except Exception as e:
+                request_finished(method_name, 500, time.perf_counter() - start_time)
                 app.logger.exception("Failed API operation %s", method_name, extra={
                     **g.extra_fields,
                     "status": "KO",
@@ -172,6 +375,33 @@ def execution_logging_decorator(method_name: str):
     return decorator
 
 
+# Probe endpoints: no request ids, metrics or log lines, except for the sampled calls
+def probe_logging_decorator(method_name: str):
+    def decorator(func):
+        calls = count(1)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROBE_LOG_EVERY or next(calls) % PROBE_LOG_EVERY:
+                return func(*args, **kwargs)
+
+            start_time = time.perf_counter()
+            response = func(*args, **kwargs)
+            status_code = response[1]
+            app.logger.info("Probe %s", method_name, extra={
+                "method": method_name,
+                "responseTime": int((time.perf_counter() - start_time) * 1000),
+                "status": "OK" if status_code == 200 else "KO",
+                "httpCode": status_code,
+                "sampledCalls": PROBE_LOG_EVERY
+            })
+            return response
+
+        return wrapper
+
+    return decorator
+
+
 @app.get(
     '/info',
     tags=[info_tag],
@@ -180,23 +410,256 @@ def execution_logging_decorator(method_name: str):
         HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
     },
     summary="Get application info",
-    description="Liveness & readiness endpoint. Returns application name, version, and environment.",
+    description="Liveness endpoint, answering while the engines are still loading. "
+                "Returns application name, version, and environment.",
     security=security
 )
-@execution_logging_decorator("info")
+@probe_logging_decorator("info")
 def info():
     """
-    GET endpoint for liveness & readiness
+    GET endpoint for liveness, serving the service info read at startup
+    """
+    if SERVICE_INFO is None:
+        return {"error": "An internal server error occurred"}, 500
+    return SERVICE_INFO, 200
+
+
+@app.get(
+    '/ready',
+    tags=[info_tag],
+    responses={
+        HTTPStatus.OK: ReadyResponse,
+        HTTPStatus.SERVICE_UNAVAILABLE: ReadyResponse,
+    },
+    summary="Get application readiness",
+    description="Readiness endpoint. Answers 503 until the spaCy model and the Presidio engines are loaded and "
+                "warmed up in the background (see src/warmup.py), then 200.",
+    security=security
+)
+@probe_logging_decorator("ready")
+def ready():
+    """
+    GET endpoint for readiness: the loading application answers 503 by itself, so reaching it means it is ready
+    """
+    return {"status": "ready"}, 200
+
+
+@app.get(
+    '/admin/cache',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: CacheStatsResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Get result cache statistics",
+    description="Returns the hit, miss and eviction counters of the result cache of the worker serving the request.",
+    security=security
+)
+@execution_logging_decorator("cache_stats")
+def cache_stats():
+    """
+    GET endpoint for the result cache counters
+    """
+    try:
+        return result_cache_stats(), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /admin/cache endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.get(
+    '/admin/coalescer',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: CoalescerStatsResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Get request coalescer statistics",
+    description="Returns the batch sizes observed by the request coalescer of the worker serving the request.",
+    security=security
+)
+@execution_logging_decorator("coalescer_stats")
+def coalescer_stats_endpoint():
+    """
+    GET endpoint for the request coalescer batch sizes
+    """
+    try:
+        return coalescer_stats(), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /admin/coalescer endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.get(
+    '/admin/profiling',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: ProfilingStatsResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Get recognizer profiling statistics",
+    description="Returns the calls, cumulative and mean time and number of results of each recognizer and of the "
+                "spaCy pipeline, for the profiled requests served by the worker serving this one. Requests are "
+                "profiled when ANONYMIZER_PROFILING_ENABLED is true or when they send the "
+                f"{PROFILING_HEADER}: true header. Only timings and counts are collected, never any text.",
+    security=security
+)
+@execution_logging_decorator("profiling_stats")
+def profiling_stats_endpoint():
+    """
+    GET endpoint for the recognizer profiling statistics
+    """
+    try:
+        return profiling_stats(), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /admin/profiling endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.delete(
+    '/admin/profiling',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: ProfilingStatsResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Reset recognizer profiling statistics",
+    description="Returns the recognizer profiling statistics of the worker serving the request and clears them.",
+    security=security
+)
+@execution_logging_decorator("reset_profiling_stats")
+def reset_profiling_stats_endpoint():
+    """
+    DELETE endpoint to read and clear the recognizer profiling statistics
+    """
+    try:
+        return reset_profiling_stats(), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /admin/profiling endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.get(
+    '/admin/policy',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: PolicyResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Get the anonymization policy",
+    description="Returns the version, the entities and the custom recognizers of the anonymization policy active in "
+                "the worker serving the request. Workers check the policy file every "
+                "ANONYMIZER_POLICY_RELOAD_SECONDS and switch to a new version on their own.",
+    security=security
+)
+@execution_logging_decorator("policy_info")
+def policy_info_endpoint():
+    """
+    GET endpoint for the active anonymization policy
     """
     try:
-        config = ConfigParser()
-        config.read('setup.cfg')
-        app_name = config.get("metadata", "name")
-        app_version = config.get("metadata", "version")
-        return {"name": app_name, "version": app_version, "environment": os.getenv("ENV", "not specified")}, 200
+        return policy_info(), 200
 
     except Exception as e:
-        app.logger.exception("Error in /info endpoint", extra={
+        app.logger.exception("Error in /admin/policy endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.post(
+    '/admin/policy/reload',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: PolicyResponse,
+        HTTPStatus.UNPROCESSABLE_ENTITY: ErrorResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Reload the anonymization policy",
+    description="Reads the policy file right away and activates it in the worker serving the request, without "
+                "waiting for the next periodic check. An invalid policy is rejected with 422 and the active one is "
+                "kept.",
+    security=security
+)
+@execution_logging_decorator("reload_policy")
+def reload_policy_endpoint():
+    """
+    POST endpoint to reload the anonymization policy
+    """
+    try:
+        return reload_policy(), 200
+
+    except PolicyError as e:
+        return {"error": str(e)}, 422
+
+    except Exception as e:
+        app.logger.exception("Error in /admin/policy/reload endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.get(
+    '/metrics',
+    tags=[admin_tag],
+    doc_ui=False,
+    responses={
+        HTTPStatus.OK: None,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Get Prometheus metrics",
+    description="Returns the service metrics in the Prometheus text format: per-stage latency histograms, "
+                "detected entities by type, input sizes, in-progress requests and per-process memory. "
+                "Under gunicorn the metrics of all the workers are aggregated.",
+    security=security
+)
+@execution_logging_decorator("metrics")
+def metrics():
+    """
+    GET endpoint for the Prometheus scraper
+    """
+    try:
+        output, content_type = render_metrics()
+        return FlaskResponse(output, content_type=content_type), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /metrics endpoint", extra={
             **g.extra_fields,
             ERROR_MESSAGE: str(e),
             ERROR_TYPE: type(e).__name__,
@@ -224,13 +687,22 @@ def anonymize_endpoint(body: AnonymizeRequest):
     """
     try:
         input_text = body.text
+        try:
+            profile = current_profile(body.profile or request.headers.get(PROFILE_HEADER))
+        except ValueError as e:
+            app.logger.error("Invalid /anonymize profile: %s", e, extra=g.extra_fields)
+            return {"error": str(e)}, 400
 
         if not isinstance(input_text, str):
             app.logger.error("The 'text' field must be a string", extra=g.extra_fields)
             return {"error": "The 'text' field must be a string"}, 400
 
         app.logger.debug("Start text anonymize", extra=g.extra_fields)
-        anonymized_text_output = anonymize_text_with_presidio(input_text)
+        if body.spans:
+            [(anonymized_text_output, spans)] = anonymize_texts_with_spans([input_text], body.mode, profile)
+            app.logger.debug("End text anonymize", extra=g.extra_fields)
+            return {"text": anonymized_text_output, "spans": spans}, 200
+        anonymized_text_output = anonymize_text_with_presidio(input_text, body.mode, profile)
         app.logger.debug("End text anonymize", extra=g.extra_fields)
 
         return {"text": anonymized_text_output}, 200
@@ -245,5 +717,199 @@ def anonymize_endpoint(body: AnonymizeRequest):
         return {"error": "An internal server error occurred"}, 500
 
 
+@app.post(
+    '/anonymize/batch',
+    tags=[anonymize_tag],
+    responses={
+        HTTPStatus.OK: AnonymizeBatchResponse,
+        HTTPStatus.BAD_REQUEST: ErrorResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Anonymize a batch of texts",
+    description="Anonymizes the provided texts using Presidio, processing them together in a single NLP pass.",
+    security=security
+)
+@execution_logging_decorator("anonymize_batch_endpoint")
+def anonymize_batch_endpoint(body: AnonymizeBatchRequest):
+    """
+    POST endpoint to anonymize a list of texts, preserving their order.
+    """
+    try:
+        try:
+            profile = current_profile(body.profile or request.headers.get(PROFILE_HEADER))
+        except ValueError as e:
+            app.logger.error("Invalid /anonymize/batch profile: %s", e, extra=g.extra_fields)
+            return {"error": str(e)}, 400
+
+        app.logger.debug("Start batch anonymize of %d texts", len(body.texts), extra=g.extra_fields)
+        if body.spans:
+            results = anonymize_texts_with_spans(body.texts, body.mode, profile)
+            app.logger.debug("End batch anonymize", extra=g.extra_fields)
+            return {"texts": [text for text, _ in results], "spans": [spans for _, spans in results]}, 200
+        anonymized_texts_output = anonymize_texts_with_presidio(body.texts, body.mode, profile)
+        app.logger.debug("End batch anonymize", extra=g.extra_fields)
+
+        return {"texts": anonymized_texts_output}, 200
+
+    except Exception as e:
+        app.logger.exception("Error in /anonymize/batch endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.post(
+    '/analyze',
+    tags=[analyze_tag],
+    responses={
+        HTTPStatus.OK: AnalyzeResponse,
+        HTTPStatus.BAD_REQUEST: ErrorResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Detect the entities of a batch of texts",
+    description="Returns the spans of the entities that /anonymize/batch would anonymize in each text, without "
+                "anonymizing them: type, offsets in the text, score and operator, one list per field.",
+    security=security
+)
+@execution_logging_decorator("analyze_endpoint")
+def analyze_endpoint(body: AnalyzeRequest):
+    """
+    POST endpoint to detect the entities of a list of texts, preserving their order.
+    """
+    try:
+        try:
+            profile = current_profile(body.profile or request.headers.get(PROFILE_HEADER))
+        except ValueError as e:
+            app.logger.error("Invalid /analyze profile: %s", e, extra=g.extra_fields)
+            return {"error": str(e)}, 400
+
+        app.logger.debug("Start analysis of %d texts", len(body.texts), extra=g.extra_fields)
+        spans = analyze_texts_with_presidio(body.texts, body.mode, profile)
+        app.logger.debug("End analysis", extra=g.extra_fields)
+
+        return {"spans": spans}, 200
+
+    except Exception as e:
+        app.logger.exception("Error in /analyze endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.post(
+    '/anonymize/json',
+    tags=[anonymize_tag],
+    responses={
+        HTTPStatus.OK: AnonymizeJsonResponse,
+        HTTPStatus.BAD_REQUEST: ErrorResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Anonymize a JSON document",
+    description="Anonymizes the string fields of a JSON document according to a policy per JSON path. "
+                "The fields of each detection mode are analyzed together in a single pass, while fields with "
+                "an entity type policy are anonymized directly, skipping detection. Keys, numbers, booleans "
+                "and nulls are returned unchanged.",
+    security=security
+)
+@execution_logging_decorator("anonymize_json_endpoint")
+def anonymize_json_endpoint(body: AnonymizeJsonRequest):
+    """
+    POST endpoint to anonymize the string fields of a JSON document, field by field.
+    """
+    try:
+        try:
+            policies = JsonPolicies(body.policies, body.defaultPolicy)
+        except ValueError as e:
+            app.logger.error("Invalid /anonymize/json policies: %s", e, extra=g.extra_fields)
+            return {"error": str(e)}, 400
+
+        app.logger.debug("Start JSON document anonymize", extra=g.extra_fields)
+        anonymized_document = anonymize_json(body.document, policies)
+        app.logger.debug("End JSON document anonymize", extra=g.extra_fields)
+
+        return {"document": anonymized_document}, 200
+
+    except Exception as e:
+        app.logger.exception("Error in /anonymize/json endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
+@app.post(
+    '/anonymize/stream',
+    tags=[anonymize_tag],
+    responses={
+        HTTPStatus.OK: None,
+        HTTPStatus.UNSUPPORTED_MEDIA_TYPE: ErrorResponse,
+        HTTPStatus.INTERNAL_SERVER_ERROR: ErrorResponse,
+    },
+    summary="Anonymize a text stream",
+    description="Anonymizes a long text uploaded as a stream, returning the anonymized text chunk by chunk. "
+                "With Content-Type text/plain the body is the text itself (chunked transfer encoding allowed) "
+                "and the response is plain text. With Content-Type application/x-ndjson every line is an object "
+                "with a 'text' field holding the next piece of the text, and every line of the response holds "
+                "the next anonymized chunk; if the anonymization fails midway, the last line holds an 'error' field, "
+                "while a text/plain response is aborted.",
+    security=security
+)
+@execution_logging_decorator("anonymize_stream_endpoint")
+def anonymize_stream_endpoint(query: AnonymizeStreamQuery):
+    """
+    POST endpoint to anonymize a text stream, chunk by chunk.
+    """
+    try:
+        if request.mimetype == NDJSON_MIMETYPE:
+            pieces = read_ndjson_texts(request.stream)
+        elif request.mimetype == "text/plain":
+            pieces = read_text_blocks(request.stream, STREAM_READ_SIZE)
+        else:
+            return {"error": f"Unsupported content type, use text/plain or {NDJSON_MIMETYPE}"}, 415
+
+        chunks = anonymize_stream(pieces, query.mode, chunk_size=STREAM_CHUNK_SIZE, overlap=STREAM_OVERLAP)
+        ndjson = request.mimetype == NDJSON_MIMETYPE
+        extra_fields = g.extra_fields
+
+        def generate():
+            try:
+                yield from chunks_to_ndjson(chunks) if ndjson else chunks
+            except StreamFormatError as e:
+                app.logger.error("Malformed /anonymize/stream upload: %s", e, extra=extra_fields)
+                yield json.dumps({"error": str(e)}) + "\n"
+            except Exception as e:
+                app.logger.exception("Error in /anonymize/stream endpoint", extra={
+                    **extra_fields,
+                    ERROR_MESSAGE: str(e),
+                    ERROR_TYPE: type(e).__name__,
+                    ERROR_STACK_TRACE: traceback.format_exc()
+                })
+                # The response status is already sent: the error can only be reported in the body, or else by
+                # aborting the connection, so that the client never takes a truncated text for the whole one
+                if not ndjson:
+                    raise
+                yield json.dumps({"error": "An internal server error occurred"}) + "\n"
+
+        mimetype = NDJSON_MIMETYPE if ndjson else "text/plain"
+        return FlaskResponse(stream_with_context(generate()), mimetype=mimetype), 200
+
+    except Exception as e:
+        app.logger.exception("Error in /anonymize/stream endpoint", extra={
+            **g.extra_fields,
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return {"error": "An internal server error occurred"}, 500
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3000, debug=True)
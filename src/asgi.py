@@ -0,0 +1,226 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from src.warmup import create_app
+
+logger = logging.getLogger(__name__)
+
+# Only these requests run on the event loop's default executor: every other one (/anonymize*, /analyze, new
+# endpoints, unknown paths) runs on the bounded inference pool
+NON_INFERENCE_PATHS = frozenset({"/info", "/ready", "/metrics"})
+NON_INFERENCE_PATH_PREFIXES = ("/admin/", "/openapi/", "/static/")
+OVERLOADED_ERROR = json.dumps({"error": "The service is overloaded, retry later"}).encode()
+
+
+def is_inference_path(path: str) -> bool:
+    return path not in NON_INFERENCE_PATHS and not path.startswith(NON_INFERENCE_PATH_PREFIXES)
+
+
+class BoundedWsgiAdapter:
+    """
+    ASGI application serving a WSGI application (the Flask app, with its routes, models and OpenAPI spec)
+    with explicit backpressure on the inference requests.
+
+    Inference requests run on a pool of inference_threads threads; up to queue_depth more wait for a free thread.
+    When both are full the request is rejected right away with 503 and a Retry-After header, instead of piling up
+    unseen in the socket backlog until the client times out. Only the probes, metrics, admin and documentation
+    requests (e.g. /info, /ready) run on the event loop's default executor, so the probes keep answering under load.
+
+    :param wsgi_app: WSGI application to serve
+    :param inference_threads: number of threads running inference requests
+    :param queue_depth: number of inference requests waiting for a thread before rejecting new ones
+    :param retry_after: seconds returned in the Retry-After header of the rejected requests
+    """
+
+    def __init__(self, wsgi_app, inference_threads: int, queue_depth: int, retry_after: int):
+        self.wsgi_app = wsgi_app
+        self.inference_threads = inference_threads
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=inference_threads, thread_name_prefix="inference")
+
+    @property
+    def capacity(self) -> int:
+        return self.inference_threads + self.queue_depth
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            # Closing before accepting rejects the handshake (403)
+            logger.warning("WebSocket connection rejected, not supported", extra={"path": scope.get("path")})
+            message = await receive()
+            if message["type"] == "websocket.connect":
+                await send({"type": "websocket.close"})
+        else:
+            logger.warning("Unsupported ASGI scope ignored", extra={"scope_type": scope["type"]})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    self.executor.shutdown(wait=True)
+                except Exception as e:
+                    logger.exception("Inference pool shutdown failed")
+                    await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        # The body is read by the WSGI application as it needs it, on the thread running it: rejected requests are
+        # never read, and streamed uploads are never held in memory as a whole
+        environ = build_environ(scope, io.BufferedReader(AsgiInput(receive, loop)))
+        if not is_inference_path(scope["path"]):
+            await loop.run_in_executor(None, self._call_wsgi, environ, loop, send)
+            return
+
+        # pending is only read and updated on the event loop thread, no lock needed
+        if self.pending >= self.capacity:
+            logger.warning("Request rejected, inference queue full", extra={
+                "path": scope["path"],
+                "pending": self.pending,
+                "capacity": self.capacity
+            })
+            await self._send_response(send, HTTPStatus.SERVICE_UNAVAILABLE, [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(self.retry_after).encode()),
+            ], OVERLOADED_ERROR)
+            return
+
+        self.pending += 1
+        try:
+            await loop.run_in_executor(self.executor, self._call_wsgi, environ, loop, send)
+        finally:
+            self.pending -= 1
+
+    def _call_wsgi(self, environ: dict, loop: asyncio.AbstractEventLoop, send):
+        """
+        Runs the WSGI application on the current (pool) thread, sending every piece of the response body
+        as soon as it is produced, so streamed responses stay streamed.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+        def send_message(message: dict):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_start():
+            send_message({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+        result = self.wsgi_app(environ, start_response)
+        started = False
+        try:
+            for piece in result:
+                if not piece:
+                    continue
+                if not started:
+                    send_start()
+                    started = True
+                send_message({"type": "http.response.body", "body": piece, "more_body": True})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        if not started:
+            send_start()
+        send_message({"type": "http.response.body", "body": b"", "more_body": False})
+
+    @staticmethod
+    async def _send_response(send, status: int, headers: list, body: bytes):
+        await send({"type": "http.response.start", "status": int(status), "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class AsgiInput(io.RawIOBase):
+    """
+    Body of an ASGI HTTP request as a raw binary stream for wsgi.input: every read receives the next body message
+    from the event loop, so it must be called from another thread (the one running the WSGI application).
+
+    :param receive: ASGI receive callable of the request
+    :param loop: event loop serving the request
+    """
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._receive = receive
+        self._loop = loop
+        self._body = b""
+        self._position = 0
+        self._more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._position >= len(self._body):
+            if not self._more_body:
+                return 0
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            # A disconnected client ends the body
+            self._more_body = message["type"] == "http.request" and message.get("more_body", False)
+            self._body = message.get("body", b"")
+            self._position = 0
+        size = min(len(buffer), len(self._body) - self._position)
+        buffer[:size] = self._body[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+def build_environ(scope: dict, wsgi_input) -> dict:
+    """
+    Builds the WSGI environ (PEP 3333) of an ASGI HTTP request, whose body is read from wsgi_input.
+    """
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": wsgi_input,
+        # The stream ends with the body, even without a Content-Length (chunked uploads)
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+app = BoundedWsgiAdapter(
+    create_app(),
+    inference_threads=int(os.getenv("ASGI_INFERENCE_THREADS", "2")),
+    queue_depth=int(os.getenv("ASGI_QUEUE_DEPTH", "16")),
+    retry_after=int(os.getenv("ASGI_RETRY_AFTER_SECONDS", "1"))
+)
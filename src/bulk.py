@@ -0,0 +1,244 @@
+"""
+Offline bulk anonymization of JSONL and CSV files, without going through HTTP.
+
+    python -m src.bulk input.jsonl output.jsonl --fields description,payer.fullName
+    python -m src.bulk input.csv output.csv --fields causale --processes 16 --checkpoint output.ckpt
+
+Records are anonymized in batches by a pool of processes, sharing the spaCy model loaded once before forking them,
+and written to the output in input order. At most max_in_flight batches are pending at any time, so memory stays
+constant whatever the size of the input. With a checkpoint file, an interrupted run started again with the same arguments resumes
+after the last batch written.
+"""
+import argparse
+import csv
+import gc
+import importlib
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.util import Finalize
+from typing import Iterator, List, Optional
+
+from src.logging_setup import on_starting as configure_logging, restart_log_listener, stop_log_listener
+
+logger = logging.getLogger(__name__)
+
+JSONL = "jsonl"
+CSV = "csv"
+
+# Set in every pool process by _init_worker
+_worker_options = {}
+
+
+def _init_worker(file_format: str, fields: List[str], mode: str, header: Optional[List[str]]):
+    # With lean logging, records are written by a thread of the parent that the forked worker didn't inherit:
+    # the worker starts its own, and writes what is left in its queue when it exits
+    restart_log_listener()
+    Finalize(None, stop_log_listener, exitpriority=0)
+    anonymizer_logic = importlib.import_module("src.anonymizer_logic")
+    _worker_options.update({
+        "anonymizer_logic": anonymizer_logic,
+        "format": file_format,
+        "fields": fields,
+        "mode": anonymizer_logic.AnonymizationMode(mode),
+        "columns": [header.index(field) for field in fields] if header else None,
+    })
+
+
+def _get_path(record: dict, path: List[str]):
+    value = record
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _set_path(record: dict, path: List[str], value):
+    for key in path[:-1]:
+        record = record[key]
+    record[path[-1]] = value
+
+
+def anonymize_batch(records: list) -> str:
+    """
+    Anonymizes the selected fields of a batch of records (JSONL lines or CSV rows),
+    returning the serialized output of the batch. All the texts of the batch go through a single nlp.pipe.
+    """
+    anonymizer_logic = _worker_options["anonymizer_logic"]
+    if _worker_options["format"] == JSONL:
+        records = [json.loads(line) for line in records]
+        paths = [field.split(".") for field in _worker_options["fields"]]
+        locations = [(record, path) for record in records for path in paths
+                     if isinstance(_get_path(record, path), str)]
+        texts = [_get_path(record, path) for record, path in locations]
+    else:
+        locations = [(row, column) for row in records for column in _worker_options["columns"] if column < len(row)]
+        texts = [row[column] for row, column in locations]
+
+    anonymized_texts = anonymizer_logic.anonymize_texts_with_presidio(texts, _worker_options["mode"])
+
+    if _worker_options["format"] == JSONL:
+        for (record, path), anonymized_text in zip(locations, anonymized_texts):
+            _set_path(record, path, anonymized_text)
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    for (row, column), anonymized_text in zip(locations, anonymized_texts):
+        row[column] = anonymized_text
+    output = io.StringIO()
+    csv.writer(output).writerows(records)
+    return output.getvalue()
+
+
+def read_batches(records: Iterator, batch_size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_checkpoint(checkpoint_path: Optional[str]) -> dict:
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return {"records": 0, "outputBytes": 0}
+    with open(checkpoint_path) as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def write_checkpoint(checkpoint_path: str, records: int, output_bytes: int):
+    # Written to a temporary file and renamed, so an interruption never leaves a truncated checkpoint
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump({"records": records, "outputBytes": output_bytes}, checkpoint_file)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def run(input_path: str, output_path: str, fields: List[str], file_format: str, mode: str = "full",
+        processes: Optional[int] = None, batch_size: int = 256, max_in_flight: Optional[int] = None,
+        checkpoint_path: Optional[str] = None) -> int:
+    """
+    Anonymizes the fields of every record of the input file, writing them to the output file in the same order.
+    Returns the number of records written by this run.
+    """
+    processes = processes or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * processes
+    checkpoint = read_checkpoint(checkpoint_path)
+    records_done = checkpoint["records"]
+
+    def resume_error(found: str) -> ValueError:
+        return ValueError(f"Can't resume from the checkpoint {checkpoint_path}: {records_done} records "
+                          f"({checkpoint['outputBytes']} bytes) were written to {output_path}, but {found}. "
+                          f"Remove the checkpoint to start over")
+
+    if records_done:
+        # Resuming appends to what the interrupted run wrote, which must still be there
+        output_size = os.path.getsize(output_path) if os.path.exists(output_path) else None
+        if output_size is None or output_size < checkpoint["outputBytes"]:
+            raise resume_error("it doesn't exist" if output_size is None else f"it has {output_size} bytes")
+
+    with open(input_path, encoding="utf-8", newline="") as input_file, \
+            open(output_path, "r+b" if records_done else "wb") as output_file:
+        header = None
+        if file_format == CSV:
+            records = csv.reader(input_file)
+            header = next(records)
+            missing_columns = [field for field in fields if field not in header]
+            if missing_columns:
+                raise ValueError(f"Columns {missing_columns} not found in the CSV header")
+            if not records_done:
+                header_output = io.StringIO()
+                csv.writer(header_output).writerow(header)
+                output_file.write(header_output.getvalue().encode("utf-8"))
+        else:
+            records = (line for line in input_file if line.strip())
+
+        if records_done:
+            # Skip the records already written, and drop whatever was written after the last checkpoint
+            records_skipped = sum(1 for _ in itertools.islice(records, records_done))
+            if records_skipped < records_done:
+                raise resume_error(f"{input_path} has only {records_skipped} records")
+            output_file.truncate(checkpoint["outputBytes"])
+            output_file.seek(checkpoint["outputBytes"])
+            logger.info("Resuming bulk anonymization after %d records", records_done)
+
+        # The model is loaded once here and inherited by the forked workers, sharing its memory pages
+        # copy-on-write (as in gunicorn preload mode); freezing keeps the workers' collections off them
+        importlib.import_module("src.anonymizer_logic")
+        gc.freeze()
+
+        start_time = time.perf_counter()
+        records_written = 0
+        context = multiprocessing.get_context("fork")
+        pool = context.Pool(processes, initializer=_init_worker, initargs=(file_format, fields, mode, header))
+        gc.unfreeze()
+        with pool:
+            pending = deque()
+            batches = read_batches(records, batch_size)
+            while True:
+                # Keep at most max_in_flight batches submitted, so memory doesn't grow with the input size
+                for batch in batches:
+                    pending.append((len(batch), pool.apply_async(anonymize_batch, (batch,))))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+
+                batch_length, result = pending.popleft()
+                output_file.write(result.get().encode("utf-8"))
+                records_written += batch_length
+                if checkpoint_path:
+                    output_file.flush()
+                    write_checkpoint(checkpoint_path, records_done + records_written, output_file.tell())
+            # The workers exit on their own, instead of being terminated, so their last log records are written
+            pool.close()
+            pool.join()
+
+        elapsed = time.perf_counter() - start_time
+        logger.info("Bulk anonymization completed", extra={
+            "records": records_written,
+            "elapsedTime": round(elapsed, 3),
+            "recordsPerSecond": round(records_written / elapsed, 1) if elapsed else None,
+            "processes": processes
+        })
+    return records_written
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="input JSONL or CSV file")
+    parser.add_argument("output", help="output file, in the same format as the input")
+    parser.add_argument("--fields", required=True,
+                        help="comma separated JSONL fields (dotted paths for nested ones) or CSV columns to anonymize")
+    parser.add_argument("--format", choices=[JSONL, CSV], help="input format (default: from the file extension)")
+    parser.add_argument("--mode", choices=["full", "regex"], default="full", help="detection mode")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="records anonymized together by a process")
+    parser.add_argument("--max-in-flight", type=int, help="batches pending at the same time (default: 2 per process)")
+    parser.add_argument("--checkpoint", help="checkpoint file, updated after every batch and used to resume a run")
+    args = parser.parse_args(arguments)
+
+    file_format = args.format or (CSV if args.input.lower().endswith(".csv") else JSONL)
+    configure_logging(None)
+    run(
+        input_path=args.input,
+        output_path=args.output,
+        fields=[field.strip() for field in args.fields.split(",") if field.strip()],
+        file_format=file_format,
+        mode=args.mode,
+        processes=args.processes,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        checkpoint_path=args.checkpoint,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+def _code_digest(code) -> str:
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        # Nested code objects (e.g. comprehensions) have a repr holding their memory address
+        digest.update((_code_digest(const) if hasattr(const, "co_code") else repr(const)).encode())
+    return digest.hexdigest()
+
+
+def _stable_value(value):
+    # Functions (e.g. the operator lambdas) are identified by their code, which is the same in every process
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        return _code_digest(code)
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return repr(value)
+
+
+def config_fingerprint(**config) -> str:
+    """
+    Returns a digest of the configuration that determines the anonymized output (entities, operators, model...).
+    Changing any of it changes every cache key, so results computed with a previous configuration are never reused.
+    """
+    serialized = json.dumps(config, sort_keys=True, default=_stable_value)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def cache_key(fingerprint: str, mode: str, text: str) -> str:
+    """
+    Content address of an anonymization: only this digest is stored as key, never the (PII-carrying) text itself.
+    """
+    digest = hashlib.sha256()
+    for part in (fingerprint, mode, text):
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LocalResultCache:
+    """
+    In-process LRU cache of anonymized texts, bounded by number of entries and total size,
+    whose entries expire ttl seconds after being stored.
+
+    :param max_entries: maximum number of cached results
+    :param max_bytes: maximum total size of the cached keys and results
+    :param ttl: seconds after which a result is expired
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key: str, value: str):
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self.size}
+
+
+class SharedResultCache:
+    """
+    Local cache backed by a Redis instance shared by every worker and pod.
+    Local misses are looked up in Redis, and new results are written to both.
+    Redis errors (e.g. timeouts) are counted and treated as misses, so the cache never fails a request.
+
+    :param local: in-process cache checked first
+    :param client: Redis client
+    :param prefix: prefix of the Redis keys
+    """
+
+    def __init__(self, local: LocalResultCache, client, prefix: str = "anonymizer:"):
+        self.local = local
+        self.client = client
+        self.prefix = prefix
+        self.ttl = local.ttl
+        self.counters = {"sharedHits": 0, "sharedMisses": 0, "sharedErrors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        try:
+            shared_value = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.debug("Shared cache lookup failed: %s", e)
+            self._count("sharedErrors")
+            return None
+        if shared_value is None:
+            self._count("sharedMisses")
+            return None
+        self._count("sharedHits")
+        value = shared_value.decode("utf-8")
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        self.local.set(key, value)
+        try:
+            self.client.set(self.prefix + key, value.encode("utf-8"), ex=max(1, int(self.ttl)))
+        except Exception as e:
+            logger.debug("Shared cache store failed: %s", e)
+            self._count("sharedErrors")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**self.local.stats(), **counters}
+
+
+def build_result_cache(enabled: bool, max_entries: int, max_bytes: int, ttl: float,
+                       redis_url: Optional[str] = None, redis_timeout: float = 0.05):
+    """
+    Builds the result cache described by the configuration: None when disabled, a local cache,
+    or a local cache in front of Redis when a Redis URL is given.
+    """
+    if not enabled:
+        return None
+    local = LocalResultCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    if not redis_url:
+        logger.info("Result cache enabled", extra={"maxEntries": max_entries, "maxBytes": max_bytes, "ttl": ttl})
+        return local
+
+    client = redis.Redis.from_url(redis_url, socket_timeout=redis_timeout, socket_connect_timeout=redis_timeout)
+    logger.info("Shared result cache enabled", extra={"maxEntries": max_entries, "maxBytes": max_bytes, "ttl": ttl})
+    return SharedResultCache(local=local, client=client)
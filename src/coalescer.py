@@ -0,0 +1,103 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Generic, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatchCoalescer(Generic[T, R]):
+    """
+    Groups the items submitted concurrently by different request threads into batches processed together.
+
+    A background thread takes the first pending item, waits up to max_wait seconds for more (stopping early
+    at max_batch_size items), processes the whole batch with a single process_batch call and hands each
+    result back to the thread waiting for it. If the batch fails, its items are processed one at a time,
+    so a single bad item only fails its own request.
+
+    :param process_batch: function returning the results of a list of items, in the same order
+    :param max_batch_size: maximum number of items processed together
+    :param max_wait: seconds the first item of a batch waits for other items
+    """
+
+    def __init__(self, process_batch: Callable[[List[T]], List[R]], max_batch_size: int, max_wait: float):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes = Counter()
+        self._stats_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def submit(self, item: T) -> R:
+        """
+        Processes the item in the next batch, blocking until its result is ready.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_started(self):
+        # Threads don't survive fork(): each gunicorn worker starts its own the first time it is used
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="coalescer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: list):
+        with self._stats_lock:
+            self.batch_sizes[len(batch)] += 1
+        logger.debug("Processing coalesced batch of %d items", len(batch))
+        try:
+            results = self.process_batch([item for item, _ in batch])
+        except Exception:
+            logger.debug("Coalesced batch failed, processing its items one at a time")
+            for item, future in batch:
+                try:
+                    future.set_result(self.process_batch([item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+        batches = sum(batch_sizes.values())
+        items = sum(size * count for size, count in batch_sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "meanBatchSize": round(items / batches, 3) if batches else 0,
+            "batchSizes": {str(size): count for size, count in batch_sizes.items()},
+        }
@@ -0,0 +1,86 @@
+import gc
+import glob
+import os
+import logging
+
+from prometheus_client import multiprocess
+
+from src.logging_setup import on_starting as configure_logging, restart_log_listener
+from src.process_memory import read_process_memory
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:3000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+
+# WSGI serving (default): wsgi_app "src.warmup:create_app()" with sync workers, answering the probes while
+# the engines are loaded in the background ("src.app:app" loads them before the worker serves any request).
+# ASGI serving: wsgi_app "src.asgi:app" with worker_class "uvicorn_worker.UvicornWorker".
+wsgi_app = os.getenv("GUNICORN_APP", "src.warmup:create_app()")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+# Threads per worker, used by the gthread worker class (e.g. to let the request coalescer group concurrent requests)
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+
+# Preload mode: the spaCy model and the Presidio engines are built once in the master process
+# and the workers inherit them through fork(), sharing the same memory pages copy-on-write.
+preload_app = os.getenv("GUNICORN_PRELOAD_APP", "false").lower() == "true"
+
+# Prometheus multiprocess mode: every process writes its metrics to files in this directory (see src.metrics).
+# The files of a previous run are removed before the application, and so the metrics, are created.
+prometheus_multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if prometheus_multiproc_dir:
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    for metrics_file in glob.glob(os.path.join(prometheus_multiproc_dir, "*.db")):
+        os.remove(metrics_file)
+
+if preload_app:
+    # The application is imported in the master right after this file is loaded, before on_starting runs:
+    # configure logging now, so the reports logged while the engines are built are not lost.
+    configure_logging(None)
+    # A garbage collection pass writes to every tracked object header, which would copy the
+    # shared pages into each worker, so the collector stays off until the workers are forked.
+    gc.disable()
+
+
+def _log_memory_report(message: str, pid: int):
+    memory = read_process_memory()
+    logging.getLogger("src.gunicorn_config").info(message, extra={
+        "pid": pid,
+        "preloadApp": preload_app,
+        **{f"memory.{key}": value for key, value in memory.items()}
+    })
+
+
+def _update_memory_metric():
+    # Imported here: in multiprocess mode the metrics must not be created before the directory is emptied
+    from src.metrics import update_process_memory
+    update_process_memory(force=True)
+
+
+def on_starting(server):
+    configure_logging(server)
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything allocated while loading the model into the permanent generation,
+        # so the workers' collections never touch (and copy) it
+        gc.freeze()
+    _log_memory_report("Master memory report", os.getpid())
+    _update_memory_metric()
+
+
+def post_fork(server, worker):
+    # With lean logging, records are written by a thread of the master that the worker didn't inherit
+    restart_log_listener()
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    _log_memory_report("Worker memory report", worker.pid)
+    _update_memory_metric()
+
+
+def child_exit(server, worker):
+    if prometheus_multiproc_dir:
+        # Drop the in-progress and memory gauges of the worker
+        multiprocess.mark_process_dead(worker.pid, prometheus_multiproc_dir)
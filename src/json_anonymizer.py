@@ -0,0 +1,132 @@
+import copy
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from presidio_analyzer import RecognizerResult
+
+from src.anonymization_policy import CompiledProfile
+from src.anonymizer_logic import AnonymizationMode, anonymize_texts_with_presidio, current_profile
+
+# Field policies: leave the value unchanged, detect with the pattern recognizers only, detect with spaCy NER too.
+# Any entity type with an operator in the anonymization profile (e.g. "IT_FISCAL_CODE") is a policy as well: the whole
+# value is known to be that entity and its operator is applied without running any detection.
+SKIP = "skip"
+REGEX = AnonymizationMode.REGEX.value
+FULL = AnonymizationMode.FULL.value
+DETECTION_POLICIES = {REGEX: AnonymizationMode.REGEX, FULL: AnonymizationMode.FULL}
+
+WILDCARD = "*"
+PATH_TOKEN_REGEX = re.compile(r"\.?([^.\[\]]+)|\[(\d+|\*)\]")
+
+PathToken = Union[str, int]
+
+
+def parse_path(path: str) -> Tuple[PathToken, ...]:
+    """
+    Parses a JSON path like "$.positions[*].debtor.fiscalCode" into its keys and array indexes.
+    "*" matches any key or index; the leading "$" is optional.
+    """
+    path = path[1:] if path.startswith("$") else path
+    tokens = []
+    position = 0
+    while position < len(path):
+        match = PATH_TOKEN_REGEX.match(path, position)
+        if not match:
+            raise ValueError(f"Invalid JSON path '{path}'")
+        key, index = match.groups()
+        if index is not None:
+            tokens.append(WILDCARD if index == WILDCARD else int(index))
+        else:
+            tokens.append(key)
+        position = match.end()
+    if not tokens:
+        raise ValueError(f"Invalid JSON path '{path}'")
+    return tuple(tokens)
+
+
+def validate_policy(policy: str) -> str:
+    operators = current_profile().operators
+    if policy != SKIP and policy not in DETECTION_POLICIES and (policy == "DEFAULT" or policy not in operators):
+        raise ValueError(f"Invalid policy '{policy}': use skip, regex, full or one of the entity types "
+                         f"{sorted(entity for entity in operators if entity != 'DEFAULT')}")
+    return policy
+
+
+class JsonPolicies:
+    """
+    Policies of the string fields of a JSON document, by JSON path.
+    When several paths match a field, the one with fewer wildcards wins, then the first one given.
+
+    :param policies: policy by JSON path
+    :param default_policy: policy of the fields not matched by any path
+    """
+
+    def __init__(self, policies: Optional[Dict[str, str]] = None, default_policy: str = FULL):
+        compiled = [(parse_path(path), validate_policy(policy)) for path, policy in (policies or {}).items()]
+        self.patterns = sorted(compiled, key=lambda pattern: pattern[0].count(WILDCARD))
+        self.default_policy = validate_policy(default_policy)
+
+    def policy(self, path: Tuple[PathToken, ...]) -> str:
+        for pattern, policy in self.patterns:
+            if len(pattern) == len(path) and all(
+                    token == WILDCARD or token == path_token for token, path_token in zip(pattern, path)):
+                return policy
+        return self.default_policy
+
+
+def _string_fields(value: Any, path: Tuple[PathToken, ...] = ()):
+    # (container, key, path) of every string in the document, in document order
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for key, item in items:
+        if isinstance(item, str):
+            yield value, key, path + (key,)
+        else:
+            yield from _string_fields(item, path + (key,))
+
+
+def apply_entity_operator(text: str, entity_type: str, profile: Optional[CompiledProfile] = None) -> str:
+    """
+    Anonymizes a text known to be entirely an entity of the given type, without running any detection,
+    with the operator of the given anonymization profile, or else of the default one.
+    """
+    if not text:
+        return text
+    return (profile or current_profile()).anonymizer.anonymize(
+        text, [RecognizerResult(entity_type=entity_type, start=0, end=len(text), score=1.0)]
+    )
+
+
+def anonymize_json(document: Any, policies: Union[JsonPolicies, Dict[str, str], None] = None,
+                   default_policy: str = FULL) -> Any:
+    """
+    Returns a copy of the JSON document with its string fields anonymized according to their policy.
+    The fields of each detection mode go through the analyzer together, as a single batch; fields with an entity
+    policy are anonymized directly, and skipped fields are left unchanged. Keys and non-string values are kept.
+    """
+    if not isinstance(policies, JsonPolicies):
+        policies = JsonPolicies(policies, default_policy)
+    # The whole document is anonymized with the same version of the anonymization policy
+    profile = current_profile()
+    document = copy.deepcopy(document)
+
+    fields_by_mode: Dict[AnonymizationMode, List[Tuple[Any, PathToken]]] = {}
+    for container, key, path in _string_fields(document):
+        policy = policies.policy(path)
+        if policy == SKIP:
+            continue
+        if policy in DETECTION_POLICIES:
+            fields_by_mode.setdefault(DETECTION_POLICIES[policy], []).append((container, key))
+        else:
+            container[key] = apply_entity_operator(container[key], policy, profile)
+
+    for mode, fields in fields_by_mode.items():
+        anonymized_texts = anonymize_texts_with_presidio([container[key] for container, key in fields], mode,
+                                                         profile)
+        for (container, key), anonymized_text in zip(fields, anonymized_texts):
+            container[key] = anonymized_text
+    return document
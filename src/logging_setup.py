@@ -1,68 +1,172 @@
+import atexit
+import copy
 import os
 import logging
-import traceback
+import time
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from typing import Optional
 from pythonjsonlogger.json import JsonFormatter
-from configparser import ConfigParser
 from datetime import datetime, timezone
 
-ERROR_MESSAGE = "error.message"
-ERROR_TYPE = "error.type"
-ERROR_STACK_TRACE = "error.stack_trace"
+from src.service_info import SERVICE_INFO
+
+# Lean logging: API responses are logged as their size and number of entities instead of their whole body,
+# and records are written to stdout by a background thread instead of the thread logging them.
+LEAN_LOGGING = os.getenv("APP_LOGGING_LEAN", "false").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("APP_LOGGING_QUEUE_SIZE", "10000"))
+
+_queue_logging = {"handler": None, "console": None, "listener": None}
 
 
 # Define logger filter
 class ECSContextFilter(logging.Filter):
-    def __init__(self):
+    def __init__(self, service_info: Optional[dict] = None):
         super().__init__()
-        self.ecs_fields = {}
-        try:
-            config = ConfigParser()
-            config.read('setup.cfg')
-            self.ecs_fields = {
-                "service.name": config.get("metadata", "name"),
-                "service.version": config.get("metadata", "version"),
-                "service.environment": os.getenv("ENV", "not specified"),
-            }
-        except Exception as e:
-            logging.getLogger('').exception("Error building logger properties", extra={
-                ERROR_MESSAGE: str(e),
-                ERROR_TYPE: type(e).__name__,
-                ERROR_STACK_TRACE: traceback.format_exc()
-            })
+        # The service info read at startup, shared with the /info endpoint
+        service_info = service_info or SERVICE_INFO or {}
+        self.ecs_fields = {
+            f"service.{key}": service_info[key] for key in ("name", "version", "environment") if key in service_info
+        }
 
     def filter(self, record):
-        for key, value in self.ecs_fields.items():
-            setattr(record, key, value)
+        record.__dict__.update(self.ecs_fields)
         return True
 
 
 # Define a JsonFormatter that filter out null fields
 class NonNullJsonFormatter(JsonFormatter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Second of the last record and its formatted date and time, shared by the records of the same second
+        self._last_second = (None, "")
+
+    def format_timestamp(self, created: float) -> str:
+        # ISO 8601 in UTC with milliseconds, e.g. 2025-07-12T09:30:00.123Z
+        second = int(created)
+        last_second, formatted = self._last_second
+        if second != last_second:
+            formatted = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._last_second = (second, formatted)
+        return f"{formatted}.{int((created - second) * 1000):03d}Z"
+
+    def add_fields(self, log_record, record, message_dict):
+        # The timestamp of the record is formatted once, and comes first
+        log_record['@timestamp'] = self.format_timestamp(record.created)
+        super().add_fields(log_record, record, message_dict)
+
     def process_log_record(self, log_record):
         # Format timestamp in ISO 8601
-        log_record['@timestamp'] = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        if '@timestamp' not in log_record:
+            log_record['@timestamp'] = datetime.now(timezone.utc).isoformat(timespec='milliseconds') \
+                .replace('+00:00', 'Z')
 
         # Filter null fields
         return {k: v for k, v in log_record.items() if v is not None}
 
 
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands the records to a QueueListener thread, which formats and writes them, so a slow stdout never blocks
+    the threads serving the requests. When the queue is full the records are dropped and counted: the next record
+    that fits is preceded by a warning with the number of records dropped since the last one.
+    """
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record):
+        # Formatting, and so JSON serialization, is left to the listener: only the message is rendered here,
+        # in case its arguments change after the call
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        # Called with the handler lock held
+        try:
+            if self._unreported:
+                self.queue.put_nowait(self._dropped_record(record))
+                self._unreported = 0
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+            self._unreported += 1
+
+    def _dropped_record(self, record) -> logging.LogRecord:
+        dropped_record = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                           f"{self._unreported} log records dropped, the log queue was full",
+                                           None, None)
+        dropped_record.created = record.created
+        dropped_record.droppedRecords = self._unreported
+        dropped_record.droppedRecordsTotal = self.dropped
+        return dropped_record
+
+
+def _start_log_listener(handler: DroppingQueueHandler, console: logging.Handler):
+    listener = QueueListener(handler.queue, console, respect_handler_level=True)
+    listener.start()
+    _queue_logging.update(handler=handler, console=console, listener=listener)
+
+
+def _use_log_queue(loggers: list):
+    # Replaces the console handler of the loggers with a queue handler writing to it from a background thread
+    console = loggers[0].handlers[0]
+    handler = DroppingQueueHandler(Queue(LOG_QUEUE_SIZE))
+    for logger in loggers:
+        logger.removeHandler(console)
+        logger.addHandler(handler)
+    _start_log_listener(handler, console)
+
+
+def stop_log_listener():
+    """
+    Writes the queued records and stops the listener thread, if any.
+    """
+    listener = _queue_logging["listener"]
+    if listener is not None:
+        _queue_logging["listener"] = None
+        listener.stop()
+
+
+def restart_log_listener():
+    """
+    Starts a new listener thread in a forked process (e.g. a gunicorn worker): only the forking thread survives
+    a fork, and the queue of the parent, whose records the parent writes itself, may have been left locked.
+    """
+    handler = _queue_logging["handler"]
+    if handler is not None:
+        handler.queue = Queue(LOG_QUEUE_SIZE)
+        _start_log_listener(handler, _queue_logging["console"])
+
+
+atexit.register(stop_log_listener)
+
+
 # Configure logging
 def on_starting(server):
     log_level_str = os.getenv("APP_LOGGING_LEVEL", "INFO").upper()
+    # Configured again (e.g. by gunicorn's on_starting in preload mode): the queued records are written first
+    stop_log_listener()
 
     dictConfig({
         'version': 1,
+        # In preload mode the application modules, and their loggers, exist before gunicorn's on_starting runs
+        'disable_existing_loggers': False,
         'formatters': {
             'json': {
                 '()': NonNullJsonFormatter,
-                'format': '%(asctime)s %(levelname)s %(name)s %(message)s '
+                # @timestamp is added by NonNullJsonFormatter
+                'format': '%(levelname)s %(name)s %(message)s '
                           '%(service.name)s %(service.version)s %(service.environment)s '
                           '%(error.type)s %(error.message)s %(error.stack_trace)s '
                           '%(method)s %(startTime)s %(requestId)s %(operationId)s %(_request_args)s '
                           '%(responseTime)s %(status)s %(httpCode)s %(response)s',
                 'rename_fields': {
-                    "asctime": "@timestamp",
                     "levelname": "log.level",
                     "name": "log.logger",
                     "_request_args": "args",
@@ -99,5 +203,7 @@ def on_starting(server):
             'handlers': ['console']
         }
     })
+    if LEAN_LOGGING:
+        _use_log_queue([logging.getLogger(), logging.getLogger('gunicorn'), logging.getLogger('flask.app')])
     logger = logging.getLogger(__name__)
     logger.info("🔥 Logging configured on Gunicorn startup")
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import Counter as EntityCounter
+from typing import List, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, \
+    generate_latest, multiprocess
+
+from src.process_memory import read_process_memory
+
+# With gunicorn, every process writes its metrics to memory-mapped files in this directory and the worker serving
+# /metrics aggregates all of them. gunicorn_config empties it when the master starts.
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+MEMORY_UPDATE_INTERVAL = float(os.getenv("METRICS_MEMORY_INTERVAL_SECONDS", "15"))
+
+STAGES = ("parse", "nlp", "recognizers", "anonymization", "serialization")
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INPUT_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+STAGE_DURATION = Histogram(
+    "anonymizer_stage_duration_seconds",
+    "Time spent in each processing stage: request parse, spaCy NLP, pattern recognizers, anonymization "
+    "and response serialization (batches are observed once per batch)",
+    ["stage"],
+    buckets=DURATION_BUCKETS
+)
+REQUEST_DURATION = Histogram(
+    "anonymizer_request_duration_seconds",
+    "Time spent serving a request, by API operation",
+    ["method"],
+    buckets=DURATION_BUCKETS
+)
+REQUESTS = Counter("anonymizer_requests", "Requests served, by API operation and HTTP status code",
+                   ["method", "code"])
+REQUESTS_IN_PROGRESS = Gauge(
+    "anonymizer_requests_in_progress",
+    "Requests being served, by API operation",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+ENTITIES_DETECTED = Counter("anonymizer_entities_detected", "Entities detected by the analyzer, by type",
+                            ["entity_type"])
+INPUT_SIZE = Histogram("anonymizer_input_size_characters", "Length of the texts to anonymize",
+                       buckets=INPUT_SIZE_BUCKETS)
+PROCESS_MEMORY = Gauge(
+    "anonymizer_process_resident_memory_bytes",
+    "Resident set size of each serving process, gunicorn master and workers "
+    "(its peak where the current one is not available)",
+    multiprocess_mode="liveall"
+)
+
+_stage_durations = {stage: STAGE_DURATION.labels(stage=stage) for stage in STAGES}
+_last_memory_update = {"pid": None, "time": 0.0}
+# Entities detected for the request served by each thread, logged in lean logging mode
+_request_entities = threading.local()
+
+
+def observe_stage(stage: str, seconds: float):
+    _stage_durations[stage].observe(seconds)
+
+
+def stage_timer(stage: str):
+    """
+    Context manager observing the time spent in its block as the duration of the stage.
+    """
+    return _stage_durations[stage].time()
+
+
+def record_entities(analyzer_results: List):
+    _request_entities.count = getattr(_request_entities, "count", 0) + len(analyzer_results)
+    for entity_type, count in EntityCounter(result.entity_type for result in analyzer_results).items():
+        ENTITIES_DETECTED.labels(entity_type=entity_type).inc(count)
+
+
+def observe_input_size(text: str):
+    INPUT_SIZE.observe(len(text))
+
+
+def request_entity_count() -> int:
+    """
+    Returns the entities detected since the request served by the current thread started. Texts found in the
+    result cache or analyzed by the request coalescer thread are not counted.
+    """
+    return getattr(_request_entities, "count", 0)
+
+
+def request_started(method: str):
+    _request_entities.count = 0
+    REQUESTS_IN_PROGRESS.labels(method=method).inc()
+
+
+def request_finished(method: str, status_code: int, seconds: float):
+    REQUESTS_IN_PROGRESS.labels(method=method).dec()
+    REQUEST_DURATION.labels(method=method).observe(seconds)
+    REQUESTS.labels(method=method, code=str(status_code)).inc()
+    update_process_memory()
+
+
+def update_process_memory(force: bool = False):
+    """
+    Updates the memory gauge of this process, at most once every METRICS_MEMORY_INTERVAL_SECONDS:
+    in multiprocess mode the worker serving /metrics can't read the memory of the other ones.
+    """
+    now = time.monotonic()
+    if not force and _last_memory_update["pid"] == os.getpid() \
+            and now - _last_memory_update["time"] < MEMORY_UPDATE_INTERVAL:
+        return
+    _last_memory_update.update(pid=os.getpid(), time=now)
+    memory = read_process_memory()
+    PROCESS_MEMORY.set(memory.get("rss", memory.get("maxRss", 0)))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Returns the metrics in the Prometheus text format, aggregated across the workers in multiprocess mode,
+    and their content type.
+    """
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
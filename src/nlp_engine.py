@@ -0,0 +1,44 @@
+import logging
+import time
+from typing import Iterable, List
+import spacy
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+logger = logging.getLogger(__name__)
+
+
+def parse_components(components: str) -> List[str]:
+    """
+    Parses a comma separated list of spaCy pipeline component names (e.g. "parser,senter").
+    """
+    return [component.strip() for component in components.split(",") if component.strip()]
+
+
+class TrimmedSpacyNlpEngine(SpacyNlpEngine):
+    """
+    SpacyNlpEngine that loads each model without the pipeline components Presidio doesn't use.
+
+    Presidio only reads the tokens, their lemmas and the named entities of the processed document:
+    components like the dependency parser run on every request but their output is thrown away.
+    The components to leave out are listed in the "exclude" key of the model configuration, e.g.
+    {"lang_code": "it", "model_name": "it_core_news_lg", "exclude": ["parser"]}.
+    Excluded components are not even loaded, so they cost neither time nor memory.
+    """
+
+    def load(self) -> None:
+        self.nlp = {}
+        for model in self.models:
+            self._validate_model_params(model)
+            self._download_spacy_model_if_needed(model["model_name"])
+
+            start_time = time.perf_counter()
+            excluded_components: Iterable[str] = model.get("exclude", [])
+            nlp = spacy.load(model["model_name"], exclude=excluded_components)
+            self.nlp[model["lang_code"]] = nlp
+
+            logger.info("spaCy model %s loaded", model["model_name"], extra={
+                "language": model["lang_code"],
+                "pipeline": nlp.pipe_names,
+                "excludedComponents": list(excluded_components),
+                "loadTime": round((time.perf_counter() - start_time) * 1000, 3)
+            })
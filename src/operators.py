@@ -0,0 +1,137 @@
+import re
+from functools import lru_cache
+from typing import Dict
+
+from presidio_anonymizer.entities import InvalidParamError
+from presidio_anonymizer.operators import Operator, OperatorType
+from presidio_anonymizer.services.validators import validate_parameter
+
+DIGIT_REGEX = re.compile(r"\d")
+# Every character following another one in the same space-separated word
+NON_INITIAL_REGEX = re.compile(r"(?<=[^ ])[^ ]")
+
+
+def _validate_masking_char(params: Dict):
+    masking_char = params.get("masking_char", "*")
+    if not isinstance(masking_char, str) or len(masking_char) != 1:
+        raise InvalidParamError("Invalid input, masking_char must be a character")
+
+
+class MaskKeepEnds(Operator):
+    """
+    Masks a text keeping its first keep_prefix and last keep_suffix characters, e.g. "RSSMRA80********".
+
+    Params:
+        keep_prefix: characters kept at the start
+        keep_suffix: characters kept at the end
+        masking_char: masking character, "*" by default
+        ignore_spaces: spaces are not counted in the number of masking characters (e.g. "*********7890"
+            for "+39 333 123 7890" with keep_suffix 4)
+        only_digits: only the digits between the kept ends are masked, other characters are kept
+    """
+
+    def operate(self, text: str = None, params: Dict = None) -> str:
+        if not text:
+            return ""
+        keep_prefix = params["keep_prefix"]
+        keep_suffix = params["keep_suffix"]
+        masking_char = params.get("masking_char", "*")
+        # text[-0:] would be the whole text
+        suffix = text[-keep_suffix:] if keep_suffix else ""
+        if params.get("only_digits"):
+            masked_end = max(keep_prefix, len(text) - keep_suffix)
+            return text[:keep_prefix] + DIGIT_REGEX.sub(masking_char, text[keep_prefix:masked_end]) + suffix
+        masked_length = len(text) - keep_prefix - keep_suffix
+        if params.get("ignore_spaces"):
+            masked_length -= text.count(" ")
+        return text[:keep_prefix] + masking_char * masked_length + suffix
+
+    def validate(self, params: Dict = None) -> None:
+        validate_parameter(params.get("keep_prefix"), "keep_prefix", int)
+        validate_parameter(params.get("keep_suffix"), "keep_suffix", int)
+        _validate_masking_char(params)
+
+    def operator_name(self) -> str:
+        return "mask_keep_ends"
+
+    def operator_type(self) -> OperatorType:
+        return OperatorType.Anonymize
+
+
+class KeepInitials(Operator):
+    """
+    Masks every space-separated word of a text but its first character, e.g. "M**** R****".
+    """
+
+    def operate(self, text: str = None, params: Dict = None) -> str:
+        return NON_INITIAL_REGEX.sub(params.get("masking_char", "*"), text) if text else ""
+
+    def validate(self, params: Dict = None) -> None:
+        _validate_masking_char(params)
+
+    def operator_name(self) -> str:
+        return "keep_initials"
+
+    def operator_type(self) -> OperatorType:
+        return OperatorType.Anonymize
+
+
+class MaskEmail(Operator):
+    """
+    Masks the local part of an email address but its first and last characters, e.g. "m********i@pagopa.it".
+    """
+
+    def operate(self, text: str = None, params: Dict = None) -> str:
+        if not text:
+            return ""
+        local_part = text.split("@", 1)[0]
+        domain = text.rsplit("@", 1)[-1]
+        if not local_part:
+            return "@" + domain
+        masking_char = params.get("masking_char", "*")
+        return local_part[0] + masking_char * (len(local_part) - 2) + local_part[-1] + "@" + domain
+
+    def validate(self, params: Dict = None) -> None:
+        _validate_masking_char(params)
+
+    def operator_name(self) -> str:
+        return "mask_email"
+
+    def operator_type(self) -> OperatorType:
+        return OperatorType.Anonymize
+
+
+@lru_cache(maxsize=64)
+def _compiled_pattern(pattern) -> re.Pattern:
+    # Compiled once per pattern text, not once per entity
+    return re.compile(pattern)
+
+
+class StripChars(Operator):
+    """
+    Removes the characters matched by the pattern (digits and number punctuation by default,
+    e.g. "Via Roma" for "Via Roma, 12") and the surrounding whitespace. The pattern is a regex, as a text
+    (e.g. from the policy file) or precompiled.
+    """
+
+    DEFAULT_PATTERN = re.compile(r"[,.:\d]+")
+
+    def operate(self, text: str = None, params: Dict = None) -> str:
+        return _compiled_pattern(params.get("pattern", self.DEFAULT_PATTERN)).sub("", text).strip() if text else ""
+
+    def validate(self, params: Dict = None) -> None:
+        pattern = params.get("pattern", self.DEFAULT_PATTERN)
+        validate_parameter(pattern, "pattern", (str, re.Pattern))
+        try:
+            _compiled_pattern(pattern)
+        except re.error as e:
+            raise InvalidParamError(f"Invalid input, pattern is not a valid regex: {e}") from e
+
+    def operator_name(self) -> str:
+        return "strip_chars"
+
+    def operator_type(self) -> OperatorType:
+        return OperatorType.Anonymize
+
+
+NATIVE_OPERATORS = [MaskKeepEnds, KeepInitials, MaskEmail, StripChars]
@@ -0,0 +1,35 @@
+import resource
+
+SMAPS_ROLLUP_PATH = "/proc/self/smaps_rollup"
+
+# smaps_rollup fields reported, renamed to the keys used in the log record
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "sharedClean",
+    "Shared_Dirty": "sharedDirty",
+    "Private_Clean": "privateClean",
+    "Private_Dirty": "privateDirty",
+}
+
+
+def read_process_memory(smaps_rollup_path: str = SMAPS_ROLLUP_PATH) -> dict:
+    """
+    Returns the memory usage of the current process, in bytes.
+    On Linux the report comes from smaps_rollup and splits the resident set into pages shared
+    with other processes (e.g. the gunicorn master and the other workers) and private ones.
+    Elsewhere only the peak resident set size is available.
+    """
+    try:
+        memory = {}
+        with open(smaps_rollup_path) as smaps_rollup:
+            for line in smaps_rollup:
+                name, _, value = line.partition(":")
+                if name in SMAPS_FIELDS:
+                    memory[SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+        memory["shared"] = memory.get("sharedClean", 0) + memory.get("sharedDirty", 0)
+        memory["private"] = memory.get("privateClean", 0) + memory.get("privateDirty", 0)
+        return memory
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux
+        return {"maxRss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Iterable, Iterator, List
+
+from presidio_analyzer import EntityRecognizer
+from presidio_analyzer.nlp_engine import NlpEngine
+
+NLP_ENGINE_NAME = "spacy"
+
+
+class RecognizerProfiler:
+    """
+    Cumulative time, calls and results of every recognizer of an analyzer and of its NLP engine.
+
+    Profiling is opt-in: either always on (enabled), or only for the requests that ask for it, whose thread sets
+    set_request_profiling(True). When off, an instrumented call only costs a flag check.
+    Only timings and counts are kept, never any text.
+
+    :param enabled: profile every call, not only those of the requests that ask for it
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._request = threading.local()
+
+    def set_request_profiling(self, active: bool):
+        """
+        Turns profiling on or off for the calls made by the current thread (i.e. the request it serves).
+        """
+        self._request.active = active
+
+    def active(self) -> bool:
+        return self.enabled or getattr(self._request, "active", False)
+
+    def record(self, name: str, elapsed: float, results: int = 0):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {"calls": 0, "time": 0.0, "results": 0}
+            stats["calls"] += 1
+            stats["time"] += elapsed
+            stats["results"] += results
+
+    def instrument_recognizers(self, recognizers: Iterable[EntityRecognizer]):
+        """
+        Wraps the analyze method of every recognizer with a timer. A recognizer is wrapped once, even when shared by
+        several analyzers (e.g. the profiles of a policy).
+        """
+        for recognizer in recognizers:
+            if getattr(recognizer.analyze, "profiler", None) is not self:
+                recognizer.analyze = self._timed_analyze(recognizer.name, recognizer.analyze)
+
+    def instrument_nlp_engine(self, nlp_engine: NlpEngine):
+        """
+        Wraps the processing methods of the NLP engine with a timer.
+        """
+        nlp_engine.process_text = self._timed_process_text(nlp_engine.process_text)
+        nlp_engine.process_batch = self._timed_process_batch(nlp_engine.process_batch)
+
+    def _timed_analyze(self, name: str, analyze):
+        def timed_analyze(*args, **kwargs):
+            if not self.active():
+                return analyze(*args, **kwargs)
+            start_time = time.perf_counter()
+            results = analyze(*args, **kwargs)
+            self.record(name, time.perf_counter() - start_time, len(results or []))
+            return results
+
+        timed_analyze.profiler = self
+        return timed_analyze
+
+    def _timed_process_text(self, process_text):
+        def timed_process_text(*args, **kwargs):
+            if not self.active():
+                return process_text(*args, **kwargs)
+            start_time = time.perf_counter()
+            nlp_artifacts = process_text(*args, **kwargs)
+            self.record(NLP_ENGINE_NAME, time.perf_counter() - start_time, len(nlp_artifacts.entities))
+            return nlp_artifacts
+
+        return timed_process_text
+
+    def _timed_process_batch(self, process_batch):
+        def timed_process_batch(*args, **kwargs) -> Iterator:
+            processed = process_batch(*args, **kwargs)
+            if not self.active():
+                yield from processed
+                return
+            # spaCy processes the texts lazily: each text is timed as it is taken from the batch
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    text, nlp_artifacts = next(processed)
+                except StopIteration:
+                    return
+                self.record(NLP_ENGINE_NAME, time.perf_counter() - start_time, len(nlp_artifacts.entities))
+                yield text, nlp_artifacts
+
+        return timed_process_batch
+
+    def stats(self) -> List[dict]:
+        """
+        Returns name, calls, total and mean time (in milliseconds) and number of results of every profiled
+        component, the slowest first.
+        """
+        with self._lock:
+            stats = {name: dict(component) for name, component in self._stats.items()}
+        return [
+            {
+                "name": name,
+                "calls": component["calls"],
+                "totalTime": round(component["time"] * 1000, 3),
+                "meanTime": round(component["time"] * 1000 / component["calls"], 3),
+                "results": component["results"],
+            }
+            for name, component in sorted(stats.items(), key=lambda item: item[1]["time"], reverse=True)
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
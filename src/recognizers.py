@@ -0,0 +1,205 @@
+import re
+import re._constants as sre_constants
+import re._parser as sre_parser
+import threading
+from typing import Callable, Iterable, List, Optional, Set
+from presidio_analyzer import PatternRecognizer, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts
+
+WORD_REGEX = re.compile(r"\w+")
+
+TokenCheck = Callable[[str], bool]
+
+
+def _first_words(keywords: Iterable[str]) -> Set[str]:
+    return {WORD_REGEX.match(keyword.casefold()).group() for keyword in keywords}
+
+
+def ends_with_any(keywords: Iterable[str]) -> TokenCheck:
+    """
+    Token check matching the words that end with the first word of one of the keywords
+    (e.g. patterns like "(Via|Viale) +..." without a leading word boundary).
+    """
+    suffixes = _first_words(keywords)
+    lengths = sorted({len(suffix) for suffix in suffixes})
+    return lambda token: any(token[-length:] in suffixes for length in lengths)
+
+
+def starts_with_any(keywords: Iterable[str]) -> TokenCheck:
+    """
+    Token check matching the words that start with the first word of one of the keywords
+    (e.g. patterns like "\\W(visita|esame)..." without a trailing word boundary).
+    """
+    prefixes = _first_words(keywords)
+    lengths = sorted({len(prefix) for prefix in prefixes})
+    return lambda token: any(token[:length] in prefixes for length in lengths)
+
+
+def short_with_digit(max_length: int) -> TokenCheck:
+    """
+    Token check matching the words of at most max_length characters that contain a digit.
+    """
+    return lambda token: len(token) <= max_length and any(char.isdigit() for char in token)
+
+
+SINGLE_CHARACTER_OPCODES = (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN,
+                            sre_constants.CATEGORY)
+
+
+def _single_character(parsed) -> bool:
+    return len(parsed) == 1 and parsed[0][0] in SINGLE_CHARACTER_OPCODES
+
+
+def _backtracking_quantifier(parsed, atomic: bool = False) -> bool:
+    """
+    Outside atomic groups any unbounded greedy or lazy quantifier backtracks. Inside an atomic group (or the item of
+    a possessive quantifier) nothing is given back once the group matched, but the repeats still backtrack within it:
+    only the unbounded ones of a single character are allowed there, since they backtrack at most linearly.
+    """
+    for opcode, argument in parsed:
+        if opcode in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            _, max_repeat, item = argument
+            if max_repeat == sre_constants.MAXREPEAT and not (atomic and _single_character(item)):
+                return True
+            if _backtracking_quantifier(item, atomic):
+                return True
+        elif opcode == sre_constants.POSSESSIVE_REPEAT:
+            if _backtracking_quantifier(argument[2], atomic=True):
+                return True
+        elif opcode == sre_constants.ATOMIC_GROUP:
+            if _backtracking_quantifier(argument, atomic=True):
+                return True
+        elif opcode == sre_constants.SUBPATTERN:
+            if _backtracking_quantifier(argument[-1], atomic):
+                return True
+        elif opcode in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _backtracking_quantifier(argument[1], atomic):
+                return True
+        elif opcode == sre_constants.BRANCH:
+            if any(_backtracking_quantifier(item, atomic) for item in argument[1]):
+                return True
+        elif opcode == sre_constants.GROUPREF_EXISTS:
+            if any(item is not None and _backtracking_quantifier(item, atomic) for item in argument[1:]):
+                return True
+    return False
+
+
+def has_backtracking_quantifier(regex: str) -> bool:
+    """
+    Returns True if the regex has an unbounded greedy or lazy quantifier (*, +, {n,}) outside an atomic group, or
+    one inside an atomic group (or a possessive quantifier) that repeats more than a single character, e.g.
+    "(?>(a|aa)+)": the regex engine can backtrack on it, in time exponential in the length of the text for nested ones.
+    The patterns of a LinearPatternRecognizer use possessive quantifiers (*+, ++, {n,}+) instead.
+    """
+    return _backtracking_quantifier(sre_parser.parse(regex))
+
+
+class CandidatePrefilter:
+    """
+    Finds, with a single scan of the text, which recognizers have at least one candidate match.
+
+    The text is split into case-folded words once; every recognizer registers a cheap check on those words
+    that is true for (at least) every word its patterns can start on, e.g. the toponym opening an address.
+    Only the recognizers with a candidate then run their precise (and much more expensive) patterns,
+    instead of every pattern scanning the whole text on every request.
+    """
+
+    def __init__(self):
+        self.checks = {}
+        self._last_scan = threading.local()
+
+    def add_check(self, name: str, check: TokenCheck):
+        self.checks[name] = check
+        self._last_scan = threading.local()
+
+    def candidates(self, text: str) -> Set[str]:
+        """
+        Returns the names of the recognizers with at least one candidate in the text.
+        The result of the last scan is kept per thread: the analyzer passes the same text to every recognizer.
+        """
+        last_scan = self._last_scan
+        if getattr(last_scan, "text", None) is text:
+            return last_scan.candidates
+
+        tokens = set(WORD_REGEX.findall(text.casefold()))
+        found = {name for name, check in self.checks.items() if any(check(token) for token in tokens)}
+
+        last_scan.text = text
+        last_scan.candidates = found
+        return found
+
+
+class PrefilteredPatternRecognizer(PatternRecognizer):
+    """
+    PatternRecognizer that runs its patterns only when the shared prefilter found a candidate for it.
+
+    :param prefilter: prefilter shared by the custom recognizers
+    :param candidate_check: check true for every word the recognizer patterns can start on
+    """
+
+    def __init__(self, prefilter: CandidatePrefilter, candidate_check: TokenCheck, **kwargs):
+        super().__init__(**kwargs)
+        self.prefilter = prefilter
+        self.prefilter.add_check(self.name, candidate_check)
+
+    def analyze(
+            self,
+            text: str,
+            entities: List[str],
+            nlp_artifacts: Optional[NlpArtifacts] = None,
+            regex_flags: Optional[int] = None,
+    ) -> List[RecognizerResult]:
+        if self.name not in self.prefilter.candidates(text):
+            return []
+        return super().analyze(text, entities, nlp_artifacts, regex_flags)
+
+
+class LinearPatternRecognizer(PrefilteredPatternRecognizer):
+    """
+    Prefiltered recognizer with a single pattern, analyzed in time linear in the length of the text.
+
+    The pattern must not backtrack (e.g. possessive quantifiers instead of nested greedy ones).
+    Matches returned by finditer never overlap, so the quadratic duplicate removal that PatternRecognizer
+    runs on its results is skipped: on inputs with thousands of matches it dominates the analysis time.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if len(self.patterns) != 1:
+            raise ValueError("LinearPatternRecognizer should be initialized with a single pattern")
+
+    def analyze(
+            self,
+            text: str,
+            entities: List[str],
+            nlp_artifacts: Optional[NlpArtifacts] = None,
+            regex_flags: Optional[int] = None,
+    ) -> List[RecognizerResult]:
+        if self.name not in self.prefilter.candidates(text):
+            return []
+
+        flags = regex_flags if regex_flags else self.global_regex_flags
+        pattern = self.patterns[0]
+        if not pattern.compiled_regex or pattern.compiled_with_flags != flags:
+            pattern.compiled_with_flags = flags
+            pattern.compiled_regex = re.compile(pattern.regex, flags=flags)
+
+        results = []
+        for match in pattern.compiled_regex.finditer(text):
+            start, end = match.span()
+            if start == end:
+                continue
+            results.append(RecognizerResult(
+                entity_type=self.supported_entities[0],
+                start=start,
+                end=end,
+                score=pattern.score,
+                analysis_explanation=self.build_regex_explanation(
+                    self.name, pattern.name, pattern.regex, pattern.score, None, flags
+                ),
+                recognition_metadata={
+                    RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                    RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                },
+            ))
+        return results
@@ -0,0 +1,35 @@
+import logging
+import os
+import traceback
+from configparser import ConfigParser
+from typing import Dict, Optional
+
+ERROR_MESSAGE = "error.message"
+ERROR_TYPE = "error.type"
+ERROR_STACK_TRACE = "error.stack_trace"
+
+
+def load_service_info(config_path: str = 'setup.cfg') -> Optional[Dict[str, str]]:
+    """
+    Returns name and version of the service, read from setup.cfg, and its environment, read from ENV,
+    or None when they can't be read.
+    """
+    try:
+        config = ConfigParser()
+        config.read(config_path)
+        return {
+            "name": config.get("metadata", "name"),
+            "version": config.get("metadata", "version"),
+            "environment": os.getenv("ENV", "not specified"),
+        }
+    except Exception as e:
+        logging.getLogger(__name__).exception("Error reading the service info", extra={
+            ERROR_MESSAGE: str(e),
+            ERROR_TYPE: type(e).__name__,
+            ERROR_STACK_TRACE: traceback.format_exc()
+        })
+        return None
+
+
+# Read once at startup: served by /info and added to every log record
+SERVICE_INFO = load_service_info()
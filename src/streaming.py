@@ -0,0 +1,220 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, List, Optional
+
+from presidio_analyzer import RecognizerResult
+
+from src.anonymizer_logic import AnonymizationMode, analyze_text, current_profile
+
+# Chunks end after a sentence terminator if possible, otherwise after a whitespace
+SENTENCE_END_REGEX = re.compile(r"[.!?;:\n]\s")
+WHITESPACE_REGEX = re.compile(r"\s")
+
+
+class StreamFormatError(ValueError):
+    """
+    Raised when an uploaded stream is malformed.
+    """
+
+
+def find_chunk_end(text: str, chunk_size: int, start: int = 0) -> int:
+    """
+    Returns where the chunk starting at position start of the text should end: after the last sentence
+    terminator (or, failing that, the last whitespace) in the second half of the next chunk_size characters.
+    Texts without any such boundary are cut at chunk_size.
+    """
+    if len(text) - start <= chunk_size:
+        return len(text)
+    window_start = start + chunk_size // 2
+    for regex in (SENTENCE_END_REGEX, WHITESPACE_REGEX):
+        boundaries = [match.end() for match in regex.finditer(text, window_start, start + chunk_size)]
+        if boundaries:
+            return boundaries[-1]
+    return start + chunk_size
+
+
+def _last_boundary(text: str, start: int, end: int) -> int:
+    # Position after the last whitespace between start and end, or -1 when there is none
+    for position in range(end, start, -1):
+        if text[position - 1].isspace():
+            return position
+    return -1
+
+
+def _shift(result: RecognizerResult, offset: int) -> RecognizerResult:
+    # Results starting before the offset are clipped to it
+    return RecognizerResult(
+        entity_type=result.entity_type,
+        start=max(result.start - offset, 0),
+        end=result.end - offset,
+        score=result.score,
+        analysis_explanation=result.analysis_explanation,
+        recognition_metadata=result.recognition_metadata,
+    )
+
+
+class StreamAnonymizer:
+    """
+    Anonymizes a text received in pieces, emitting the anonymized text chunk by chunk.
+
+    Every chunk of about chunk_size characters is analyzed together with up to overlap characters before it
+    (already emitted, giving NER and the context words the text around the chunk start) and after it (still
+    to be emitted), so entities crossing a chunk edge are still detected. The surrounding characters start and
+    end on whitespace, and never inside an entity, so that no recognizer sees a truncated token. An entity
+    starting in the chunk and ending after its edge makes the chunk extend to the entity end, and an entity
+    starting before the chunk and missed by the previous one is anonymized from the chunk start. The entities
+    found after the chunk are left to the next one, which anonymizes them even if its own analysis misses them.
+    Memory is bounded by chunk_size + 2 * overlap characters plus the size of the pieces received.
+
+    :param mode: detection mode
+    :param chunk_size: number of characters analyzed at once
+    :param overlap: number of characters analyzed before and after each chunk, should exceed the longest entity
+    """
+
+    def __init__(self, mode: AnonymizationMode, chunk_size: int, overlap: int):
+        if chunk_size <= 0 or overlap < 0:
+            raise ValueError("chunk_size should be positive and overlap not negative")
+        self.mode = mode
+        # Every chunk of the stream is anonymized with the same version of the anonymization policy
+        self.profile = current_profile()
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+        # Position in the buffer of the first character not emitted yet: emitting a chunk never copies the buffer
+        self._position = 0
+        self._context = ""
+        # Entities found after the last chunk emitted, relative to the end of that chunk
+        self._look_ahead_results: List[RecognizerResult] = []
+
+    def feed(self, piece: str) -> Iterator[str]:
+        """
+        Adds a piece of the text, returning the anonymized chunks that can already be emitted.
+        """
+        self._buffer = self._buffer[self._position:] + piece
+        self._position = 0
+        while len(self._buffer) - self._position >= self.chunk_size + self.overlap:
+            yield self._emit_chunk(final=False)
+
+    def close(self) -> Iterator[str]:
+        """
+        Returns the anonymized chunks of the rest of the text.
+        """
+        while self._position < len(self._buffer):
+            yield self._emit_chunk(final=True)
+        self._buffer = ""
+        self._position = 0
+
+    def _look_ahead_end(self, chunk_end: int, final: bool) -> int:
+        # The look-ahead ends on whitespace, unless it reaches the end of the text or holds no whitespace at all
+        end = min(chunk_end + self.overlap, len(self._buffer))
+        if final and end == len(self._buffer):
+            return end
+        boundary = _last_boundary(self._buffer, chunk_end, end)
+        return boundary if boundary > chunk_end else end
+
+    def _context_start(self, window: str, emit_end: int, results: List[RecognizerResult]) -> int:
+        # Start of the last overlap characters of the emitted text, on a token and never inside an entity
+        if emit_end <= self.overlap:
+            return 0
+        match = WHITESPACE_REGEX.search(window, emit_end - self.overlap - 1, emit_end)
+        start = match.end() if match else emit_end
+        for result in sorted(results, key=lambda result: result.start, reverse=True):
+            if result.start < start < result.end:
+                start = result.start
+        return start
+
+    def _masked_tail(self, window: str, result: RecognizerResult, offset: int) -> Optional[str]:
+        # What follows the offset in the anonymized entity, when the operator keeps the length (as masks do):
+        # masking only the part in the chunk would keep the wrong characters. Other operators get the part alone.
+        text = window[result.start:result.end]
+        anonymized = self.profile.anonymizer.anonymize(text, [_shift(result, result.start)])
+        return anonymized[offset - result.start:] if len(anonymized) == len(text) else None
+
+    def _emit_chunk(self, final: bool) -> str:
+        context = self._context
+        chunk_end = find_chunk_end(self._buffer, self.chunk_size, self._position)
+        window = context + self._buffer[self._position:self._look_ahead_end(chunk_end, final)]
+        offset = len(context)
+        window_results = analyze_text(window, self.mode, self.profile)
+        # Entities found after the previous chunk are kept even when this window misses them
+        look_ahead_results = [_shift(result, -offset) for result in self._look_ahead_results]
+        results = [result for result in window_results if result.end > offset] + \
+            [result for result in look_ahead_results if result.end <= len(window)]
+
+        # Extend the chunk to the end of the entities crossing its edge
+        emit_end = offset + chunk_end - self._position
+        extended = True
+        while extended:
+            extended = False
+            for result in results:
+                if result.start < emit_end < result.end:
+                    emit_end = result.end
+                    extended = True
+
+        chunk = window[offset:emit_end]
+        chunk_results = [result for result in results if result.end <= emit_end]
+        # An entity starting before the chunk, missed by the previous one, is anonymized from the chunk start
+        clipped_results = [result for result in chunk_results if result.start < offset]
+        for result in sorted(clipped_results, key=lambda result: result.end):
+            masked_tail = self._masked_tail(window, result, offset)
+            if masked_tail is not None:
+                chunk = masked_tail + chunk[len(masked_tail):]
+                chunk_results.remove(result)
+        chunk_results = [_shift(result, offset) for result in chunk_results]
+        anonymized_chunk = self.profile.anonymizer.anonymize(chunk, chunk_results)
+
+        self._context = window[self._context_start(window, emit_end, window_results):emit_end] if self.overlap else ""
+        self._look_ahead_results = [_shift(result, emit_end) for result in results if result.end > emit_end]
+        self._position += emit_end - offset
+        return anonymized_chunk
+
+
+def anonymize_stream(pieces: Iterable[str], mode: AnonymizationMode = AnonymizationMode.FULL,
+                     chunk_size: int = 5000, overlap: int = 200) -> Iterator[str]:
+    """
+    Anonymizes a text received as an iterable of pieces (e.g. lines of a file), yielding the anonymized text
+    chunk by chunk as soon as enough input is available. Joining the yielded chunks gives the whole anonymized text.
+    """
+    stream_anonymizer = StreamAnonymizer(mode=mode, chunk_size=chunk_size, overlap=overlap)
+    for piece in pieces:
+        yield from stream_anonymizer.feed(piece)
+    yield from stream_anonymizer.close()
+
+
+def read_ndjson_texts(lines: Iterable[bytes]) -> Iterator[str]:
+    """
+    Returns the "text" field of every non-empty line of an NDJSON upload.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            piece = json.loads(line)
+        except ValueError:
+            raise StreamFormatError(f"Line {line_number} is not valid JSON") from None
+        if not isinstance(piece, dict) or not isinstance(piece.get("text"), str):
+            raise StreamFormatError(f"Missing required field 'text' at line {line_number}")
+        yield piece["text"]
+
+
+def read_text_blocks(stream, block_size: int, encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Reads a binary stream as text, block by block, without splitting multi-byte characters.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def chunks_to_ndjson(chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield json.dumps({"text": chunk}, ensure_ascii=False) + "\n"
@@ -1,106 +0,0 @@
-it_toponym = [
-    "Via",
-    "Viale",
-    "Corso",
-    "Strada",
-    "Stradone",
-    "Circonvallazione",
-    "Piazzale",
-    "Piazza",
-    "Piazzetta",
-    "Largo",
-    "Rotonda",
-    "Vicolo",
-    "Traversa",
-    "Rampa",
-    "Salita",
-    "Discesa",
-    "Spalto",
-    "Passeggiata",
-    "Località",
-    "Contrada",
-    "Ruga",
-    "Rio Terà",
-    "Salizada",
-    "Fondamenta",
-    "Calle",
-    "Campo",
-    "Sottoportego",
-    "Corticella",
-    "Chiasso",
-    "Angiporto"
-]  # Context words in Italian
-
-it_medical_info = [
-    "allergologica",
-    "allergologico",
-    "ambulatoriale",
-    "andrologica",
-    "anatomopatologica",
-    "audiometrico",
-    "cardiologica",
-    "cardiologico",
-    "chirurgica",
-    "chirurgico",
-    "citologica",
-    "citologico",
-    "delle feci",
-    "delle urine",
-    "del sangue",
-    "dermatologica",
-    "dermatologico",
-    "di laboratorio",
-    "diabetologica",
-    "ecografica",
-    "ecografico",
-    "ematologica",
-    "endocrinologica",
-    "endoscopica",
-    "endoscopico",
-    "estetico",
-    "fisioterapica",
-    "geriatrica",
-    "gastroenterologica",
-    "ginecologica",
-    "ginecologico",
-    "immunologica",
-    "immunologico",
-    "intervento",
-    "istologica",
-    "laparoscopico",
-    "logopedica",
-    "maxillo-facciale",
-    "nefrologica",
-    "nefrologico",
-    "neonatologica",
-    "neurochirurgica",
-    "neurologica",
-    "neurologico",
-    "nutrizionistica",
-    "oculistica",
-    "oculistico",
-    "odontoiatrica",
-    "odontoiatrico",
-    "oncologica",
-    "oncologico",
-    "orl",
-    "ortopedica",
-    "ortopedico",
-    "ostetrica",
-    "otorinolaringoiatrica",
-    "pediatrica",
-    "plastico",
-    "pneumologica",
-    "proctologica",
-    "psichiatrica",
-    "psicodiagnostico",
-    "psicologica",
-    "radiografico",
-    "radiologica",
-    "reumatologica",
-    "riabilitativa",
-    "spirometrico",
-    "urologica",
-    "urologico",
-    "vascolare"
-]
\ No newline at end of file
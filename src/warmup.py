@@ -0,0 +1,145 @@
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from http import HTTPStatus
+from typing import Callable, Optional
+
+from src.service_info import SERVICE_INFO
+
+logger = logging.getLogger(__name__)
+
+ERROR_MESSAGE = "error.message"
+ERROR_TYPE = "error.type"
+ERROR_STACK_TRACE = "error.stack_trace"
+
+WARMUP_ENABLED = os.getenv("ANONYMIZER_WARMUP_ENABLED", "true").lower() == "true"
+PRELOAD_APP = os.getenv("GUNICORN_PRELOAD_APP", "false").lower() == "true"
+RETRY_AFTER_SECONDS = int(os.getenv("ANONYMIZER_STARTING_RETRY_AFTER_SECONDS", "5"))
+
+INFO_PATH = "/info"
+READY_PATH = "/ready"
+
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+# Synthetic Italian texts with the entities the service detects, never real data
+WARMUP_TEXTS = [
+    "Buongiorno, sono Mario Rossi, codice fiscale RSSMRA80A01H501U, e ho pagato due volte lo stesso avviso.",
+    "Si prega di inviare la ricevuta a giulia.bianchi@example.com o di chiamare il numero 333 123 4567.",
+    "La multa per il veicolo targato AB123CD è stata pagata con l'iban IT60X0542811101000000123456.",
+    "Residente in Via Roma 12, Luca Ferrari segnala un errore nell'importo della TARI.",
+    "Il pagamento con carta 4111 1111 1111 1111 non va a buon fine e il sito restituisce un errore generico.",
+    "Scrivo per conto di mia madre, Francesca Esposito, ricoverata per diabete, che non riesce ad accedere all'app.",
+]
+
+
+class LazyApp:
+    """
+    WSGI application loading the service (and so the spaCy model and the Presidio engines) in a background thread,
+    then warming it up, while the server already answers the probes.
+
+    Until the service is warm, /info (liveness) answers with the application info, /ready (readiness) with
+    503 and the loading status, and every other request with 503 and a Retry-After header. From then on every
+    request, /ready included, is served by the loaded application. If loading fails, /info answers 500 as well,
+    so the container is restarted. A failed warm-up is only logged: the service is ready, just cold.
+
+    :param load: returns the WSGI application to serve
+    :param warm_up: called once the application is loaded, before it is marked ready
+    """
+
+    def __init__(self, load: Callable[[], Callable], warm_up: Optional[Callable[[], None]] = None):
+        self._load = load
+        self._warm_up = warm_up
+        self._app = None
+        self._ready = threading.Event()
+        self.status = LOADING
+
+    def start(self, background: bool = True) -> "LazyApp":
+        if background:
+            threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        else:
+            self._run()
+        return self
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        start_time = time.perf_counter()
+        try:
+            app = self._load()
+        except Exception as e:
+            self.status = FAILED
+            logger.exception("Error loading the application", extra={
+                ERROR_MESSAGE: str(e),
+                ERROR_TYPE: type(e).__name__,
+                ERROR_STACK_TRACE: traceback.format_exc()
+            })
+            return
+        load_time = time.perf_counter() - start_time
+
+        self.status = WARMING
+        if self._warm_up is not None:
+            try:
+                self._warm_up()
+            except Exception as e:
+                logger.exception("Error warming up the application", extra={
+                    ERROR_MESSAGE: str(e),
+                    ERROR_TYPE: type(e).__name__,
+                    ERROR_STACK_TRACE: traceback.format_exc()
+                })
+
+        self._app = app
+        self.status = READY
+        self._ready.set()
+        logger.info("Application ready", extra={
+            "loadTime": round(load_time, 3),
+            "warmupTime": round(time.perf_counter() - start_time - load_time, 3)
+        })
+
+    def __call__(self, environ, start_response):
+        app = self._app
+        if app is not None:
+            return app(environ, start_response)
+
+        path = environ.get("PATH_INFO", "")
+        if path == INFO_PATH:
+            if self.status == FAILED or SERVICE_INFO is None:
+                return self._respond(start_response, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                     {"error": "An internal server error occurred"})
+            return self._respond(start_response, HTTPStatus.OK, SERVICE_INFO)
+        if path == READY_PATH:
+            return self._respond(start_response, HTTPStatus.SERVICE_UNAVAILABLE, {"status": self.status})
+        return self._respond(start_response, HTTPStatus.SERVICE_UNAVAILABLE,
+                             {"error": "The service is starting, retry later"},
+                             [("Retry-After", str(RETRY_AFTER_SECONDS))])
+
+    @staticmethod
+    def _respond(start_response, status: HTTPStatus, body: dict, headers: Optional[list] = None):
+        payload = json.dumps(body).encode()
+        start_response(f"{status.value} {status.phrase}", [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(payload))),
+            *(headers or []),
+        ])
+        return [payload]
+
+
+def _warm_up():
+    importlib.import_module("src.anonymizer_logic").warm_up(WARMUP_TEXTS)
+
+
+def create_app() -> LazyApp:
+    """
+    Returns the application served by gunicorn. In preload mode it is loaded and warmed up right away, in the
+    master: the workers inherit it through fork(), and no thread started before the fork would survive it.
+    """
+    lazy_app = LazyApp(load=lambda: importlib.import_module("src.app").app,
+                       warm_up=_warm_up if WARMUP_ENABLED else None)
+    return lazy_app.start(background=not PRELOAD_APP)
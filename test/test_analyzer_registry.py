@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch
+
+from presidio_analyzer.predefined_recognizers import UrlRecognizer
+
+from src.analyzer_registry import build_pruned_registry
+from src.anonymizer_logic import NLP_ENGINE, current_profile
+
+
+class TestBuildPrunedRegistry(unittest.TestCase):
+    def test_registry_holds_only_requested_entities(self):
+        registry = build_pruned_registry(
+            entities=["IT_FISCAL_CODE", "IBAN_CODE", "ITALIAN_ADDRESS"],
+            nlp_engine=NLP_ENGINE,
+            custom_recognizers=[current_profile().custom_recognizers["ItalianAddressRecognizer"]],
+        )
+        names = sorted(recognizer.name for recognizer in registry.recognizers)
+        self.assertEqual(names, ["IbanRecognizer", "ItFiscalCodeRecognizer", "ItalianAddressRecognizer"])
+        self.assertTrue(all(recognizer.is_loaded for recognizer in registry.recognizers))
+
+    def test_registry_report_is_logged(self):
+        with self.assertLogs("src.analyzer_registry", level="INFO") as logs:
+            build_pruned_registry(entities=["PERSON", "URL"], nlp_engine=NLP_ENGINE)
+
+        record = logs.records[-1]
+        self.assertEqual([recognizer["name"] for recognizer in record.recognizers],
+                         ["UrlRecognizer", "SpacyRecognizer"])
+        self.assertIn("DateRecognizer", record.prunedRecognizers)
+        self.assertGreaterEqual(record.buildTime, 0)
+
+    def test_pruned_recognizers_are_never_built(self):
+        with patch.object(UrlRecognizer, "load", side_effect=AssertionError("UrlRecognizer built")), \
+                self.assertLogs("src.analyzer_registry", level="INFO") as logs:
+            build_pruned_registry(entities=["IT_FISCAL_CODE"], nlp_engine=NLP_ENGINE)
+
+        record = logs.records[-1]
+        self.assertIn("UrlRecognizer", record.prunedRecognizers)
+        self.assertEqual([recognizer["name"] for recognizer in record.recognizers], ["ItFiscalCodeRecognizer"])
+        self.assertGreater(record.recognizers[0]["loadTime"], 0)
+
+    def test_missing_entities_are_reported(self):
+        with self.assertLogs("src.analyzer_registry", level="WARNING") as logs:
+            build_pruned_registry(entities=["IT_FISCAL_CODE", "NOT_AN_ENTITY"], nlp_engine=NLP_ENGINE)
+
+        self.assertIn("NOT_AN_ENTITY", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import copy
+import random
+import unittest
+
+from presidio_anonymizer import AnonymizerEngine, OperatorConfig
+from presidio_anonymizer.entities import InvalidParamError, RecognizerResult
+
+from src.anonymization_engine import SinglePassAnonymizer, resolve_conflicts
+from src.anonymizer_logic import ANONYMIZER, current_profile
+
+
+class TestResolveConflicts(unittest.TestCase):
+    def spans(self, text, results):
+        return [(span.entity_type, span.start, span.end) for span in resolve_conflicts(text, results)]
+
+    def test_merges_overlapping_results_of_the_same_type(self):
+        results = [RecognizerResult("PERSON", 0, 5, 0.5), RecognizerResult("PERSON", 3, 9, 0.8)]
+        self.assertEqual(self.spans("x" * 10, results), [("PERSON", 0, 9)])
+
+    def test_drops_contained_and_lower_score_results(self):
+        results = [
+            RecognizerResult("IT_FISCAL_CODE", 0, 16, 1.0),
+            RecognizerResult("PERSON", 2, 6, 0.9),
+            RecognizerResult("IT_VAT_CODE", 20, 31, 0.5),
+            RecognizerResult("PHONE_NUMBER", 20, 31, 0.7),
+        ]
+        self.assertEqual(self.spans("x" * 40, results), [("IT_FISCAL_CODE", 0, 16), ("PHONE_NUMBER", 20, 31)])
+
+    def test_merges_results_separated_by_spaces(self):
+        results = [RecognizerResult("PERSON", 0, 4, 0.8), RecognizerResult("PERSON", 5, 10, 0.8)]
+        self.assertEqual(self.spans("Luca Rossi", results), [("PERSON", 0, 10)])
+
+    def test_does_not_modify_the_results(self):
+        results = [RecognizerResult("PERSON", 0, 4, 0.8), RecognizerResult("PERSON", 5, 10, 0.8)]
+        resolve_conflicts("Luca Rossi", results)
+        self.assertEqual((results[1].start, results[1].end), (5, 10))
+
+    def test_result_outside_text(self):
+        with self.assertRaises(InvalidParamError):
+            resolve_conflicts("breve", [RecognizerResult("PERSON", 0, 10, 0.8)])
+
+
+class TestSinglePassAnonymizer(unittest.TestCase):
+    def test_anonymizes_every_entity(self):
+        text = "Luca Rossi, codice fiscale RSSLCU80A01F205I, email lucarossi@pagopa.it"
+        results = [
+            RecognizerResult("PERSON", 0, 10, 0.85),
+            RecognizerResult("IT_FISCAL_CODE", 27, 43, 1.0),
+            RecognizerResult("EMAIL_ADDRESS", 51, 70, 1.0),
+        ]
+        self.assertEqual(current_profile().anonymizer.anonymize(text, results),
+                         "L*** R****, codice fiscale RSSLCU80********, email l*******i@pagopa.it")
+
+    def test_default_operator(self):
+        anonymizer = SinglePassAnonymizer(AnonymizerEngine(), {"DEFAULT": OperatorConfig("replace")})
+        self.assertEqual(anonymizer.anonymize("id 1234", [RecognizerResult("ID", 3, 7, 1.0)]), "id <ID>")
+
+    def test_anonymize_with_spans(self):
+        text = "Luca Rossi, email lucarossi@pagopa.it"
+        results = [
+            RecognizerResult("EMAIL_ADDRESS", 18, 37, 1.0),
+            RecognizerResult("PERSON", 0, 4, 0.85),
+            RecognizerResult("PERSON", 5, 10, 0.85),
+        ]
+        anonymizer = current_profile().anonymizer
+        spans = {"type": ["PERSON", "EMAIL_ADDRESS"], "start": [0, 18], "end": [10, 37], "score": [0.85, 1.0],
+                 "operator": ["keep_initials", "mask_email"]}
+        self.assertEqual(anonymizer.anonymize_with_spans(text, results),
+                         (anonymizer.anonymize(text, results), spans))
+        self.assertEqual(anonymizer.spans(text, results), spans)
+
+    def test_no_results(self):
+        self.assertEqual(current_profile().anonymizer.anonymize("nessun dato", []), "nessun dato")
+
+    def test_same_output_as_presidio(self):
+        generator = random.Random(42)
+        entity_types = ["PERSON", "IT_FISCAL_CODE", "EMAIL_ADDRESS", "UNKNOWN"]
+        for _ in range(500):
+            text = "".join(generator.choice("ab 1@.") for _ in range(generator.randint(10, 50)))
+            results = []
+            for _ in range(generator.randint(0, 12)):
+                start = generator.randrange(len(text))
+                results.append(RecognizerResult(generator.choice(entity_types), start,
+                                                min(len(text), start + generator.randint(1, 10)),
+                                                generator.choice([0.5, 0.85, 1.0])))
+            expected = ANONYMIZER.anonymize(text=text, analyzer_results=copy.deepcopy(results),
+                                            operators=current_profile().operators).text
+            self.assertEqual(current_profile().anonymizer.anonymize(text, results), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,410 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from presidio_analyzer import RecognizerResult
+
+from src.anonymization_policy import DEFAULT_POLICY_FILE, CompiledPolicy, PolicyError, PolicyStore, \
+    policy_version, read_policy_file, validate_policy
+from src.anonymizer_logic import ANONYMIZER, ENGINE_FINGERPRINT, NER_ENTITIES, NLP_ENGINE, current_profile
+
+TICKET_POLICY = {
+    "entities": ["IT_FISCAL_CODE", "TICKET_ID"],
+    "wordLists": {"ticketPrefixes": ["TK", "TCK"]},
+    "recognizers": [{
+        "name": "TicketRecognizer",
+        "entity": "TICKET_ID",
+        "regex": r"\b({{ticketPrefixes}})-\d{6}\b",
+        "score": 0.8,
+        "candidates": {"startsWith": "ticketPrefixes"},
+    }],
+    "operators": {
+        "TICKET_ID": {"type": "replace", "params": {"new_value": "<TICKET>"}},
+        "IT_FISCAL_CODE": {"type": "mask_keep_ends", "params": {"keep_prefix": 8, "keep_suffix": 0}},
+    },
+}
+
+
+def compile_policy(document, version="test"):
+    return CompiledPolicy(version=version, document=document, ner_entities=NER_ENTITIES, nlp_engine=NLP_ENGINE,
+                          anonymizer_engine=ANONYMIZER, engine_fingerprint=ENGINE_FINGERPRINT)
+
+
+class TestValidatePolicy(unittest.TestCase):
+    def assertInvalid(self, document, message):
+        with self.assertRaises(PolicyError) as context:
+            validate_policy(document, ANONYMIZER)
+        self.assertIn(message, str(context.exception))
+
+    def changed(self, change):
+        document = copy.deepcopy(TICKET_POLICY)
+        change(document)
+        return document
+
+    def test_valid_policies(self):
+        validate_policy(read_policy_file(DEFAULT_POLICY_FILE), ANONYMIZER)
+        validate_policy(TICKET_POLICY, ANONYMIZER)
+
+    def test_unknown_field(self):
+        self.assertInvalid(self.changed(lambda document: document.update(entity=[])), "unknown fields ['entity']")
+
+    def test_entity_names(self):
+        self.assertInvalid(self.changed(lambda document: document["entities"].append("ticket")), "'ticket'")
+        self.assertInvalid(self.changed(lambda document: document["entities"].append("TICKET_ID")), "repeated")
+        self.assertInvalid({"entities": []}, "non empty list")
+
+    def test_recognizer_entity_must_be_anonymized(self):
+        self.assertInvalid(self.changed(lambda document: document["entities"].remove("TICKET_ID")),
+                           "recognizers[0].entity 'TICKET_ID' is not one of the entities")
+
+    def test_unknown_word_list(self):
+        self.assertInvalid(self.changed(lambda document: document["recognizers"][0].update(regex="({{prefixes}})")),
+                           "unknown word list 'prefixes'")
+        self.assertInvalid(
+            self.changed(lambda document: document["recognizers"][0].update(candidates={"endsWith": "prefixes"})),
+            "candidates.endsWith should be the name of a word list")
+
+    def test_invalid_regex(self):
+        self.assertInvalid(self.changed(lambda document: document["recognizers"][0].update(regex="TK-(\\d")),
+                           "recognizers[0].regex is not a valid regex")
+
+    def test_backtracking_regex(self):
+        self.assertInvalid(
+            self.changed(lambda document: document["recognizers"][0].update(regex="({{ticketPrefixes}})-(\\d+)+")),
+            "recognizers[0].regex should not backtrack")
+        self.assertInvalid(
+            self.changed(lambda document: document["wordLists"]["ticketPrefixes"].append("T\\w*")),
+            "recognizers[0].regex should not backtrack")
+        for regex in ("(?>(a+)+b)", "(?>(a|aa)+)c", "(?:(?:a|a)+)++b"):
+            self.assertInvalid(self.changed(lambda document: document["recognizers"][0].update(regex=regex)),
+                               "recognizers[0].regex should not backtrack")
+
+    def test_invalid_candidates(self):
+        self.assertInvalid(
+            self.changed(lambda document: document["recognizers"][0].update(candidates={"contains": "TK"})),
+            "single check")
+        self.assertInvalid(
+            self.changed(lambda document: document["recognizers"][0].update(candidates={"shortWithDigit": 0})),
+            "positive integer")
+
+    def test_invalid_score(self):
+        self.assertInvalid(self.changed(lambda document: document["recognizers"][0].update(score=2)),
+                           "between 0 and 1")
+
+    def test_word_starting_without_letters(self):
+        self.assertInvalid(self.changed(lambda document: document["wordLists"]["ticketPrefixes"].append("#TK")),
+                           "'#TK'")
+
+    def test_invalid_operators(self):
+        self.assertInvalid(self.changed(lambda document: document["operators"].update(URL={"type": "redact"})),
+                           "operators.URL: 'URL' is not one of the entities")
+        self.assertInvalid(self.changed(lambda document: document["operators"]["TICKET_ID"].update(type="nope")),
+                           "operators.TICKET_ID: Invalid operator class 'nope'")
+        self.assertInvalid(
+            self.changed(lambda document: document["operators"]["IT_FISCAL_CODE"].update(params={"keep_prefix": 8})),
+            "operators.IT_FISCAL_CODE")
+
+    def test_strip_chars_pattern_from_the_policy(self):
+        document = self.changed(lambda document: document["operators"].update(
+            TICKET_ID={"type": "strip_chars", "params": {"pattern": "[\\d-]+"}}))
+        validate_policy(document, ANONYMIZER)
+        profile = compile_policy(document).profile()
+        results = profile.analyzer.analyze(text="Ticket TK-123456 aperto", entities=["TICKET_ID"], language="it")
+        self.assertEqual(profile.anonymizer.anonymize("Ticket TK-123456 aperto", results), "Ticket TK aperto")
+        self.assertInvalid(self.changed(lambda document: document["operators"].update(
+            TICKET_ID={"type": "strip_chars", "params": {"pattern": "[\\d"}})), "operators.TICKET_ID")
+
+    def test_invalid_profiles(self):
+        self.assertInvalid(self.changed(lambda document: document.update(profiles={"Tickets": {}})), "profiles.Tickets")
+        self.assertInvalid(self.changed(lambda document: document.update(profiles={"default": {}})), "profiles.default")
+        self.assertInvalid(self.changed(lambda document: document.update(profiles={"tickets": {"entity": []}})),
+                           "unknown fields ['entity']")
+        self.assertInvalid(
+            self.changed(lambda document: document.update(profiles={"tickets": {"entities": ["IBAN_CODE"]}})),
+            "profiles.tickets.entities ['IBAN_CODE'] are not among the policy entities")
+        self.assertInvalid(
+            self.changed(lambda document: document.update(profiles={"tickets": {"operators": {"X": {}}}})),
+            "profiles.tickets.operators.X")
+
+
+class TestCompiledPolicy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.policy = compile_policy(TICKET_POLICY).profile()
+
+    def test_registry_holds_only_policy_recognizers(self):
+        names = sorted(recognizer.name for recognizer in self.policy.analyzer.registry.recognizers)
+        self.assertEqual(names, ["ItFiscalCodeRecognizer", "TicketRecognizer"])
+
+    def test_analyze_and_anonymize(self):
+        text = "Ticket TK-123456 aperto da RSSLCU80A01F205I, ticket XX-654321"
+        results = self.policy.analyzer.analyze(text=text, entities=self.policy.entities, language="it")
+        self.assertEqual(self.policy.anonymizer.anonymize(text, results),
+                         "Ticket <TICKET> aperto da RSSLCU80********, ticket XX-654321")
+
+    def test_prefilter_skips_texts_without_candidates(self):
+        recognizer = self.policy.custom_recognizers["TicketRecognizer"]
+        self.assertEqual(recognizer.analyze("codice 123456", ["TICKET_ID"]), [])
+        self.assertEqual(len(recognizer.analyze("tck-123456", ["TICKET_ID"])), 1)
+
+    def test_regex_entities_exclude_ner_entities(self):
+        profile = current_profile()
+        self.assertIn("PERSON", profile.entities)
+        self.assertNotIn("PERSON", profile.regex_entities)
+        self.assertIn("IT_FISCAL_CODE", profile.regex_entities)
+        self.assertEqual(self.policy.ner_entities, [])
+
+    def test_fingerprint_depends_on_policy(self):
+        self.assertNotEqual(self.policy.fingerprint, current_profile().fingerprint)
+        self.assertEqual(compile_policy(copy.deepcopy(TICKET_POLICY)).profile().fingerprint, self.policy.fingerprint)
+
+    def test_entity_without_recognizer(self):
+        document = copy.deepcopy(TICKET_POLICY)
+        document["entities"].append("NOT_AN_ENTITY")
+        with self.assertRaises(PolicyError) as context:
+            compile_policy(document)
+        self.assertIn("NOT_AN_ENTITY", str(context.exception))
+
+    def test_default_policy_output(self):
+        profile = current_profile()
+        results = [RecognizerResult("IT_VEHICLE_PLATE", 6, 13, 0.8)]
+        self.assertEqual(profile.anonymizer.anonymize("targa AB123CD", results), "targa AB1****")
+
+
+class TestCompiledProfiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        document = copy.deepcopy(TICKET_POLICY)
+        document["profiles"] = {
+            "tickets": {"entities": ["TICKET_ID"]},
+            "redacted": {"operators": {"DEFAULT": {"type": "redact"}}},
+        }
+        cls.policy = compile_policy(document)
+
+    def test_profiles_are_compiled_with_their_recognizers(self):
+        self.assertEqual(sorted(self.policy.profiles), ["default", "redacted", "tickets"])
+        tickets = self.policy.profile("tickets")
+        self.assertEqual([recognizer.name for recognizer in tickets.analyzer.registry.recognizers],
+                         ["TicketRecognizer"])
+        self.assertEqual(list(tickets.custom_recognizers), ["TicketRecognizer"])
+
+    def test_profiles_share_the_recognizers(self):
+        recognizers = {recognizer.name: recognizer
+                       for recognizer in self.policy.profile().analyzer.registry.recognizers}
+        tickets = self.policy.profile("tickets")
+        self.assertIs(tickets.analyzer.registry.recognizers[0], recognizers["TicketRecognizer"])
+        self.assertIs(tickets.custom_recognizers["TicketRecognizer"], recognizers["TicketRecognizer"])
+        redacted = self.policy.profile("redacted")
+        self.assertEqual([id(recognizer) for recognizer in redacted.analyzer.registry.recognizers],
+                         [id(recognizer) for recognizer in recognizers.values()])
+
+    def test_profiles_inherit_entities_and_operators(self):
+        text = "Ticket TK-123456 aperto da RSSLCU80A01F205I"
+        tickets = self.policy.profile("tickets")
+        results = tickets.analyzer.analyze(text=text, entities=tickets.entities, language="it")
+        self.assertEqual(tickets.anonymizer.anonymize(text, results), "Ticket <TICKET> aperto da RSSLCU80A01F205I")
+        redacted = self.policy.profile("redacted")
+        self.assertEqual(redacted.entities, TICKET_POLICY["entities"])
+        results = redacted.analyzer.analyze(text=text, entities=redacted.entities, language="it")
+        self.assertEqual(redacted.anonymizer.anonymize(text, results), "Ticket  aperto da ")
+
+    def test_profiles_have_their_own_fingerprint(self):
+        fingerprints = {profile.fingerprint for profile in self.policy.profiles.values()}
+        self.assertEqual(len(fingerprints), 3)
+
+    def test_unknown_profile(self):
+        self.assertIs(self.policy.profile(), self.policy.profile("default"))
+        with self.assertRaises(ValueError) as context:
+            self.policy.profile("nope")
+        self.assertIn("Unknown profile 'nope'", str(context.exception))
+
+    def test_default_policy_profiles(self):
+        profile = current_profile("fiscal-code-iban")
+        self.assertEqual(sorted(recognizer.name for recognizer in profile.analyzer.registry.recognizers),
+                         ["IbanRecognizer", "ItFiscalCodeRecognizer"])
+        self.assertEqual(profile.ner_entities, [])
+
+
+class TestPolicyVersion(unittest.TestCase):
+    def test_version_ignores_format_and_key_order(self):
+        reordered = dict(reversed(list(TICKET_POLICY.items())))
+        self.assertEqual(policy_version(reordered), policy_version(TICKET_POLICY))
+        self.assertNotEqual(policy_version({"entities": ["PERSON"]}), policy_version(TICKET_POLICY))
+
+    def test_yaml_and_json_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "policy.json")
+            yaml_path = os.path.join(directory, "policy.yaml")
+            with open(json_path, "w", encoding="utf-8") as policy_file:
+                json.dump(TICKET_POLICY, policy_file)
+            with open(yaml_path, "w", encoding="utf-8") as policy_file:
+                policy_file.write("entities: [IT_FISCAL_CODE]\n")
+            self.assertEqual(read_policy_file(json_path), TICKET_POLICY)
+            self.assertEqual(read_policy_file(yaml_path), {"entities": ["IT_FISCAL_CODE"]})
+
+    def test_unreadable_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "policy.json")
+            with self.assertRaises(PolicyError):
+                read_policy_file(path)
+            with open(path, "w", encoding="utf-8") as policy_file:
+                policy_file.write("{not json")
+            with self.assertRaises(PolicyError):
+                read_policy_file(path)
+
+
+class TestPolicyStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "policy.json")
+        self.compiled = []
+        self.write({"entities": ["PERSON"]})
+
+    def write(self, document):
+        with open(self.path, "w", encoding="utf-8") as policy_file:
+            json.dump(document, policy_file)
+
+    def compile(self, document, version):
+        self.compiled.append(version)
+        profile = SimpleNamespace(name="default", entities=document["entities"],
+                                  analyzer=SimpleNamespace(registry=SimpleNamespace(recognizers=[])))
+        return SimpleNamespace(version=version, entities=document["entities"], recognizers=[],
+                               profiles={"default": profile}, profile=lambda name=None: profile)
+
+    @staticmethod
+    def validate(document):
+        if "INVALID" in document["entities"]:
+            raise PolicyError("Invalid entity")
+
+    def store(self, **kwargs):
+        return PolicyStore(compile_policy=self.compile, validate=self.validate, path=self.path, **kwargs)
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_policy_is_loaded_once(self):
+        store = self.store()
+        self.assertIs(store.get(), store.get())
+        self.assertEqual(len(self.compiled), 1)
+
+    def test_reload_swaps_the_policy(self):
+        store = self.store()
+        first = store.get()
+        self.write({"entities": ["PERSON", "IT_FISCAL_CODE"]})
+        second = store.reload()
+        self.assertIsNot(first, second)
+        self.assertIs(store.get(), second)
+        self.assertEqual(second.entities, ["PERSON", "IT_FISCAL_CODE"])
+
+    def test_previous_versions_are_not_compiled_again(self):
+        store = self.store()
+        first = store.get()
+        self.write({"entities": ["PERSON", "IT_FISCAL_CODE"]})
+        store.reload()
+        self.write({"entities": ["PERSON"]})
+        self.assertIs(store.reload(), first)
+        self.assertEqual(len(self.compiled), 2)
+
+    def test_compiled_versions_are_bounded(self):
+        store = self.store(cache_size=2)
+        store.get()
+        for entities in (["PERSON", "IT_FISCAL_CODE"], ["IBAN_CODE"]):
+            self.write({"entities": entities})
+            store.reload()
+        info = store.info()
+        self.assertEqual(info["compiledVersions"], self.compiled[1:])
+        self.assertEqual(info["version"], self.compiled[-1])
+        self.assertEqual(info["file"], self.path)
+
+    def test_invalid_policy_keeps_the_active_one(self):
+        store = self.store()
+        active = store.get()
+        self.write({"entities": ["INVALID"]})
+        with self.assertRaises(PolicyError):
+            store.reload()
+        self.assertIs(store.get(), active)
+
+    def test_changed_file_is_reloaded_in_background(self):
+        store = self.store(reload_interval=0.01)
+        first = store.get()
+        self.write({"entities": ["PERSON", "IT_FISCAL_CODE"]})
+        self.assertTrue(self.wait_for(lambda: store.get() is not first))
+        self.assertEqual(store.current.entities, ["PERSON", "IT_FISCAL_CODE"])
+
+    def test_invalid_file_is_logged_in_background(self):
+        store = self.store(reload_interval=0.01)
+        active = store.get()
+        with self.assertLogs("src.anonymization_policy", level="ERROR") as logs:
+            self.write({"entities": ["PERSON", "INVALID"]})
+            self.assertTrue(self.wait_for(lambda: store.get() is active and logs.records))
+        self.assertEqual(logs.records[0].policyVersion, active.version)
+        # The invalid file is not checked again until it changes
+        time.sleep(0.05)
+        store.get()
+        self.assertEqual(len(self.compiled), 1)
+
+    def test_unchanged_file_is_not_read_again(self):
+        store = self.store(reload_interval=0.01)
+        store.get()
+        time.sleep(0.02)
+        store.get()
+        self.assertTrue(self.wait_for(lambda: not store._checking))
+        self.assertEqual(len(self.compiled), 1)
+
+    def test_first_get_does_not_start_a_check(self):
+        store = self.store(reload_interval=60)
+        store.get()
+        store.get()
+        self.assertFalse(store._checking)
+
+    def test_info_does_not_wait_for_a_compilation(self):
+        store = self.store(reload_interval=0.01)
+        store.get()
+        compiling = threading.Event()
+        release = threading.Event()
+        compile_policy = store._compile_policy
+
+        def slow_compile(document, version):
+            compiling.set()
+            release.wait(5)
+            return compile_policy(document, version)
+
+        store._compile_policy = slow_compile
+        self.write({"entities": ["PERSON", "IT_FISCAL_CODE"]})
+        time.sleep(0.02)
+        store.get()
+        self.assertTrue(compiling.wait(5))
+        try:
+            self.assertEqual(store.info()["entities"], ["PERSON"])
+        finally:
+            release.set()
+        self.assertTrue(self.wait_for(lambda: store.current.entities == ["PERSON", "IT_FISCAL_CODE"]))
+
+    def test_forked_process_does_not_inherit_a_check_in_progress(self):
+        store = self.store(reload_interval=60)
+        store.get()
+        # As if the background check held the lock when the process forked
+        store._lock.acquire()
+        store._checking = True
+        try:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if store._lock.acquire(timeout=1) and not store._checking else 1)
+        finally:
+            store._checking = False
+            store._lock.release()
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
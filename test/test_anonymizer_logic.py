@@ -1,6 +1,11 @@
+import time
 import unittest
+from unittest.mock import patch
 
-from src.anonymizer_logic import anonymize_text_with_presidio
+from src.cache import LocalResultCache
+from src.coalescer import MicroBatchCoalescer
+from src.anonymizer_logic import anonymize_text_with_presidio, anonymize_texts_with_presidio, AnonymizationMode, \
+    analyze_text, current_profile, _anonymize_coalesced, anonymize_texts_with_spans, analyze_texts_with_presidio
 
 
 class TestAnonymizerLogic(unittest.TestCase):
@@ -226,5 +231,146 @@ class TestAnonymizerLogic(unittest.TestCase):
                          "Multa per M**** R**** il giorno 12/07/2025 alle ore 11:00, codice fiscale GTRQWF12******** e carta identita n. AA*****AA, domiciliato in Piazza San Pietro n Roma (RM). Pagato attraverso iban IT47J******************0997 per autovettura targata XX0****. Contatti numero telefonico ******6333 ed email t**t@pagopa.it. Per assistenza andare sul sito web www.test.it")
 
 
+    def test_anonymize_batch_preserves_order(self):
+        input_texts = [
+            'multa a Luca Rossi',
+            'RSSLCU80A01F205I',
+            '',
+            'IT47J0990650025128761820997',
+        ]
+        anonymize_texts = anonymize_texts_with_presidio(input_texts)
+        self.assertEqual(anonymize_texts, [anonymize_text_with_presidio(text) for text in input_texts])
+        self.assertEqual(anonymize_texts[1], "RSSLCU80********")
+
+    def test_anonymize_batch_empty(self):
+        self.assertEqual(anonymize_texts_with_presidio([]), [])
+
+
+    def test_anonymize_regex_mode_skips_person(self):
+        anonymize_text = anonymize_text_with_presidio('multa a Luca Rossi', AnonymizationMode.REGEX)
+        self.assertEqual(anonymize_text, "multa a Luca Rossi")
+
+    def test_anonymize_regex_mode_pattern_entities(self):
+        test_cases = [
+            ('RSSLCU80A01F205I', "RSSLCU80********"),
+            ('IT47J0990650025128761820997', "IT47J******************0997"),
+            ('lucarossi@pagopa.it', "l*******i@pagopa.it"),
+            ('Macchina HA011HA', "Macchina HA0****"),
+            ('Indirizzo Via Umberto I n.54, 00184 Roma RM', "Indirizzo Via Umberto I n Roma RM"),
+        ]
+        for input_text, expected in test_cases:
+            self.assertEqual(anonymize_text_with_presidio(input_text, AnonymizationMode.REGEX), expected)
+
+    def test_anonymize_batch_regex_mode(self):
+        input_texts = ['multa a Luca Rossi', 'RSSLCU80A01F205I']
+        anonymize_texts = anonymize_texts_with_presidio(input_texts, AnonymizationMode.REGEX)
+        self.assertEqual(anonymize_texts, ["multa a Luca Rossi", "RSSLCU80********"])
+
+    def test_anonymize_batch_with_spans(self):
+        input_texts = ['multa a Luca Rossi, RSSLCU80A01F205I', 'nessun dato']
+        self.assertEqual(anonymize_texts_with_spans(input_texts), [
+            ("multa a L*** R****, RSSLCU80********", {
+                "type": ["PERSON", "IT_FISCAL_CODE"], "start": [8, 20], "end": [18, 36],
+                "score": [0.85, 0.3], "operator": ["keep_initials", "mask_keep_ends"],
+            }),
+            ("nessun dato", {"type": [], "start": [], "end": [], "score": [], "operator": []}),
+        ])
+        self.assertEqual(anonymize_texts_with_spans([]), [])
+
+    def test_analyze_batch_spans_match_anonymization(self):
+        input_texts = ['multa a Luca Rossi, RSSLCU80A01F205I', 'Indirizzo Via Umberto I n.54, 00184 Roma RM']
+        for mode in AnonymizationMode:
+            self.assertEqual(analyze_texts_with_presidio(input_texts, mode),
+                             [spans for _, spans in anonymize_texts_with_spans(input_texts, mode)])
+        spans = analyze_texts_with_presidio(['multa a Luca Rossi, RSSLCU80A01F205I'], AnonymizationMode.REGEX)
+        self.assertEqual(spans[0]["type"], ["IT_FISCAL_CODE"])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LocalResultCache(max_entries=100, max_bytes=1024 * 1024, ttl=60)
+        patcher = patch("src.anonymizer_logic.RESULT_CACHE", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached_text_is_not_analyzed_again(self):
+        self.assertEqual(anonymize_text_with_presidio('RSSLCU80A01F205I'), "RSSLCU80********")
+        with patch("src.anonymizer_logic.analyze_text") as mock_analyze_text:
+            self.assertEqual(anonymize_text_with_presidio('RSSLCU80A01F205I'), "RSSLCU80********")
+        mock_analyze_text.assert_not_called()
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_cache_key_depends_on_mode(self):
+        anonymize_text_with_presidio('multa a Luca Rossi', AnonymizationMode.REGEX)
+        self.assertEqual(anonymize_text_with_presidio('multa a Luca Rossi'), "multa a L*** R****")
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_batch_analyzes_only_missing_texts(self):
+        anonymize_text_with_presidio('RSSLCU80A01F205I', AnonymizationMode.REGEX)
+        with patch("src.anonymizer_logic.analyze_text", wraps=analyze_text) as mock_analyze_text:
+            anonymize_texts = anonymize_texts_with_presidio(
+                ['RSSLCU80A01F205I', 'IT47J0990650025128761820997'], AnonymizationMode.REGEX
+            )
+        self.assertEqual(anonymize_texts, ["RSSLCU80********", "IT47J******************0997"])
+        mock_analyze_text.assert_called_once_with('IT47J0990650025128761820997', AnonymizationMode.REGEX,
+                                                  current_profile())
+
+    def test_cache_never_stores_texts(self):
+        anonymize_text_with_presidio('lucarossi@pagopa.it')
+        self.assertTrue(all('lucarossi' not in key for key in self.cache._entries))
+
+
+class TestRequestCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.coalescer = MicroBatchCoalescer(
+            process_batch=_anonymize_coalesced,
+            max_batch_size=8,
+            max_wait=0.01
+        )
+        patcher = patch("src.anonymizer_logic.COALESCER", self.coalescer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_mode_goes_through_coalescer(self):
+        self.assertEqual(anonymize_text_with_presidio('RSSLCU80A01F205I'), "RSSLCU80********")
+        self.assertEqual(self.coalescer.stats()["items"], 1)
+
+    def test_regex_mode_skips_coalescer(self):
+        self.assertEqual(anonymize_text_with_presidio('RSSLCU80A01F205I', AnonymizationMode.REGEX),
+                         "RSSLCU80********")
+        self.assertEqual(self.coalescer.stats()["items"], 0)
+
+
+class TestAddressRecognizerBacktracking(unittest.TestCase):
+    # Adversarial ~100KB inputs: toponyms, separators and thousands of back-to-back matches
+    ADVERSARIAL_INPUTS = {
+        "toponyms": "Via " * 25000,
+        "toponym words": "Via Piazza Corso Largo " * 4500,
+        "commas": "Via ,, " * 15000,
+        "no terminator": "Via " + "a" * 100000,
+        "numbers": "Via 1, 2" * 12500,
+        "addresses": "Via Roma, 12 " * 8000,
+        "separators": "Via '’.-" * 12000,
+        "spaces": "Via" + " " * 100000 + "!",
+        "comma and spaces": "Via a," + " " * 100000 + "!",
+    }
+    MAX_SECONDS = 1.0
+
+    def setUp(self):
+        self.address_recognizer = current_profile().custom_recognizers["ItalianAddressRecognizer"]
+
+    def test_address_recognizer_linear_time(self):
+        for name, input_text in self.ADVERSARIAL_INPUTS.items():
+            start = time.perf_counter()
+            self.address_recognizer.analyze(input_text, ["ITALIAN_ADDRESS"])
+            elapsed = time.perf_counter() - start
+            self.assertLess(elapsed, self.MAX_SECONDS, msg=f"Address detection too slow for input: {name}")
+
+    def test_address_recognizer_many_matches(self):
+        results = self.address_recognizer.analyze("Via Roma, 12 " * 8000, ["ITALIAN_ADDRESS"])
+        self.assertEqual(len(results), 8000)
+        self.assertEqual((results[1].start, results[1].end), (13, 25))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,12 +5,25 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
 from unittest.mock import patch, MagicMock
+import json
 import unittest
 import os
-from src.app import app
+from src.app import app, PROFILE_HEADER
+from src.anonymization_policy import PolicyError
+from src.anonymizer_logic import AnonymizationMode, current_policy, current_profile
 
 INFO_ENDPOINT = "/info"
 ANONYMIZE_ENDPOINT = "/anonymize"
+ANALYZE_ENDPOINT = "/analyze"
+ANONYMIZE_BATCH_ENDPOINT = "/anonymize/batch"
+CACHE_STATS_ENDPOINT = "/admin/cache"
+COALESCER_STATS_ENDPOINT = "/admin/coalescer"
+METRICS_ENDPOINT = "/metrics"
+PROFILING_ENDPOINT = "/admin/profiling"
+POLICY_ENDPOINT = "/admin/policy"
+POLICY_RELOAD_ENDPOINT = "/admin/policy/reload"
+ANONYMIZE_STREAM_ENDPOINT = "/anonymize/stream"
+ANONYMIZE_JSON_ENDPOINT = "/anonymize/json"
 APP_NAME = "testapp"
 APP_VERSION = "testversion"
 ENVIRONMENT = "test"
@@ -23,80 +36,48 @@ class TestInfoEndpoint(unittest.TestCase):
         app.config['TESTING'] = True
         self.client = app.test_client()
 
-    @patch("src.app.ConfigParser")
-    def test_info_success(self, mock_config_parser):
-        mock_config = MagicMock()
-        mock_config.get.side_effect = lambda section, key: {"name": APP_NAME, "version": APP_VERSION}[key]
-        mock_config_parser.return_value = mock_config
-        os.environ["ENV"] = ENVIRONMENT
+    @patch("src.app.SERVICE_INFO", {"name": APP_NAME, "version": APP_VERSION, "environment": ENVIRONMENT})
+    def test_info_success(self):
         response = self.client.get(INFO_ENDPOINT)
         self.assertEqual(response.status_code, 200)
         data = response.get_json()
         self.assertEqual(data["name"], APP_NAME)
         self.assertEqual(data["version"], APP_VERSION)
         self.assertEqual(data["environment"], ENVIRONMENT)
-        del os.environ["ENV"]
 
-    @patch("src.app.ConfigParser")
-    def test_info_missing_metadata_section(self, mock_config_parser):
-        mock_config = MagicMock()
-
-        def raise_no_section(section, key):
-            raise Exception("No section: 'metadata'")
-
-        mock_config.get.side_effect = raise_no_section
-        mock_config_parser.return_value = mock_config
-        response = self.client.get(INFO_ENDPOINT)
-        self.assertEqual(response.status_code, 500)
-        data = response.get_json()
-        self.assertIn("error", data)
-
-    @patch("src.app.ConfigParser")
-    def test_info_missing_name_key(self, mock_config_parser):
-        mock_config = MagicMock()
-
-        def raise_no_option(section, key):
-            if key == "name":
-                raise Exception("No option 'name' in section: 'metadata'")
-            return APP_VERSION
-
-        mock_config.get.side_effect = raise_no_option
-        mock_config_parser.return_value = mock_config
+    @patch("src.app.SERVICE_INFO", None)
+    def test_info_missing_metadata(self):
         response = self.client.get(INFO_ENDPOINT)
         self.assertEqual(response.status_code, 500)
         data = response.get_json()
         self.assertIn("error", data)
 
-    @patch("src.app.ConfigParser")
-    def test_info_missing_version_key(self, mock_config_parser):
-        mock_config = MagicMock()
-
-        def raise_no_option(section, key):
-            if key == "version":
-                raise Exception("No option 'version' in section: 'metadata'")
-            return APP_NAME
+    @patch("src.app.PROBE_LOG_EVERY", 3)
+    def test_info_logging_is_sampled(self):
+        with self.assertLogs(app.logger, level="INFO") as logs:
+            for _ in range(6):
+                self.client.get(INFO_ENDPOINT)
+        probe_logs = [record for record in logs.records if record.getMessage() == "Probe info"]
+        self.assertEqual(len(probe_logs), 2)
+        self.assertEqual(probe_logs[0].httpCode, 200)
 
-        mock_config.get.side_effect = raise_no_option
-        mock_config_parser.return_value = mock_config
-        response = self.client.get(INFO_ENDPOINT)
-        self.assertEqual(response.status_code, 500)
-        data = response.get_json()
-        self.assertIn("error", data)
+    @patch("src.app.PROBE_LOG_EVERY", 0)
+    @patch("src.app.uuid")
+    def test_info_skips_request_logging(self, mock_uuid):
+        with self.assertNoLogs(app.logger, level="INFO"):
+            self.client.get(INFO_ENDPOINT)
+        mock_uuid.uuid4.assert_not_called()
 
-    @patch("src.app.ConfigParser")
-    def test_info_config_read_raises(self, mock_config_parser):
-        mock_config = MagicMock()
 
-        def raise_read(*args, **kwargs):
-            raise Exception("Read failed")
+class TestReadyEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
 
-        mock_config.read.side_effect = raise_read
-        mock_config.get.side_effect = lambda section, key: "dummy"
-        mock_config_parser.return_value = mock_config
-        response = self.client.get(INFO_ENDPOINT)
-        self.assertEqual(response.status_code, 500)
-        data = response.get_json()
-        self.assertIn("error", data)
+    def test_ready(self):
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"status": "ready"})
 
 
 class TestAnonymizeEndpoint(unittest.TestCase):
@@ -112,6 +93,64 @@ class TestAnonymizeEndpoint(unittest.TestCase):
         data = response.get_json()
         self.assertEqual(data["text"], TEXT_TO_ANONYM)
 
+    @patch("src.app.anonymize_text_with_presidio")
+    def test_anonymize_regex_mode(self, mock_config_anonymizer):
+        mock_config_anonymizer.return_value = TEXT_TO_ANONYM
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": TEXT_TO_ANONYM, "mode": "regex"})
+        self.assertEqual(response.status_code, 200)
+        mock_config_anonymizer.assert_called_once_with(TEXT_TO_ANONYM, AnonymizationMode.REGEX, current_profile())
+
+    def test_anonymize_with_profile(self):
+        text = "codice RSSLCU80A01F205I, email mario.rossi@example.com"
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": text, "profile": "fiscal-code-iban"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["text"], "codice RSSLCU80********, email mario.rossi@example.com")
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": text, "mode": "regex"},
+                                    headers={PROFILE_HEADER: "replace-all"})
+        self.assertEqual(response.get_json()["text"], "codice <ANONYMIZED>, email <ANONYMIZED>")
+
+    def test_anonymize_profile_field_wins_over_header(self):
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "profile": "default"},
+                                    headers={PROFILE_HEADER: "replace-all"})
+        self.assertEqual(response.get_json()["text"], "codice RSSLCU80********")
+
+    def test_anonymize_unknown_profile(self):
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": TEXT_TO_ANONYM, "profile": "nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown profile 'nope'", response.get_json()["error"])
+
+    def test_anonymize_with_spans(self):
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "spans": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            "text": "codice RSSLCU80********",
+            "spans": {"type": ["IT_FISCAL_CODE"], "start": [7], "end": [23], "score": [0.3],
+                      "operator": ["mask_keep_ends"]},
+        })
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I"})
+        self.assertNotIn("spans", response.get_json())
+
+    def test_anonymize_logs_the_response(self):
+        with self.assertLogs(app.logger, level="INFO") as logs:
+            self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"})
+        self.assertEqual(json.loads(logs.records[-1].response), {"text": "codice RSSLCU80********"})
+
+    @patch("src.app.LEAN_LOGGING", True)
+    def test_anonymize_lean_logging_logs_sizes(self):
+        with self.assertLogs(app.logger, level="INFO") as logs:
+            self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"})
+        record = logs.records[-1]
+        self.assertEqual(record.getMessage(), "Successful API operation anonymize_endpoint")
+        self.assertFalse(hasattr(record, "response"))
+        self.assertEqual(record.responseSize, len("codice RSSLCU80********"))
+        self.assertEqual(record.entities, 1)
+        self.assertGreater(record.requestSize, 0)
+
+    def test_anonymize_error_invalid_mode(self):
+        response = self.client.post(ANONYMIZE_ENDPOINT, json={"text": TEXT_TO_ANONYM, "mode": "fast"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Invalid field 'mode': Input should be 'full' or 'regex'")
+
     def test_anonymize_error_invalid_content_type(self):
         response = self.client.post(ANONYMIZE_ENDPOINT, json=False)
         self.assertEqual(response.status_code, 400)
@@ -131,5 +170,333 @@ class TestAnonymizeEndpoint(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
 
 
+class TestAnonymizeBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    @patch("src.app.anonymize_texts_with_presidio")
+    def test_anonymize_batch_success(self, mock_batch_anonymizer):
+        mock_batch_anonymizer.return_value = ["first", "second"]
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"texts": [TEXT_TO_ANONYM, TEXT_TO_ANONYM]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["texts"], ["first", "second"])
+        mock_batch_anonymizer.assert_called_once_with([TEXT_TO_ANONYM, TEXT_TO_ANONYM], AnonymizationMode.FULL,
+                                                      current_profile())
+
+    def test_anonymize_batch_with_profile(self):
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"texts": ["codice RSSLCU80A01F205I"]},
+                                    headers={PROFILE_HEADER: "replace-all"})
+        self.assertEqual(response.get_json()["texts"], ["codice <ANONYMIZED>"])
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"texts": [TEXT_TO_ANONYM]},
+                                    headers={PROFILE_HEADER: "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymize_batch_with_spans(self):
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT,
+                                    json={"texts": ["codice RSSLCU80A01F205I", "nessun dato"], "spans": True})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["texts"], ["codice RSSLCU80********", "nessun dato"])
+        self.assertEqual([spans["type"] for spans in data["spans"]], [["IT_FISCAL_CODE"], []])
+
+    def test_anonymize_batch_error_texts_missing_from_body(self):
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"text": TEXT_TO_ANONYM})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Missing required field 'texts'")
+
+    def test_anonymize_batch_error_invalid_content_type(self):
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json=False)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Missing required field 'texts'")
+
+    def test_anonymize_batch_error_text_invalid_type(self):
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"texts": [TEXT_TO_ANONYM, 2]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Invalid field 'texts.1': Input should be a valid string")
+
+    @patch("src.app.anonymize_texts_with_presidio")
+    def test_anonymize_batch_error_anonymization(self, mock_batch_anonymizer):
+        mock_batch_anonymizer.side_effect = Exception('Read failed')
+        response = self.client.post(ANONYMIZE_BATCH_ENDPOINT, json={"texts": [TEXT_TO_ANONYM]})
+        self.assertEqual(response.status_code, 500)
+
+
+class TestAnalyzeEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_analyze_success(self):
+        texts = ["codice RSSLCU80A01F205I", "nessun dato"]
+        response = self.client.post(ANALYZE_ENDPOINT, json={"texts": texts, "mode": "regex"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["spans"], [
+            {"type": ["IT_FISCAL_CODE"], "start": [7], "end": [23], "score": [0.3], "operator": ["mask_keep_ends"]},
+            {"type": [], "start": [], "end": [], "score": [], "operator": []},
+        ])
+
+    @patch("src.app.analyze_texts_with_presidio")
+    def test_analyze_skips_the_anonymizer(self, mock_analyze):
+        mock_analyze.return_value = []
+        with patch("src.app.anonymize_texts_with_presidio") as mock_anonymize:
+            self.client.post(ANALYZE_ENDPOINT, json={"texts": []}, headers={PROFILE_HEADER: "fiscal-code-iban"})
+        mock_analyze.assert_called_once_with([], AnonymizationMode.FULL, current_profile("fiscal-code-iban"))
+        mock_anonymize.assert_not_called()
+
+    def test_analyze_unknown_profile(self):
+        response = self.client.post(ANALYZE_ENDPOINT, json={"texts": [TEXT_TO_ANONYM], "profile": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_analyze_error_texts_missing_from_body(self):
+        response = self.client.post(ANALYZE_ENDPOINT, json={"text": TEXT_TO_ANONYM})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Missing required field 'texts'")
+
+    @patch("src.app.analyze_texts_with_presidio")
+    def test_analyze_error(self, mock_analyze):
+        mock_analyze.side_effect = Exception("Analysis failed")
+        response = self.client.post(ANALYZE_ENDPOINT, json={"texts": [TEXT_TO_ANONYM]})
+        self.assertEqual(response.status_code, 500)
+
+
+class TestAnonymizeJsonEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_anonymize_json_success(self):
+        response = self.client.post(ANONYMIZE_JSON_ENDPOINT, json={
+            "document": {"debtor": {"fiscalCode": "RSSLCU80A01F205I"}, "note": "iban IT47J0990650025128761820997"},
+            "policies": {"$.debtor.fiscalCode": "IT_FISCAL_CODE"},
+            "defaultPolicy": "regex"
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["document"], {
+            "debtor": {"fiscalCode": "RSSLCU80********"}, "note": "iban IT47J******************0997"})
+
+    def test_anonymize_json_error_document_missing_from_body(self):
+        response = self.client.post(ANONYMIZE_JSON_ENDPOINT, json={"policies": {}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "Missing required field 'document'")
+
+    def test_anonymize_json_error_invalid_policy(self):
+        response = self.client.post(ANONYMIZE_JSON_ENDPOINT, json={"document": {}, "policies": {"id": "fast"}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid policy 'fast'", response.get_json()["error"])
+
+    @patch("src.app.anonymize_json")
+    def test_anonymize_json_error_anonymization(self, mock_anonymize_json):
+        mock_anonymize_json.side_effect = Exception('Analysis failed')
+        response = self.client.post(ANONYMIZE_JSON_ENDPOINT, json={"document": {"note": TEXT_TO_ANONYM}})
+        self.assertEqual(response.status_code, 500)
+
+
+class TestAnonymizeStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    @patch("src.app.anonymize_stream")
+    def test_anonymize_stream_plain_text(self, mock_anonymize_stream):
+        mock_anonymize_stream.return_value = iter(["first ", "second"])
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT, data=TEXT_TO_ANONYM, content_type="text/plain")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/plain")
+        self.assertEqual(response.get_data(as_text=True), "first second")
+        self.assertEqual(list(mock_anonymize_stream.call_args.args[0]), [TEXT_TO_ANONYM])
+        self.assertEqual(mock_anonymize_stream.call_args.args[1], AnonymizationMode.FULL)
+
+    def test_anonymize_stream_ndjson(self):
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT + "?mode=regex",
+                                    data='{"text": "codice RSSL"}\n{"text": "CU80A01F205I"}\n',
+                                    content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual("".join(line["text"] for line in lines), "codice RSSLCU80********")
+
+    def test_anonymize_stream_ndjson_malformed_line(self):
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT + "?mode=regex",
+                                    data='{"text": "testo"}\nnope\n', content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[-1], {"error": "Line 2 is not valid JSON"})
+
+    @patch("src.app.anonymize_stream")
+    def test_anonymize_stream_error_midway(self, mock_anonymize_stream):
+        def failing_stream(*args, **kwargs):
+            yield "first"
+            raise Exception("Analysis failed")
+
+        mock_anonymize_stream.side_effect = failing_stream
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT, data='{"text": "testo"}\n',
+                                    content_type="application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines, [{"text": "first"}, {"error": "An internal server error occurred"}])
+
+    @patch("src.app.anonymize_stream")
+    def test_anonymize_stream_plain_text_error_midway_aborts(self, mock_anonymize_stream):
+        def failing_stream(*args, **kwargs):
+            yield "first"
+            raise Exception("Analysis failed")
+
+        mock_anonymize_stream.side_effect = failing_stream
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT, data=TEXT_TO_ANONYM, content_type="text/plain",
+                                    buffered=False)
+        with self.assertLogs(app.logger, level="ERROR"), self.assertRaisesRegex(Exception, "Analysis failed"):
+            response.get_data()
+
+    def test_anonymize_stream_error_invalid_content_type(self):
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT, json={"text": TEXT_TO_ANONYM})
+        self.assertEqual(response.status_code, 415)
+
+    def test_anonymize_stream_error_invalid_mode(self):
+        response = self.client.post(ANONYMIZE_STREAM_ENDPOINT + "?mode=fast", data=TEXT_TO_ANONYM,
+                                    content_type="text/plain")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCacheStatsEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    @patch("src.app.result_cache_stats")
+    def test_cache_stats_success(self, mock_cache_stats):
+        mock_cache_stats.return_value = {"enabled": True, "hits": 3, "misses": 1, "evictions": 0}
+        response = self.client.get(CACHE_STATS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["hits"], 3)
+
+    @patch("src.app.result_cache_stats")
+    def test_cache_stats_disabled(self, mock_cache_stats):
+        mock_cache_stats.return_value = {"enabled": False}
+        response = self.client.get(CACHE_STATS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"enabled": False})
+
+    @patch("src.app.result_cache_stats")
+    def test_cache_stats_error(self, mock_cache_stats):
+        mock_cache_stats.side_effect = Exception('Read failed')
+        response = self.client.get(CACHE_STATS_ENDPOINT)
+        self.assertEqual(response.status_code, 500)
+
+
+class TestCoalescerStatsEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    @patch("src.app.coalescer_stats")
+    def test_coalescer_stats_success(self, mock_coalescer_stats):
+        mock_coalescer_stats.return_value = {"enabled": True, "batches": 2, "items": 5, "meanBatchSize": 2.5,
+                                             "batchSizes": {"1": 1, "4": 1}}
+        response = self.client.get(COALESCER_STATS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["batchSizes"], {"1": 1, "4": 1})
+
+    @patch("src.app.coalescer_stats")
+    def test_coalescer_stats_error(self, mock_coalescer_stats):
+        mock_coalescer_stats.side_effect = Exception('Read failed')
+        response = self.client.get(COALESCER_STATS_ENDPOINT)
+        self.assertEqual(response.status_code, 500)
+
+
 if __name__ == "__main__":
     unittest.main()
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_metrics_success(self):
+        self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"})
+        response = self.client.get(METRICS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        body = response.get_data(as_text=True)
+        self.assertIn('anonymizer_requests_total{code="200",method="anonymize_endpoint"}', body)
+        self.assertIn('anonymizer_entities_detected_total{entity_type="IT_FISCAL_CODE"}', body)
+        self.assertIn('anonymizer_stage_duration_seconds_count{stage="serialization"}', body)
+
+    @patch("src.app.render_metrics")
+    def test_metrics_error(self, mock_render_metrics):
+        mock_render_metrics.side_effect = Exception('Collection failed')
+        response = self.client.get(METRICS_ENDPOINT)
+        self.assertEqual(response.status_code, 500)
+
+
+class TestProfilingEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.client.delete(PROFILING_ENDPOINT)
+
+    def test_profiling_only_requests_with_header(self):
+        self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"})
+        self.assertEqual(self.client.get(PROFILING_ENDPOINT).get_json(), {"enabled": False, "components": []})
+
+        self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"},
+                         headers={"X-Anonymizer-Profiling": "true"})
+        response = self.client.get(PROFILING_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        components = {component["name"]: component for component in response.get_json()["components"]}
+        self.assertEqual(components["ItFiscalCodeRecognizer"]["calls"], 1)
+        self.assertEqual(components["ItFiscalCodeRecognizer"]["results"], 1)
+        # Regex mode doesn't run the spaCy pipeline
+        self.assertNotIn("spacy", components)
+
+    def test_reset_returns_and_clears_stats(self):
+        self.client.post(ANONYMIZE_ENDPOINT, json={"text": "codice RSSLCU80A01F205I", "mode": "regex"},
+                         headers={"X-Anonymizer-Profiling": "true"})
+        response = self.client.delete(PROFILING_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["components"])
+        self.assertEqual(self.client.get(PROFILING_ENDPOINT).get_json()["components"], [])
+
+    @patch("src.app.profiling_stats")
+    def test_profiling_error(self, mock_profiling_stats):
+        mock_profiling_stats.side_effect = Exception('Read failed')
+        response = self.client.get(PROFILING_ENDPOINT)
+        self.assertEqual(response.status_code, 500)
+
+
+class TestPolicyEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_get_policy(self):
+        response = self.client.get(POLICY_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        policy = response.get_json()
+        self.assertEqual(policy["version"], current_policy().version)
+        self.assertIn("IT_FISCAL_CODE", policy["entities"])
+        self.assertIn("ItalianAddressRecognizer", policy["recognizers"])
+        profiles = {profile["name"]: profile for profile in policy["profiles"]}
+        self.assertEqual(profiles["fiscal-code-iban"]["recognizers"], ["ItFiscalCodeRecognizer", "IbanRecognizer"])
+        self.assertIn(policy["version"], policy["compiledVersions"])
+
+    def test_reload_unchanged_policy(self):
+        policy = current_policy()
+        response = self.client.post(POLICY_RELOAD_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["version"], policy.version)
+        self.assertIs(current_policy(), policy)
+
+    @patch("src.app.reload_policy")
+    def test_reload_invalid_policy(self, mock_reload_policy):
+        mock_reload_policy.side_effect = PolicyError("recognizers[0].regex is not a valid regex")
+        response = self.client.post(POLICY_RELOAD_ENDPOINT)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.get_json(), {"error": "recognizers[0].regex is not a valid regex"})
+
+    @patch("src.app.policy_info")
+    def test_policy_error(self, mock_policy_info):
+        mock_policy_info.side_effect = Exception('Read failed')
+        response = self.client.get(POLICY_ENDPOINT)
+        self.assertEqual(response.status_code, 500)
+
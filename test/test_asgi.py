@@ -0,0 +1,275 @@
+import asyncio
+import io
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.asgi import AsgiInput, BoundedWsgiAdapter, build_environ, app
+
+ANONYMIZE_ENDPOINT = "/anonymize"
+TEXT_TO_ANONYM = "text"
+
+
+def http_scope(method: str, path: str, headers=None, query_string: bytes = b"") -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": headers or [],
+        "server": ("testserver", 3000),
+        "client": ("127.0.0.1", 12345),
+    }
+
+
+async def call(asgi_app, scope: dict, body: bytes = b""):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], headers, b"".join(message["body"] for message in sent[1:])
+
+
+def post_json(path: str, payload: dict):
+    return http_scope("POST", path, headers=[(b"content-type", b"application/json")]), json.dumps(payload).encode()
+
+
+class TestAsgiApp(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The Flask application is loaded and warmed up in the background
+        app.wsgi_app.wait_until_ready(timeout=120)
+
+    @patch("src.app.anonymize_text_with_presidio")
+    def test_anonymize_success(self, mock_anonymizer):
+        mock_anonymizer.return_value = "anonymized"
+        status, headers, body = asyncio.run(call(app, *post_json(ANONYMIZE_ENDPOINT, {"text": TEXT_TO_ANONYM})))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {"text": "anonymized"})
+        self.assertEqual(headers[b"content-type"], b"application/json")
+
+    def test_anonymize_error_text_missing_from_body(self):
+        status, _, body = asyncio.run(call(app, *post_json(ANONYMIZE_ENDPOINT, {"other": TEXT_TO_ANONYM})))
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body)["error"], "Missing required field 'text'")
+
+    def test_info(self):
+        status, _, body = asyncio.run(call(app, http_scope("GET", "/info")))
+        self.assertEqual(status, 200)
+        self.assertIn("version", json.loads(body))
+
+    def test_ready(self):
+        status, _, body = asyncio.run(call(app, http_scope("GET", "/ready")))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {"status": "ready"})
+
+    def test_streamed_response_is_sent_in_pieces(self):
+        def streaming_wsgi_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return iter([b"first ", b"", b"second"])
+
+        adapter = BoundedWsgiAdapter(streaming_wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(adapter(http_scope("POST", "/anonymize/stream"), receive, send))
+        self.assertEqual([message.get("body") for message in sent[1:]], [b"first ", b"second", b""])
+        self.assertFalse(sent[-1]["more_body"])
+
+    def test_lifespan(self):
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        adapter = BoundedWsgiAdapter(app.wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        asyncio.run(adapter({"type": "lifespan"}, receive, send))
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+    def test_websocket_is_closed(self):
+        messages = [{"type": "websocket.connect"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        adapter = BoundedWsgiAdapter(app.wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        with self.assertLogs("src.asgi", level="WARNING"):
+            asyncio.run(adapter({"type": "websocket", "path": "/anonymize"}, receive, send))
+        self.assertEqual(sent, [{"type": "websocket.close"}])
+
+    def test_unsupported_scope_is_ignored(self):
+        async def receive():
+            raise AssertionError("nothing to receive")
+
+        async def send(message):
+            raise AssertionError("nothing to send")
+
+        adapter = BoundedWsgiAdapter(app.wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        with self.assertLogs("src.asgi", level="WARNING"):
+            asyncio.run(adapter({"type": "custom"}, receive, send))
+
+
+class TestBoundedWsgiAdapter(unittest.TestCase):
+    def test_rejects_requests_when_queue_is_full(self):
+        release = threading.Event()
+
+        def blocking_wsgi_app(environ, start_response):
+            release.wait(5)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"done"]
+
+        adapter = BoundedWsgiAdapter(blocking_wsgi_app, inference_threads=1, queue_depth=1, retry_after=3)
+
+        async def scenario():
+            running = asyncio.create_task(call(adapter, http_scope("POST", ANONYMIZE_ENDPOINT)))
+            queued = asyncio.create_task(call(adapter, http_scope("POST", ANONYMIZE_ENDPOINT)))
+            await asyncio.sleep(0.05)
+            rejected = await call(adapter, http_scope("POST", ANONYMIZE_ENDPOINT))
+            not_inference = asyncio.create_task(call(adapter, http_scope("GET", "/info")))
+            await asyncio.sleep(0.05)
+            release.set()
+            return rejected, await running, await queued, await not_inference
+
+        rejected, running, queued, not_inference = asyncio.run(scenario())
+        status, headers, body = rejected
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b"retry-after"], b"3")
+        self.assertIn("error", json.loads(body))
+        self.assertEqual([running[0], queued[0], not_inference[0]], [200, 200, 200])
+        self.assertEqual(adapter.pending, 0)
+
+    def test_analyze_goes_through_the_inference_queue(self):
+        release = threading.Event()
+
+        def blocking_wsgi_app(environ, start_response):
+            release.wait(5)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"done"]
+
+        adapter = BoundedWsgiAdapter(blocking_wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+
+        async def scenario():
+            running = asyncio.create_task(call(adapter, http_scope("POST", ANONYMIZE_ENDPOINT)))
+            await asyncio.sleep(0.05)
+            rejected = await call(adapter, http_scope("POST", "/analyze"))
+            admin = asyncio.create_task(call(adapter, http_scope("GET", "/admin/cache")))
+            await asyncio.sleep(0.05)
+            release.set()
+            return rejected, await running, await admin
+
+        rejected, running, admin = asyncio.run(scenario())
+        self.assertEqual(rejected[0], 503)
+        self.assertEqual([running[0], admin[0]], [200, 200])
+
+    def test_build_environ(self):
+        scope = http_scope("POST", "/anonymize", query_string=b"a=1", headers=[
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+            (b"x-request-id", b"abc"),
+        ])
+        environ = build_environ(scope, io.BytesIO(b"{}"))
+        self.assertEqual(environ["REQUEST_METHOD"], "POST")
+        self.assertEqual(environ["PATH_INFO"], "/anonymize")
+        self.assertEqual(environ["QUERY_STRING"], "a=1")
+        self.assertEqual(environ["CONTENT_TYPE"], "application/json")
+        self.assertEqual(environ["CONTENT_LENGTH"], "2")
+        self.assertEqual(environ["HTTP_X_REQUEST_ID"], "abc")
+        self.assertEqual(environ["SERVER_PORT"], "3000")
+        self.assertEqual(environ["wsgi.input"].read(), b"{}")
+
+    def test_rejected_request_body_is_not_read(self):
+        release = threading.Event()
+
+        def blocking_wsgi_app(environ, start_response):
+            release.wait(5)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [environ["wsgi.input"].read()]
+
+        adapter = BoundedWsgiAdapter(blocking_wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        received = []
+
+        async def receive():
+            received.append("body")
+            return {"type": "http.request", "body": b"large body", "more_body": False}
+
+        async def send(message):
+            pass
+
+        async def scenario():
+            running = asyncio.create_task(call(adapter, http_scope("POST", ANONYMIZE_ENDPOINT), b"body"))
+            await asyncio.sleep(0.05)
+            await adapter(http_scope("POST", ANONYMIZE_ENDPOINT), receive, send)
+            release.set()
+            return await running
+
+        running = asyncio.run(scenario())
+        self.assertEqual(running[2], b"body")
+        self.assertEqual(received, [])
+
+    def test_body_is_read_incrementally(self):
+        messages = [
+            {"type": "http.request", "body": b"first ", "more_body": True},
+            {"type": "http.request", "body": b"", "more_body": True},
+            {"type": "http.request", "body": b"second", "more_body": False},
+        ]
+
+        def reading_wsgi_app(environ, start_response):
+            first = environ["wsgi.input"].read(6)
+            # Only the messages needed so far were received
+            pending = len(messages)
+            rest = environ["wsgi.input"].read()
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [f"{first.decode()}|{pending}|{rest.decode()}".encode()]
+
+        adapter = BoundedWsgiAdapter(reading_wsgi_app, inference_threads=1, queue_depth=0, retry_after=1)
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(adapter(http_scope("POST", ANONYMIZE_ENDPOINT), receive, send))
+        self.assertEqual(b"".join(message.get("body", b"") for message in sent[1:]), b"first |2|second")
+
+    def test_disconnect_ends_the_body(self):
+        messages = [
+            {"type": "http.request", "body": b"partial", "more_body": True},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def read():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, io.BufferedReader(AsgiInput(receive, loop)).read)
+
+        self.assertEqual(asyncio.run(read()), b"partial")
+
+
+if __name__ == '__main__':
+    unittest.main()
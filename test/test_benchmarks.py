@@ -0,0 +1,92 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# The benchmark scripts are run from their directory, and import each other as top level modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "performance-test", "benchmark")))
+
+import anonymization_scaling  # noqa: E402
+import core_benchmarks  # noqa: E402
+import spacy_pipeline  # noqa: E402
+from sample_corpus import DENSITIES, generate_corpus  # noqa: E402
+
+
+def run_main(module, arguments: list) -> str:
+    stdout = io.StringIO()
+    with patch.object(sys, "argv", [module.__file__, *arguments]), contextlib.redirect_stdout(stdout), \
+            contextlib.redirect_stderr(io.StringIO()):
+        module.main()
+    return stdout.getvalue()
+
+
+class TestSampleCorpus(unittest.TestCase):
+    def test_corpus_is_reproducible_and_locates_its_entities(self):
+        for density in DENSITIES:
+            corpus = generate_corpus(size=5, sentences_per_text=3, density=density)
+            self.assertEqual(corpus, generate_corpus(size=5, sentences_per_text=3, density=density))
+            for sample in corpus:
+                for _, start, end in sample.entities:
+                    self.assertTrue(sample.text[start:end].strip())
+
+
+class TestCoreBenchmarks(unittest.TestCase):
+    def test_time_benchmark(self):
+        calls = []
+        result = core_benchmarks.time_benchmark(lambda: calls.append(1), rounds=2, min_time=0.001)
+        self.assertEqual(result["rounds"], 2)
+        self.assertGreaterEqual(result["median"], result["min"])
+        # The calibration calls count as the first round
+        self.assertGreater(len(calls), 2 * result["callsPerRound"])
+
+    def test_compare_reports_regressions(self):
+        baseline = {"metadata": {}, "benchmarks": {"a": {"median": 10}, "b": {"median": 10}, "c": {"median": 1}}}
+        comparison = core_benchmarks.compare(baseline, {"a": {"median": 11}, "b": {"median": 13}, "d": {"median": 1}},
+                                             threshold=0.2)
+        self.assertEqual(comparison["regressions"], ["b"])
+        self.assertEqual(comparison["missing"], ["c"])
+        self.assertEqual(comparison["new"], ["d"])
+
+    def test_single_benchmark_run_saved_and_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = os.path.join(directory, "baseline.json")
+            arguments = ["--filter", "operator/IT_FISCAL_CODE", "--rounds", "1", "--min-time", "0"]
+            report = json.loads(run_main(core_benchmarks, [*arguments, "--save", baseline_path]))
+            self.assertEqual(list(report["benchmarks"]), ["operator/IT_FISCAL_CODE"])
+            with open(baseline_path, encoding="utf-8") as baseline_file:
+                self.assertEqual(json.load(baseline_file)["benchmarks"], report["benchmarks"])
+
+            # A baseline that is much faster makes the run fail
+            report["benchmarks"]["operator/IT_FISCAL_CODE"]["median"] /= 1000
+            with open(baseline_path, "w", encoding="utf-8") as baseline_file:
+                json.dump(report, baseline_file)
+            with self.assertRaises(SystemExit) as context:
+                run_main(core_benchmarks, [*arguments, "--compare", baseline_path])
+            self.assertEqual(context.exception.code, 1)
+
+    def test_benchmarks_run_once(self):
+        benchmarks = core_benchmarks.collect_benchmarks()
+        for name in ("anonymize/regex/short/mixed", "recognizer/ItFiscalCodeRecognizer/short",
+                     "operator/IT_FISCAL_CODE"):
+            benchmarks[name]()
+
+
+class TestAnonymizationScaling(unittest.TestCase):
+    def test_single_measure(self):
+        report = json.loads(run_main(anonymization_scaling, ["--entities", "30", "--repeat", "1"]))
+        self.assertEqual(len(report), 1)
+        self.assertGreater(report[0]["entities"], 0)
+
+
+class TestSpacyPipeline(unittest.TestCase):
+    def test_missing_model_is_reported(self):
+        output = run_main(spacy_pipeline, ["--single", "--config", "not_a_model:parser", "--size", "1"])
+        self.assertIn("not_a_model is not installed", json.loads(output)["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
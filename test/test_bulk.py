@@ -0,0 +1,156 @@
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import logging_setup
+from src.bulk import _init_worker, run, main, read_batches, write_checkpoint, read_checkpoint
+
+RECORDS = [
+    {"id": index, "causale": f"Pagamento avviso {index} codice fiscale RSSLCU80A01F205I", "payer": {"email": "lucarossi@pagopa.it"}}
+    for index in range(25)
+]
+
+
+def _log_from_worker(message: str):
+    logging.getLogger("test.bulk_worker").info(message)
+    return os.getpid()
+
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def _write_jsonl(self, name: str, records: list) -> str:
+        path = self._path(name)
+        with open(path, "w", encoding="utf-8") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+        return path
+
+    def _read_jsonl(self, path: str) -> list:
+        with open(path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_jsonl_fields_are_anonymized_in_order(self):
+        input_path = self._write_jsonl("input.jsonl", RECORDS)
+        output_path = self._path("output.jsonl")
+
+        written = run(input_path, output_path, fields=["causale", "payer.email", "missing"], file_format="jsonl",
+                      mode="regex", processes=2, batch_size=4, max_in_flight=2)
+
+        self.assertEqual(written, len(RECORDS))
+        output = self._read_jsonl(output_path)
+        self.assertEqual([record["id"] for record in output], list(range(25)))
+        self.assertEqual(output[3]["causale"], "Pagamento avviso 3 codice fiscale RSSLCU80********")
+        self.assertEqual(output[3]["payer"]["email"], "l*******i@pagopa.it")
+
+    def test_csv_columns_are_anonymized(self):
+        input_path = self._path("input.csv")
+        with open(input_path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["id", "causale"])
+            writer.writerows([[record["id"], record["causale"]] for record in RECORDS])
+        output_path = self._path("output.csv")
+
+        main([input_path, output_path, "--fields", "causale", "--mode", "regex", "--processes", "2",
+              "--batch-size", "7"])
+
+        with open(output_path, encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ["id", "causale"])
+        self.assertEqual(len(rows), len(RECORDS) + 1)
+        self.assertEqual(rows[1], ["0", "Pagamento avviso 0 codice fiscale RSSLCU80********"])
+
+    def test_csv_unknown_column(self):
+        input_path = self._path("input.csv")
+        with open(input_path, "w", encoding="utf-8") as file:
+            file.write("id,causale\n1,testo\n")
+        with self.assertRaises(ValueError):
+            run(input_path, self._path("output.csv"), fields=["other"], file_format="csv", processes=1)
+
+    def test_resume_from_checkpoint(self):
+        input_path = self._write_jsonl("input.jsonl", RECORDS)
+        output_path = self._path("output.jsonl")
+        checkpoint_path = self._path("output.ckpt")
+
+        # An interrupted run: 10 records written and checkpointed, followed by a partially written record
+        self._write_jsonl("first.jsonl", RECORDS[:10])
+        run(self._path("first.jsonl"), output_path, fields=["causale"], file_format="jsonl", mode="regex",
+            processes=1, batch_size=5)
+        output_bytes = os.path.getsize(output_path)
+        with open(output_path, "a", encoding="utf-8") as file:
+            file.write('{"id": 10, "caus')
+        write_checkpoint(checkpoint_path, records=10, output_bytes=output_bytes)
+
+        written = run(input_path, output_path, fields=["causale"], file_format="jsonl", mode="regex",
+                      processes=2, batch_size=4, checkpoint_path=checkpoint_path)
+
+        self.assertEqual(written, 15)
+        output = self._read_jsonl(output_path)
+        self.assertEqual([record["id"] for record in output], list(range(25)))
+        self.assertEqual(read_checkpoint(checkpoint_path), {"records": 25, "outputBytes": os.path.getsize(output_path)})
+
+    def test_resume_without_the_output(self):
+        input_path = self._write_jsonl("input.jsonl", RECORDS)
+        output_path = self._path("output.jsonl")
+        checkpoint_path = self._path("output.ckpt")
+        write_checkpoint(checkpoint_path, records=10, output_bytes=100)
+
+        with self.assertRaisesRegex(ValueError, "but it doesn't exist"):
+            run(input_path, output_path, fields=["causale"], file_format="jsonl", processes=1,
+                checkpoint_path=checkpoint_path)
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write("{}\n")
+        with self.assertRaisesRegex(ValueError, "but it has 3 bytes"):
+            run(input_path, output_path, fields=["causale"], file_format="jsonl", processes=1,
+                checkpoint_path=checkpoint_path)
+
+    def test_resume_with_a_shorter_input(self):
+        input_path = self._write_jsonl("input.jsonl", RECORDS)
+        output_path = self._write_jsonl("output.jsonl", RECORDS)
+        checkpoint_path = self._path("output.ckpt")
+        output_bytes = os.path.getsize(output_path)
+        write_checkpoint(checkpoint_path, records=len(RECORDS) + 5, output_bytes=output_bytes)
+
+        with self.assertRaisesRegex(ValueError, f"but {input_path} has only {len(RECORDS)} records"):
+            run(input_path, output_path, fields=["causale"], file_format="jsonl", processes=1,
+                checkpoint_path=checkpoint_path)
+        self.assertEqual(os.path.getsize(output_path), output_bytes)
+
+    def test_worker_logs_are_written_with_lean_logging(self):
+        log_path = self._path("log.jsonl")
+        try:
+            with patch.object(logging_setup, "LEAN_LOGGING", True):
+                logging_setup.on_starting(None)
+            with open(log_path, "w", encoding="utf-8") as log_file:
+                logging_setup._queue_logging["console"].setStream(log_file)
+                pool = multiprocessing.get_context("fork").Pool(1, initializer=_init_worker,
+                                                                initargs=("jsonl", ["causale"], "regex", None))
+                with pool:
+                    worker_pid = pool.apply(_log_from_worker, ("Logged by the worker",))
+                    pool.close()
+                    pool.join()
+        finally:
+            logging_setup.stop_log_listener()
+            logging_setup.on_starting(None)
+
+        self.assertNotEqual(worker_pid, os.getpid())
+        with open(log_path, encoding="utf-8") as log_file:
+            messages = [json.loads(line)["message"] for line in log_file]
+        self.assertIn("Logged by the worker", messages)
+
+    def test_read_batches(self):
+        self.assertEqual(list(read_batches(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from src.cache import LocalResultCache, SharedResultCache, build_result_cache, cache_key, config_fingerprint
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_cache_key_is_a_digest(self):
+        key = cache_key("fingerprint", "full", "Mario Rossi")
+        self.assertEqual(len(key), 64)
+        self.assertNotIn("Mario", key)
+        self.assertEqual(key, cache_key("fingerprint", "full", "Mario Rossi"))
+
+    def test_cache_key_depends_on_every_part(self):
+        key = cache_key("fingerprint", "full", "text")
+        self.assertNotEqual(key, cache_key("other", "full", "text"))
+        self.assertNotEqual(key, cache_key("fingerprint", "regex", "text"))
+        self.assertNotEqual(key, cache_key("fingerprint", "full", "text "))
+        self.assertNotEqual(cache_key("a", "b", "c"), cache_key("a", "bc", ""))
+
+    def test_config_fingerprint_identifies_functions_by_code(self):
+        self.assertEqual(config_fingerprint(operator=lambda text: text[:3]),
+                         config_fingerprint(operator=lambda text: text[:3]))
+        self.assertNotEqual(config_fingerprint(operator=lambda text: text[:3]),
+                            config_fingerprint(operator=lambda text: text[:4]))
+
+
+class TestLocalResultCache(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = LocalResultCache(max_entries=10, max_bytes=10000, ttl=60)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = LocalResultCache(max_entries=2, max_bytes=10000, ttl=60)
+        cache.set("first", "1")
+        cache.set("second", "2")
+        cache.get("first")
+        cache.set("third", "3")
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(cache.get("first"), "1")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_evicts_to_stay_within_max_bytes(self):
+        cache = LocalResultCache(max_entries=100, max_bytes=1000, ttl=60)
+        for index in range(20):
+            cache.set(f"key{index}", "x" * 100)
+        self.assertLessEqual(cache.stats()["bytes"], 1000)
+        self.assertGreater(cache.stats()["evictions"], 0)
+        self.assertIsNotNone(cache.get("key19"))
+
+    def test_does_not_store_values_larger_than_max_bytes(self):
+        cache = LocalResultCache(max_entries=100, max_bytes=1000, ttl=60)
+        cache.set("key", "x" * 2000)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_expired_entry_is_a_miss(self):
+        cache = LocalResultCache(max_entries=10, max_bytes=10000, ttl=60)
+        cache.set("key", "value")
+        with patch("src.cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("key"))
+        stats = cache.stats()
+        self.assertEqual((stats["expirations"], stats["entries"], stats["bytes"]), (1, 0, 0))
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, name):
+        return self.values.get(name)
+
+    def set(self, name, value, ex=None):
+        self.values[name] = value
+
+
+class TestSharedResultCache(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+
+    def _cache(self):
+        return SharedResultCache(local=LocalResultCache(max_entries=10, max_bytes=10000, ttl=60), client=self.client)
+
+    def test_results_are_shared(self):
+        self._cache().set("key", "valore anonimizzato")
+        self.assertEqual(self.client.values["anonymizer:key"], "valore anonimizzato".encode("utf-8"))
+
+        other_worker_cache = self._cache()
+        self.assertEqual(other_worker_cache.get("key"), "valore anonimizzato")
+        self.assertEqual(other_worker_cache.get("key"), "valore anonimizzato")
+        stats = other_worker_cache.stats()
+        self.assertEqual((stats["sharedHits"], stats["hits"]), (1, 1))
+
+    def test_shared_miss(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()["sharedMisses"], 1)
+
+    def test_shared_errors_are_misses(self):
+        client = MagicMock()
+        client.get.side_effect = ConnectionError("unreachable")
+        client.set.side_effect = ConnectionError("unreachable")
+        cache = SharedResultCache(local=LocalResultCache(max_entries=10, max_bytes=10000, ttl=60), client=client)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        self.assertEqual(cache.stats()["sharedErrors"], 2)
+
+
+class TestBuildResultCache(unittest.TestCase):
+    def test_disabled(self):
+        self.assertIsNone(build_result_cache(enabled=False, max_entries=10, max_bytes=10000, ttl=60))
+
+    def test_local(self):
+        cache = build_result_cache(enabled=True, max_entries=10, max_bytes=10000, ttl=60)
+        self.assertIsInstance(cache, LocalResultCache)
+
+    def test_shared(self):
+        cache = build_result_cache(enabled=True, max_entries=10, max_bytes=10000, ttl=60,
+                                   redis_url="redis://localhost:6379/0")
+        self.assertIsInstance(cache, SharedResultCache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.coalescer import MicroBatchCoalescer
+
+
+class TestMicroBatchCoalescer(unittest.TestCase):
+    def test_concurrent_items_are_processed_together(self):
+        batches = []
+
+        def process_batch(items):
+            batches.append(list(items))
+            return [item.upper() for item in items]
+
+        coalescer = MicroBatchCoalescer(process_batch, max_batch_size=8, max_wait=0.2)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(coalescer.submit, ["a", "b", "c", "d"]))
+
+        self.assertEqual(results, ["A", "B", "C", "D"])
+        self.assertEqual(sorted(item for batch in batches for item in batch), ["a", "b", "c", "d"])
+        self.assertLess(len(batches), 4)
+        stats = coalescer.stats()
+        self.assertEqual(stats["items"], 4)
+        self.assertEqual(stats["batches"], len(batches))
+
+    def test_batch_size_is_bounded(self):
+        coalescer = MicroBatchCoalescer(lambda items: items, max_batch_size=2, max_wait=0.2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(coalescer.submit, range(6)))
+
+        self.assertEqual(results, list(range(6)))
+        self.assertTrue(all(int(size) <= 2 for size in coalescer.stats()["batchSizes"]))
+
+    def test_single_item_is_processed_after_max_wait(self):
+        coalescer = MicroBatchCoalescer(lambda items: [item * 2 for item in items], max_batch_size=8, max_wait=0.01)
+        self.assertEqual(coalescer.submit(21), 42)
+        self.assertEqual(coalescer.stats()["batchSizes"], {"1": 1})
+
+    def test_failing_item_only_fails_its_own_request(self):
+        release = threading.Event()
+
+        def process_batch(items):
+            release.wait(1)
+            if "bad" in items:
+                raise ValueError("bad item")
+            return items
+
+        coalescer = MicroBatchCoalescer(process_batch, max_batch_size=8, max_wait=0.2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            good = executor.submit(coalescer.submit, "good")
+            bad = executor.submit(coalescer.submit, "bad")
+            release.set()
+            self.assertEqual(good.result(), "good")
+            with self.assertRaises(ValueError):
+                bad.result()
+
+    def test_stats_when_unused(self):
+        coalescer = MicroBatchCoalescer(lambda items: items, max_batch_size=8, max_wait=0.01)
+        self.assertEqual(coalescer.stats(), {"batches": 0, "items": 0, "meanBatchSize": 0, "batchSizes": {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,6 +30,11 @@ class GenerateOpenapi(unittest.TestCase):
 
         print("openapi.json generated successfully.")
 
+    def test_admin_endpoints_are_not_published(self):
+        paths = app.api_doc["paths"]
+        self.assertIn("/anonymize", paths)
+        self.assertFalse([path for path in paths if path.startswith("/admin") or path == "/metrics"])
+
 
 if __name__ == '__main__':
     unittest.main()
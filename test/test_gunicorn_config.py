@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from src import gunicorn_config
+
+
+class TestGunicornConfig(unittest.TestCase):
+    @patch("src.gunicorn_config.gc")
+    def test_preload_freezes_before_fork_and_enables_gc_in_worker(self, mock_gc):
+        with patch.object(gunicorn_config, "preload_app", True):
+            gunicorn_config.when_ready(MagicMock())
+            gunicorn_config.post_fork(MagicMock(), MagicMock())
+
+        mock_gc.freeze.assert_called_once()
+        mock_gc.enable.assert_called_once()
+
+    @patch("src.gunicorn_config.gc")
+    def test_no_preload_leaves_gc_untouched(self, mock_gc):
+        with patch.object(gunicorn_config, "preload_app", False):
+            gunicorn_config.when_ready(MagicMock())
+            gunicorn_config.post_fork(MagicMock(), MagicMock())
+
+        mock_gc.freeze.assert_not_called()
+        mock_gc.enable.assert_not_called()
+
+    @patch("src.gunicorn_config.read_process_memory")
+    def test_post_worker_init_logs_memory_report(self, mock_read_process_memory):
+        mock_read_process_memory.return_value = {"rss": 2048, "shared": 1024}
+        worker = MagicMock(pid=1234)
+
+        with self.assertLogs("src.gunicorn_config", level="INFO") as logs:
+            gunicorn_config.post_worker_init(worker)
+
+        record = logs.records[0]
+        self.assertEqual(record.getMessage(), "Worker memory report")
+        self.assertEqual(record.pid, 1234)
+        self.assertEqual(record.__dict__["memory.shared"], 1024)
+
+    @patch("src.gunicorn_config.multiprocess")
+    def test_child_exit_marks_worker_dead_in_multiprocess_mode(self, mock_multiprocess):
+        with patch.object(gunicorn_config, "prometheus_multiproc_dir", "/tmp/prometheus"):
+            gunicorn_config.child_exit(MagicMock(), MagicMock(pid=1234))
+        mock_multiprocess.mark_process_dead.assert_called_once_with(1234, "/tmp/prometheus")
+
+    @patch("src.gunicorn_config.multiprocess")
+    def test_child_exit_without_multiprocess_mode(self, mock_multiprocess):
+        with patch.object(gunicorn_config, "prometheus_multiproc_dir", None):
+            gunicorn_config.child_exit(MagicMock(), MagicMock(pid=1234))
+        mock_multiprocess.mark_process_dead.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import patch
+
+from src.anonymizer_logic import AnonymizationMode, current_profile
+from src.json_anonymizer import JsonPolicies, anonymize_json, apply_entity_operator, parse_path
+
+DOCUMENT = {
+    "id": "a1b2c3",
+    "debtor": {
+        "fiscalCode": "RSSLCU80A01F205I",
+        "fullName": "Luca Rossi",
+        "email": "lucarossi@pagopa.it",
+    },
+    "positions": [
+        {"description": "Avviso per codice fiscale RSSLCU80A01F205I", "amount": 100, "paid": False},
+        {"description": "TARI", "amount": None},
+    ],
+}
+
+
+class TestParsePath(unittest.TestCase):
+    def test_keys_and_indexes(self):
+        self.assertEqual(parse_path("$.positions[*].debtor.fiscalCode"), ("positions", "*", "debtor", "fiscalCode"))
+        self.assertEqual(parse_path("positions[0].description"), ("positions", 0, "description"))
+        self.assertEqual(parse_path("*.email"), ("*", "email"))
+
+    def test_invalid_path(self):
+        for path in ("$", "", "positions[x]"):
+            with self.assertRaises(ValueError):
+                parse_path(path)
+
+
+class TestJsonPolicies(unittest.TestCase):
+    def test_most_specific_path_wins(self):
+        policies = JsonPolicies({"*.fiscalCode": "skip", "debtor.fiscalCode": "IT_FISCAL_CODE"})
+        self.assertEqual(policies.policy(("debtor", "fiscalCode")), "IT_FISCAL_CODE")
+        self.assertEqual(policies.policy(("payer", "fiscalCode")), "skip")
+        self.assertEqual(policies.policy(("payer", "fullName")), "full")
+
+    def test_invalid_policy(self):
+        for policy in ("fast", "DEFAULT"):
+            with self.assertRaises(ValueError):
+                JsonPolicies({"id": policy})
+        with self.assertRaises(ValueError):
+            JsonPolicies(default_policy="fast")
+
+
+class TestAnonymizeJson(unittest.TestCase):
+    def test_policies_per_field(self):
+        anonymized = anonymize_json(DOCUMENT, {
+            "$.id": "skip",
+            "$.debtor.fiscalCode": "IT_FISCAL_CODE",
+            "$.debtor.fullName": "PERSON",
+            "$.debtor.email": "EMAIL_ADDRESS",
+            "$.positions[*].description": "regex",
+        })
+        self.assertEqual(anonymized, {
+            "id": "a1b2c3",
+            "debtor": {
+                "fiscalCode": "RSSLCU80********",
+                "fullName": "L*** R****",
+                "email": "l*******i@pagopa.it",
+            },
+            "positions": [
+                {"description": "Avviso per codice fiscale RSSLCU80********", "amount": 100, "paid": False},
+                {"description": "TARI", "amount": None},
+            ],
+        })
+        # The input document is left untouched
+        self.assertEqual(DOCUMENT["debtor"]["fiscalCode"], "RSSLCU80A01F205I")
+
+    @patch("src.json_anonymizer.anonymize_texts_with_presidio")
+    def test_detection_fields_are_batched_per_mode(self, mock_batch_anonymizer):
+        mock_batch_anonymizer.side_effect = lambda texts, mode, policy: [text.upper() for text in texts]
+        anonymized = anonymize_json(DOCUMENT, {"debtor.fiscalCode": "IT_FISCAL_CODE", "id": "regex"})
+        self.assertEqual(mock_batch_anonymizer.call_count, 2)
+        mock_batch_anonymizer.assert_any_call(["a1b2c3"], AnonymizationMode.REGEX, current_profile())
+        mock_batch_anonymizer.assert_any_call(
+            ["Luca Rossi", "lucarossi@pagopa.it", "Avviso per codice fiscale RSSLCU80A01F205I", "TARI"],
+            AnonymizationMode.FULL, current_profile())
+        self.assertEqual(anonymized["debtor"]["fullName"], "LUCA ROSSI")
+        self.assertEqual(anonymized["debtor"]["fiscalCode"], "RSSLCU80********")
+
+    @patch("src.json_anonymizer.anonymize_texts_with_presidio")
+    def test_skipped_document_runs_no_detection(self, mock_batch_anonymizer):
+        self.assertEqual(anonymize_json(DOCUMENT, default_policy="skip"), DOCUMENT)
+        mock_batch_anonymizer.assert_not_called()
+
+    def test_scalar_and_string_documents(self):
+        self.assertEqual(anonymize_json(42), 42)
+        self.assertEqual(anonymize_json(["RSSLCU80A01F205I"], default_policy="regex"), ["RSSLCU80********"])
+
+    def test_entity_operator_keeps_empty_text(self):
+        self.assertEqual(apply_entity_operator("", "PERSON"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import glob
+import os
+import sys
+import threading
+import unittest
+
+from werkzeug.serving import make_server
+
+# The load-test harness is run from its directory, and imports the corpus generator as a top level module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "performance-test", "benchmark")))
+
+import load_test  # noqa: E402
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_parse_duration(self):
+        self.assertEqual(load_test.parse_duration("1m30s"), 90)
+        self.assertEqual(load_test.parse_duration("500ms"), 0.5)
+
+    def test_parse_config(self):
+        self.assertEqual(load_test.parse_config("gthread:2:4"), ("gthread", 2, 4))
+        self.assertEqual(load_test.parse_config("sync:1"), ("sync", 1, 1))
+        with self.assertRaises(Exception):
+            load_test.parse_config("eventlet:1")
+
+    def test_load_profiles(self):
+        for path in glob.glob(os.path.join(load_test.TEST_TYPES_DIR, "*.json")):
+            name = os.path.splitext(os.path.basename(path))[0]
+            profile = load_test.load_profile(name, time_scale=0.1)
+            self.assertIn(profile["executor"], ("ramping-vus", "constant-arrival-rate"), name)
+            self.assertTrue(profile["stages"], name)
+
+    def test_summarize(self):
+        summary = load_test.summarize([(1.0, 0.010, True), (1.5, 0.030, False)], duration=2)
+        self.assertEqual(summary["requests"], 2)
+        self.assertEqual(summary["throughput"], 0.5)
+        self.assertEqual(summary["errorRate"], 0.5)
+        self.assertEqual(summary["latencyMax"], 30)
+        self.assertEqual(load_test.summarize([], duration=2), {"requests": 0})
+
+    def test_python_profile_against_the_app(self):
+        from src.app import app
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            texts = load_test.build_corpus(5, seed=1)
+            profile = {"executor": "ramping-vus", "stages": [(0.3, 0, 2)], "options": {}}
+            result = load_test.run_python_profile(server.server_port, texts, "regex", profile)
+        finally:
+            server.shutdown()
+        self.assertGreater(result["total"]["requests"], 0)
+        self.assertEqual(result["total"]["errorRate"], 0)
+        self.assertEqual(result["stages"][0]["vus"], "0->2")
+
+
+if __name__ == '__main__':
+    unittest.main()
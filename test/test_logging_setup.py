@@ -1,21 +1,19 @@
+import io
+import json
 import logging
 import os
 import unittest
+from queue import Queue
 from unittest.mock import patch, MagicMock
 
-from src.logging_setup import ECSContextFilter, NonNullJsonFormatter, on_starting
+from src import logging_setup
+from src.logging_setup import DroppingQueueHandler, ECSContextFilter, NonNullJsonFormatter, on_starting
 
 
 class TestECSContextFilter(unittest.TestCase):
-    @patch('src.logging_setup.ConfigParser')
-    @patch.dict(os.environ, {"ENV": "test-environment"})
-    def test_filter_sets_ecs_fields(self, mock_config_parser):
-        # mock setup.cfg
-        mock_config = MagicMock()
-        mock_config.get.side_effect = lambda section, key: f"{key}-value"
-        mock_config_parser.return_value = mock_config
-
-        filter_instance = ECSContextFilter()
+    def test_filter_sets_ecs_fields(self):
+        filter_instance = ECSContextFilter(
+            {"name": "name-value", "version": "version-value", "environment": "test-environment"})
         mock_record = logging.LogRecord(
             name="test", level=logging.INFO, pathname="", lineno=0,
             msg="test message", args=(), exc_info=None
@@ -28,6 +26,15 @@ class TestECSContextFilter(unittest.TestCase):
         self.assertEqual(mock_record.__dict__["service.version"], "version-value")
         self.assertEqual(mock_record.__dict__["service.environment"], "test-environment")
 
+    @patch('src.logging_setup.SERVICE_INFO', None)
+    def test_filter_without_service_info(self):
+        mock_record = logging.LogRecord(
+            name="test", level=logging.INFO, pathname="", lineno=0,
+            msg="test message", args=(), exc_info=None
+        )
+        self.assertTrue(ECSContextFilter().filter(mock_record))
+        self.assertNotIn("service.name", mock_record.__dict__)
+
 
 class TestNonNullJsonFormatter(unittest.TestCase):
     def test_formatter_removes_none_and_adds_timestamp(self):
@@ -46,6 +53,61 @@ class TestNonNullJsonFormatter(unittest.TestCase):
         self.assertIsInstance(formatted["@timestamp"], str)
 
 
+    def test_timestamp_is_the_record_creation_time(self):
+        formatter = NonNullJsonFormatter('%(levelname)s %(message)s')
+        record = logging.LogRecord(name="test", level=logging.INFO, pathname="", lineno=0,
+                                   msg="test message", args=(), exc_info=None)
+        record.created = 1752312600.1234
+        formatted = json.loads(formatter.format(record))
+
+        self.assertEqual(list(formatted)[0], "@timestamp")
+        self.assertEqual(formatted["@timestamp"], "2025-07-12T09:30:00.123Z")
+        record.created = 1752312600.9
+        self.assertEqual(json.loads(formatter.format(record))["@timestamp"], "2025-07-12T09:30:00.900Z")
+
+
+class TestDroppingQueueHandler(unittest.TestCase):
+    def test_renders_the_message_and_drops_when_full(self):
+        handler = DroppingQueueHandler(Queue(1))
+        logger = logging.getLogger("test.dropping_queue_handler")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            logger.info("First %s", "record", extra={"method": "anonymize"})
+            logger.info("Second record")
+        finally:
+            logger.removeHandler(handler)
+
+        record = handler.queue.get_nowait()
+        self.assertEqual(record.msg, "First record")
+        self.assertIsNone(record.args)
+        self.assertEqual(record.method, "anonymize")
+        self.assertEqual(handler.dropped, 1)
+
+    def test_dropped_records_are_reported(self):
+        handler = DroppingQueueHandler(Queue(2))
+        logger = logging.getLogger("test.dropping_queue_handler_report")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            for index in range(4):
+                logger.info("Record %d", index)
+            handler.queue.get_nowait()
+            handler.queue.get_nowait()
+            logger.info("Record 4")
+        finally:
+            logger.removeHandler(handler)
+
+        report = handler.queue.get_nowait()
+        self.assertEqual(report.levelno, logging.WARNING)
+        self.assertEqual(report.getMessage(), "2 log records dropped, the log queue was full")
+        self.assertEqual(report.droppedRecords, 2)
+        self.assertEqual(report.droppedRecordsTotal, 2)
+        self.assertEqual(handler.queue.get_nowait().msg, "Record 4")
+
+
 class TestLoggingSetup(unittest.TestCase):
     def test_on_starting_applies_configuration(self):
         os.environ["APP_LOGGING_LEVEL"] = "INFO"
@@ -54,6 +116,26 @@ class TestLoggingSetup(unittest.TestCase):
         root_logger = logging.getLogger()
         assert root_logger.getEffectiveLevel() == logging.INFO
 
+    def test_lean_logging_writes_from_a_listener_thread(self):
+        stream = io.StringIO()
+        root_logger = logging.getLogger()
+        try:
+            with patch.object(logging_setup, "LEAN_LOGGING", True):
+                on_starting(server=None)
+            self.assertIsInstance(root_logger.handlers[0], DroppingQueueHandler)
+            logging_setup._queue_logging["console"].setStream(stream)
+            # A forked worker writes through a new queue and thread
+            logging_setup.restart_log_listener()
+            logging.getLogger("test.lean").info("Queued record")
+        finally:
+            logging_setup.stop_log_listener()
+            on_starting(server=None)
+
+        record = json.loads(stream.getvalue().splitlines()[-1])
+        self.assertEqual(record["message"], "Queued record")
+        self.assertEqual(record["log.logger"], "test.lean")
+        self.assertIn("@timestamp", record)
+
 
 if __name__ == '__main__':
     unittest.main()
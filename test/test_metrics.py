@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+
+from presidio_analyzer import RecognizerResult
+from prometheus_client import REGISTRY
+
+from src import metrics
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    def test_record_entities_counts_by_type(self):
+        before = sample("anonymizer_entities_detected_total", {"entity_type": "IBAN_CODE"})
+        metrics.record_entities([
+            RecognizerResult("IBAN_CODE", 0, 27, 1.0),
+            RecognizerResult("IBAN_CODE", 30, 57, 1.0),
+            RecognizerResult("PERSON", 60, 70, 0.85),
+        ])
+        self.assertEqual(sample("anonymizer_entities_detected_total", {"entity_type": "IBAN_CODE"}), before + 2)
+
+    def test_request_entity_count(self):
+        metrics.request_started("test_entities")
+        metrics.record_entities([RecognizerResult("IBAN_CODE", 0, 27, 1.0), RecognizerResult("PERSON", 30, 40, 0.85)])
+        metrics.record_entities([RecognizerResult("PERSON", 0, 10, 0.85)])
+        self.assertEqual(metrics.request_entity_count(), 3)
+        metrics.request_finished("test_entities", 200, 0.01)
+        metrics.request_started("test_entities")
+        self.assertEqual(metrics.request_entity_count(), 0)
+        metrics.request_finished("test_entities", 200, 0.01)
+
+    def test_stage_timer_observes_the_stage(self):
+        before = sample("anonymizer_stage_duration_seconds_count", {"stage": "anonymization"})
+        with metrics.stage_timer("anonymization"):
+            pass
+        self.assertEqual(sample("anonymizer_stage_duration_seconds_count", {"stage": "anonymization"}), before + 1)
+
+    def test_request_gauge_and_counter(self):
+        labels = {"method": "test_method"}
+        metrics.request_started("test_method")
+        self.assertEqual(sample("anonymizer_requests_in_progress", labels), 1)
+        metrics.request_finished("test_method", 200, 0.01)
+        self.assertEqual(sample("anonymizer_requests_in_progress", labels), 0)
+        self.assertEqual(sample("anonymizer_requests_total", {**labels, "code": "200"}), 1)
+
+    @patch("src.metrics.read_process_memory")
+    def test_process_memory_is_read_at_most_once_per_interval(self, mock_read_process_memory):
+        mock_read_process_memory.return_value = {"rss": 4096}
+        metrics.update_process_memory(force=True)
+        metrics.update_process_memory()
+        mock_read_process_memory.assert_called_once()
+        self.assertEqual(sample("anonymizer_process_resident_memory_bytes"), 4096)
+
+    def test_render_metrics(self):
+        output, content_type = metrics.render_metrics()
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn(b"anonymizer_stage_duration_seconds_bucket", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from src.nlp_engine import TrimmedSpacyNlpEngine, parse_components
+
+
+class TestParseComponents(unittest.TestCase):
+    def test_parse_components(self):
+        self.assertEqual(parse_components("parser, senter,,"), ["parser", "senter"])
+
+    def test_parse_empty_components(self):
+        self.assertEqual(parse_components(""), [])
+
+
+class TestTrimmedSpacyNlpEngine(unittest.TestCase):
+    @patch("src.nlp_engine.spacy.load")
+    @patch.object(TrimmedSpacyNlpEngine, "_download_spacy_model_if_needed")
+    def test_load_excludes_components(self, mock_download, mock_load):
+        mock_load.return_value = MagicMock(pipe_names=["tok2vec", "ner"])
+        engine = TrimmedSpacyNlpEngine(
+            models=[{"lang_code": "it", "model_name": "it_core_news_sm", "exclude": ["parser"]}]
+        )
+
+        with self.assertLogs("src.nlp_engine", level="INFO") as logs:
+            engine.load()
+
+        mock_download.assert_called_once_with("it_core_news_sm")
+        mock_load.assert_called_once_with("it_core_news_sm", exclude=["parser"])
+        self.assertIs(engine.nlp["it"], mock_load.return_value)
+        record = logs.records[0]
+        self.assertEqual(record.pipeline, ["tok2vec", "ner"])
+        self.assertEqual(record.excludedComponents, ["parser"])
+
+    @patch("src.nlp_engine.spacy.load")
+    @patch.object(TrimmedSpacyNlpEngine, "_download_spacy_model_if_needed")
+    def test_load_without_exclude(self, mock_download, mock_load):
+        engine = TrimmedSpacyNlpEngine(models=[{"lang_code": "it", "model_name": "it_core_news_lg"}])
+        engine.load()
+
+        mock_load.assert_called_once_with("it_core_news_lg", exclude=[])
+
+    def test_load_validates_model(self):
+        engine = TrimmedSpacyNlpEngine(models=[{"lang_code": "it"}])
+        with self.assertRaises(ValueError):
+            engine.load()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import re
+import unittest
+
+from presidio_anonymizer.entities import InvalidParamError
+
+from src.operators import KeepInitials, MaskEmail, MaskKeepEnds, StripChars
+
+
+class TestMaskKeepEnds(unittest.TestCase):
+    def mask(self, text, **params):
+        operator = MaskKeepEnds()
+        operator.validate(params)
+        return operator.operate(text, params)
+
+    def test_keep_prefix(self):
+        self.assertEqual(self.mask("RSSLCU80A01F205I", keep_prefix=8, keep_suffix=0), "RSSLCU80********")
+        self.assertEqual(self.mask("AB", keep_prefix=3, keep_suffix=0), "AB")
+
+    def test_keep_both_ends(self):
+        self.assertEqual(self.mask("IT47J0990650025128761820997", keep_prefix=5, keep_suffix=4),
+                         "IT47J******************0997")
+        self.assertEqual(self.mask("AB123456", keep_prefix=2, keep_suffix=2), "AB****56")
+
+    def test_ignore_spaces(self):
+        self.assertEqual(self.mask("+39 333 123 7890", keep_prefix=0, keep_suffix=4, ignore_spaces=True),
+                         "*********7890")
+
+    def test_only_digits(self):
+        self.assertEqual(self.mask("4111 1111 1111 1111", keep_prefix=0, keep_suffix=4, only_digits=True),
+                         "**** **** **** 1111")
+        self.assertEqual(self.mask("411", keep_prefix=0, keep_suffix=4, only_digits=True), "411")
+
+    def test_empty_text(self):
+        self.assertEqual(self.mask("", keep_prefix=2, keep_suffix=2), "")
+
+    def test_invalid_params(self):
+        with self.assertRaises(InvalidParamError):
+            MaskKeepEnds().validate({"keep_prefix": 2})
+        with self.assertRaises(InvalidParamError):
+            MaskKeepEnds().validate({"keep_prefix": 2, "keep_suffix": 2, "masking_char": "**"})
+
+
+class TestKeepInitials(unittest.TestCase):
+    def test_keeps_first_character_of_every_word(self):
+        self.assertEqual(KeepInitials().operate("Luca  De Rossi", {}), "L***  D* R****")
+        self.assertEqual(KeepInitials().operate("Luca", {"masking_char": "#"}), "L###")
+
+
+class TestMaskEmail(unittest.TestCase):
+    def test_masks_local_part(self):
+        self.assertEqual(MaskEmail().operate("lucarossi@pagopa.it", {}), "l*******i@pagopa.it")
+        self.assertEqual(MaskEmail().operate("", {}), "")
+
+
+class TestStripChars(unittest.TestCase):
+    def test_strips_numbers(self):
+        self.assertEqual(StripChars().operate("Via Roma, 12", {}), "Via Roma")
+
+    def test_custom_pattern(self):
+        self.assertEqual(StripChars().operate("Via Roma 12/B", {"pattern": re.compile(r"[\d/]+")}), "Via Roma B")
+
+    def test_text_pattern(self):
+        self.assertEqual(StripChars().operate("Via Roma 12/B", {"pattern": r"[\d/]+"}), "Via Roma B")
+        StripChars().validate({"pattern": r"[\d/]+"})
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(InvalidParamError):
+            StripChars().validate({"pattern": r"[\d"})
+        with self.assertRaises(InvalidParamError):
+            StripChars().validate({"pattern": 12})
+
+
+if __name__ == "__main__":
+    unittest.main()
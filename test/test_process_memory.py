@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from src.process_memory import read_process_memory
+
+SMAPS_ROLLUP = """5564e668c000-7ffd86761000 ---p 00000000 00:00 0                          [rollup]
+Rss:                1296 kB
+Pss:                 443 kB
+Shared_Clean:       1132 kB
+Shared_Dirty:          0 kB
+Private_Clean:        64 kB
+Private_Dirty:       100 kB
+"""
+
+
+class TestReadProcessMemory(unittest.TestCase):
+    def test_read_smaps_rollup(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as smaps_rollup:
+            smaps_rollup.write(SMAPS_ROLLUP)
+        try:
+            memory = read_process_memory(smaps_rollup.name)
+        finally:
+            os.remove(smaps_rollup.name)
+
+        self.assertEqual(memory["rss"], 1296 * 1024)
+        self.assertEqual(memory["pss"], 443 * 1024)
+        self.assertEqual(memory["shared"], 1132 * 1024)
+        self.assertEqual(memory["private"], 164 * 1024)
+
+    def test_fallback_without_smaps_rollup(self):
+        memory = read_process_memory("/nonexistent/smaps_rollup")
+        self.assertIn("maxRss", memory)
+        self.assertGreater(memory["maxRss"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
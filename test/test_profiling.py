@@ -0,0 +1,80 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from src.profiling import RecognizerProfiler
+
+
+class FakeRecognizer:
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+
+    def analyze(self, text, entities, nlp_artifacts=None):
+        return self.results
+
+
+class FakeNlpEngine:
+    def process_text(self, text, language):
+        return SimpleNamespace(entities=["PERSON"])
+
+    def process_batch(self, texts, language, batch_size=1):
+        for text in texts:
+            yield text, SimpleNamespace(entities=[])
+
+
+class TestRecognizerProfiler(unittest.TestCase):
+    def setUp(self):
+        self.recognizer = FakeRecognizer("FakeRecognizer", ["result", "result"])
+        self.nlp_engine = FakeNlpEngine()
+
+    def profile(self, profiler):
+        profiler.instrument_recognizers([self.recognizer])
+        profiler.instrument_nlp_engine(self.nlp_engine)
+        self.recognizer.analyze(text="testo", entities=["PERSON"])
+        self.nlp_engine.process_text("testo", "it")
+        return list(self.nlp_engine.process_batch(["primo", "secondo"], "it"))
+
+    def test_enabled_profiles_every_call(self):
+        profiler = RecognizerProfiler(enabled=True)
+        processed = self.profile(profiler)
+        self.assertEqual([text for text, _ in processed], ["primo", "secondo"])
+
+        stats = {component["name"]: component for component in profiler.stats()}
+        self.assertEqual(stats["FakeRecognizer"]["calls"], 1)
+        self.assertEqual(stats["FakeRecognizer"]["results"], 2)
+        self.assertEqual(stats["spacy"]["calls"], 3)
+        self.assertEqual(stats["spacy"]["results"], 1)
+        self.assertEqual(set(stats["spacy"]), {"name", "calls", "totalTime", "meanTime", "results"})
+
+    def test_disabled_profiles_nothing(self):
+        profiler = RecognizerProfiler()
+        self.assertEqual(len(self.profile(profiler)), 2)
+        self.assertEqual(profiler.stats(), [])
+
+    def test_request_profiling_only_applies_to_its_thread(self):
+        profiler = RecognizerProfiler()
+        profiler.instrument_recognizers([self.recognizer])
+        profiler.set_request_profiling(True)
+        other_thread = threading.Thread(target=lambda: self.recognizer.analyze(text="testo", entities=[]))
+        other_thread.start()
+        other_thread.join()
+        self.recognizer.analyze(text="testo", entities=[])
+        self.assertEqual(profiler.stats()[0]["calls"], 1)
+
+    def test_shared_recognizer_is_instrumented_once(self):
+        profiler = RecognizerProfiler(enabled=True)
+        profiler.instrument_recognizers([self.recognizer])
+        profiler.instrument_recognizers([self.recognizer])
+        self.recognizer.analyze(text="testo", entities=["PERSON"])
+        self.assertEqual(profiler.stats()[0]["calls"], 1)
+
+    def test_reset(self):
+        profiler = RecognizerProfiler(enabled=True)
+        self.profile(profiler)
+        profiler.reset()
+        self.assertEqual(profiler.stats(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+from presidio_analyzer import Pattern, PatternRecognizer
+
+from src.recognizers import CandidatePrefilter, PrefilteredPatternRecognizer, LinearPatternRecognizer, ends_with_any, \
+    has_backtracking_quantifier, starts_with_any, short_with_digit
+
+
+class TestTokenChecks(unittest.TestCase):
+    def test_ends_with_any(self):
+        check = ends_with_any(["Via", "Rio Terà"])
+        self.assertTrue(check("via"))
+        self.assertTrue(check("ovvia"))
+        self.assertTrue(check("rio"))
+        self.assertFalse(check("viale"))
+
+    def test_starts_with_any(self):
+        check = starts_with_any(["oculistica", "delle urine", "maxillo-facciale"])
+        self.assertTrue(check("oculistica"))
+        self.assertTrue(check("oculisticamente"))
+        self.assertTrue(check("delle"))
+        self.assertTrue(check("maxillo"))
+        self.assertFalse(check("urine"))
+
+    def test_short_with_digit(self):
+        check = short_with_digit(7)
+        self.assertTrue(check("ab123cd"))
+        self.assertTrue(check("12"))
+        self.assertFalse(check("abcdefg"))
+        self.assertFalse(check("ab123cde"))
+
+
+class TestPrefilteredPatternRecognizer(unittest.TestCase):
+    def setUp(self):
+        self.prefilter = CandidatePrefilter()
+        self.address_recognizer = PrefilteredPatternRecognizer(
+            prefilter=self.prefilter,
+            candidate_check=ends_with_any(["Via"]),
+            supported_entity="ADDRESS",
+            name="AddressRecognizer",
+            patterns=[Pattern(name="address", regex=r"(Via) +\w+", score=0.9)],
+        )
+        self.number_recognizer = PrefilteredPatternRecognizer(
+            prefilter=self.prefilter,
+            candidate_check=short_with_digit(3),
+            supported_entity="NUMBER",
+            name="NumberRecognizer",
+            patterns=[Pattern(name="number", regex=r"\b\d{1,3}\b", score=0.9)],
+        )
+
+    def test_candidates(self):
+        self.assertEqual(self.prefilter.candidates("abito in via Roma"), {"AddressRecognizer"})
+        self.assertEqual(self.prefilter.candidates("abito in VIA Roma 12"), {"AddressRecognizer", "NumberRecognizer"})
+        self.assertEqual(self.prefilter.candidates("nessun indirizzo"), set())
+
+    def test_analyze_skips_patterns_without_candidates(self):
+        self.assertEqual(self.address_recognizer.analyze("nessun indirizzo", ["ADDRESS"]), [])
+
+    def test_analyze_matches_plain_pattern_recognizer(self):
+        plain_recognizer = PatternRecognizer(
+            supported_entity="ADDRESS",
+            patterns=[Pattern(name="address", regex=r"(Via) +\w+", score=0.9)],
+        )
+        for text in ["abito in via Roma", "un'ovvia scelta", "nessun indirizzo", "Via  Roma e via Milano"]:
+            expected = [(r.start, r.end) for r in plain_recognizer.analyze(text, ["ADDRESS"])]
+            actual = [(r.start, r.end) for r in self.address_recognizer.analyze(text, ["ADDRESS"])]
+            self.assertEqual(actual, expected, msg=f"Failed for text: {text}")
+
+
+class TestLinearPatternRecognizer(unittest.TestCase):
+    def test_analyze_matches_plain_pattern_recognizer(self):
+        linear_recognizer = LinearPatternRecognizer(
+            prefilter=CandidatePrefilter(),
+            candidate_check=ends_with_any(["Via"]),
+            supported_entity="ADDRESS",
+            name="AddressRecognizer",
+            patterns=[Pattern(name="address", regex=r"(Via) ++\w*+", score=0.9)],
+        )
+        plain_recognizer = PatternRecognizer(
+            supported_entity="ADDRESS",
+            patterns=[Pattern(name="address", regex=r"(Via) +\w*", score=0.9)],
+        )
+        text = "Via Roma, via Milano e via  Torino"
+        expected = [(r.start, r.end, r.score) for r in plain_recognizer.analyze(text, ["ADDRESS"])]
+        actual = [(r.start, r.end, r.score) for r in linear_recognizer.analyze(text, ["ADDRESS"])]
+        self.assertEqual(sorted(actual), sorted(expected))
+
+    def test_single_pattern_required(self):
+        with self.assertRaises(ValueError):
+            LinearPatternRecognizer(
+                prefilter=CandidatePrefilter(),
+                candidate_check=short_with_digit(3),
+                supported_entity="NUMBER",
+                patterns=[Pattern(name="one", regex=r"\d", score=0.5), Pattern(name="two", regex=r"\d\d", score=0.5)],
+            )
+
+
+class TestHasBacktrackingQuantifier(unittest.TestCase):
+    def test_linear_patterns(self):
+        for regex in (r"\b(TK|TCK)-\d{6}\b", r"(via|piazza) ++[A-Za-z\s]*+,?+\d*+", r"(?>\w+)@x", r"a{2,}+", r"\d?",
+                      r"(?:ab)++c", r"(?>[a-z]+-\d*)x"):
+            self.assertFalse(has_backtracking_quantifier(regex), regex)
+
+    def test_backtracking_patterns(self):
+        for regex in (r"(a+)+b", r"\w*@", r"x.*?y", r"a{2,}", r"(?=\d+)", r"(x|(\d+)-)", r"(?:a+){1,3}"):
+            self.assertTrue(has_backtracking_quantifier(regex), regex)
+
+    def test_backtracking_inside_atomic_groups(self):
+        for regex in (r"(?>(a+)+b)", r"(?>(a|aa)+)c", r"(?:(?:a|a)+)++b", r"(?>x(?:ab)*)"):
+            self.assertTrue(has_backtracking_quantifier(regex), regex)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+
+from src.service_info import load_service_info, SERVICE_INFO
+
+APP_NAME = "testapp"
+APP_VERSION = "testversion"
+ENVIRONMENT = "test"
+
+
+class TestServiceInfo(unittest.TestCase):
+    @patch("src.service_info.ConfigParser")
+    @patch.dict(os.environ, {"ENV": ENVIRONMENT})
+    def test_load_service_info(self, mock_config_parser):
+        mock_config = MagicMock()
+        mock_config.get.side_effect = lambda section, key: {"name": APP_NAME, "version": APP_VERSION}[key]
+        mock_config_parser.return_value = mock_config
+
+        self.assertEqual(load_service_info(),
+                         {"name": APP_NAME, "version": APP_VERSION, "environment": ENVIRONMENT})
+
+    @patch("src.service_info.ConfigParser")
+    def test_missing_metadata_section(self, mock_config_parser):
+        mock_config = MagicMock()
+
+        def raise_no_section(section, key):
+            raise Exception("No section: 'metadata'")
+
+        mock_config.get.side_effect = raise_no_section
+        mock_config_parser.return_value = mock_config
+        self.assertIsNone(load_service_info())
+
+    @patch("src.service_info.ConfigParser")
+    def test_missing_version_key(self, mock_config_parser):
+        mock_config = MagicMock()
+
+        def raise_no_option(section, key):
+            if key == "version":
+                raise Exception("No option 'version' in section: 'metadata'")
+            return APP_NAME
+
+        mock_config.get.side_effect = raise_no_option
+        mock_config_parser.return_value = mock_config
+        self.assertIsNone(load_service_info())
+
+    @patch("src.service_info.ConfigParser")
+    def test_config_read_raises(self, mock_config_parser):
+        mock_config = MagicMock()
+        mock_config.read.side_effect = Exception("Read failed")
+        mock_config_parser.return_value = mock_config
+        self.assertIsNone(load_service_info())
+
+    def test_service_info_read_at_startup(self):
+        self.assertEqual(set(SERVICE_INFO), {"name", "version", "environment"})
+
+
+if __name__ == '__main__':
+    unittest.main()
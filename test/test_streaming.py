@@ -0,0 +1,115 @@
+import io
+import random
+import unittest
+
+from src.anonymizer_logic import anonymize_text_with_presidio, AnonymizationMode
+from src.streaming import StreamAnonymizer, StreamFormatError, anonymize_stream, find_chunk_end, \
+    read_ndjson_texts, read_text_blocks, chunks_to_ndjson
+
+DOCUMENT = ("Gentile utente, il codice fiscale RSSLCU80A01F205I risulta associato all'avviso. "
+            "Il pagamento con iban IT47J0990650025128761820997 è stato registrato. "
+            "Per informazioni scrivere a lucarossi@pagopa.it oppure recarsi in Via Roma, 12. ") * 20
+
+
+class TestFindChunkEnd(unittest.TestCase):
+    def test_short_text_is_a_single_chunk(self):
+        self.assertEqual(find_chunk_end("breve testo", 100), 11)
+
+    def test_prefers_sentence_end(self):
+        text = "Prima frase breve. Seconda frase lunga senza punto finale"
+        self.assertEqual(find_chunk_end(text, 30), len("Prima frase breve. "))
+
+    def test_falls_back_to_whitespace(self):
+        text = "parola " * 10
+        self.assertEqual(find_chunk_end(text, 30), 28)
+
+    def test_hard_cut_without_boundaries(self):
+        self.assertEqual(find_chunk_end("x" * 100, 30), 30)
+
+    def test_chunk_starting_inside_the_text(self):
+        text = "parola " * 10
+        self.assertEqual(find_chunk_end(text, 30, start=7), 35)
+        self.assertEqual(find_chunk_end(text, 100, start=7), len(text))
+
+
+class TestStreamAnonymizer(unittest.TestCase):
+    def test_stream_matches_whole_text_anonymization(self):
+        expected = anonymize_text_with_presidio(DOCUMENT, AnonymizationMode.REGEX)
+        pieces = [DOCUMENT[index:index + 37] for index in range(0, len(DOCUMENT), 37)]
+        for chunk_size in (50, 120, 1000):
+            chunks = list(anonymize_stream(pieces, AnonymizationMode.REGEX, chunk_size=chunk_size, overlap=40))
+            self.assertEqual("".join(chunks), expected, msg=f"chunk_size={chunk_size}")
+            if chunk_size < len(DOCUMENT):
+                self.assertGreater(len(chunks), 1)
+
+    def test_entity_across_chunk_edge_is_anonymized(self):
+        text = "a" * 25 + " RSSLCU80A01F205I " + "b" * 25
+        chunks = list(anonymize_stream([text], AnonymizationMode.REGEX, chunk_size=30, overlap=20))
+        self.assertEqual("".join(chunks), "a" * 25 + " RSSLCU80******** " + "b" * 25)
+
+    def test_chunks_are_emitted_before_the_end_of_the_input(self):
+        stream_anonymizer = StreamAnonymizer(AnonymizationMode.REGEX, chunk_size=100, overlap=20)
+        emitted = list(stream_anonymizer.feed(DOCUMENT[:500]))
+        self.assertGreater(len(emitted), 0)
+        self.assertLessEqual(len(stream_anonymizer._buffer) - stream_anonymizer._position, 120)
+
+    def test_stream_never_leaks_what_whole_text_anonymization_masks(self):
+        # Multi-token entities and entities next to each other, cut by chunks, look-aheads and contexts of any size
+        secrets = ["IT47J0990650025128761820997", "IT60X0542811101000000123456", "IT47 J099 0650 0251 2876 1820 997",
+                   "RSSLCU80A01F205I", "lucarossi@pagopa.it", "AB123CD"]
+        words = secrets + ["Mario Rossi", "Via Roma 12", "333 123 4567", "4111 1111 1111 1111", "pagamento",
+                           "avviso", "il", "di", "codice", "iban", "."]
+        generator = random.Random(7)
+        for _ in range(80):
+            text = "".join(generator.choice(words) + generator.choice([" ", " ", "\n", ", "])
+                           for _ in range(generator.randint(5, 80)))
+            chunk_size, overlap, piece_size = generator.randint(30, 200), generator.randint(35, 80), \
+                generator.randint(1, 200)
+            pieces = [text[index:index + piece_size] for index in range(0, len(text), piece_size)]
+            expected = anonymize_text_with_presidio(text, AnonymizationMode.REGEX)
+            streamed = "".join(anonymize_stream(pieces, AnonymizationMode.REGEX, chunk_size=chunk_size,
+                                                overlap=overlap))
+            for secret in secrets:
+                self.assertLessEqual(streamed.count(secret), expected.count(secret),
+                                     msg=f"{secret} in {streamed!r}, chunk_size={chunk_size}, overlap={overlap}")
+
+    def test_entity_starting_in_the_context_is_anonymized(self):
+        text = "codice " + "a" * 40 + " RSSLCU80A01F205I fine"
+        stream_anonymizer = StreamAnonymizer(AnonymizationMode.REGEX, chunk_size=50, overlap=30)
+        # The previous chunk missed the fiscal code crossing its edge
+        stream_anonymizer._context = text[:56]
+        stream_anonymizer._buffer = text[56:]
+        self.assertEqual("".join(stream_anonymizer.close()), "******** fine")
+
+    def test_empty_stream(self):
+        self.assertEqual(list(anonymize_stream([], AnonymizationMode.REGEX)), [])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            StreamAnonymizer(AnonymizationMode.REGEX, chunk_size=0, overlap=10)
+
+
+class TestStreamReaders(unittest.TestCase):
+    def test_read_ndjson_texts(self):
+        lines = [b'{"text": "prima"}\n', b'\n', b'{"text": "seconda"}\n']
+        self.assertEqual(list(read_ndjson_texts(lines)), ["prima", "seconda"])
+
+    def test_read_ndjson_texts_invalid_json(self):
+        with self.assertRaises(StreamFormatError):
+            list(read_ndjson_texts([b'{"text": "prima"}\n', b'nope\n']))
+
+    def test_read_ndjson_texts_missing_text(self):
+        with self.assertRaisesRegex(StreamFormatError, "line 1"):
+            list(read_ndjson_texts([b'{"other": "prima"}\n']))
+
+    def test_read_text_blocks_keeps_multibyte_characters(self):
+        text = "città è già " * 10
+        blocks = list(read_text_blocks(io.BytesIO(text.encode("utf-8")), block_size=5))
+        self.assertEqual("".join(blocks), text)
+
+    def test_chunks_to_ndjson(self):
+        self.assertEqual(list(chunks_to_ndjson(["città"])), ['{"text": "città"}\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
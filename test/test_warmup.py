@@ -0,0 +1,89 @@
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from src import anonymizer_logic, warmup
+from src.warmup import LazyApp
+
+
+def call(wsgi_app, path: str):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = dict(headers)
+
+    body = b"".join(wsgi_app({"PATH_INFO": path, "REQUEST_METHOD": "GET"}, start_response))
+    return response["status"], response["headers"], json.loads(body)
+
+
+def loaded_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [json.dumps({"path": environ["PATH_INFO"]}).encode()]
+
+
+class TestLazyApp(unittest.TestCase):
+    def test_answers_the_probes_while_loading_then_serves_the_app(self):
+        loading = threading.Event()
+        warm_up_calls = []
+
+        def load():
+            loading.wait(10)
+            return loaded_app
+
+        lazy_app = LazyApp(load=load, warm_up=lambda: warm_up_calls.append(1)).start()
+
+        status, _, body = call(lazy_app, "/info")
+        self.assertEqual(status, 200)
+        self.assertIn("version", body)
+        status, _, body = call(lazy_app, "/ready")
+        self.assertEqual((status, body), (503, {"status": "loading"}))
+        status, headers, body = call(lazy_app, "/anonymize")
+        self.assertEqual(status, 503)
+        self.assertIn("Retry-After", headers)
+
+        loading.set()
+        self.assertTrue(lazy_app.wait_until_ready(10))
+        self.assertEqual(warm_up_calls, [1])
+        self.assertEqual(call(lazy_app, "/anonymize")[2], {"path": "/anonymize"})
+        self.assertEqual(call(lazy_app, "/ready")[2], {"path": "/ready"})
+
+    def test_load_failure_fails_liveness(self):
+        def load():
+            raise ImportError("Model not found")
+
+        lazy_app = LazyApp(load=load).start(background=False)
+
+        self.assertEqual(lazy_app.status, warmup.FAILED)
+        self.assertEqual(call(lazy_app, "/info")[0], 500)
+        status, _, body = call(lazy_app, "/ready")
+        self.assertEqual((status, body), (503, {"status": "failed"}))
+
+    def test_warm_up_failure_is_only_logged(self):
+        def warm_up():
+            raise ValueError("Invalid text")
+
+        lazy_app = LazyApp(load=lambda: loaded_app, warm_up=warm_up).start(background=False)
+
+        self.assertEqual(lazy_app.status, warmup.READY)
+        self.assertEqual(call(lazy_app, "/ready")[0], 200)
+
+    @patch("src.warmup.PRELOAD_APP", True)
+    def test_preload_mode_loads_and_warms_up_synchronously(self):
+        with patch("src.warmup._warm_up") as mock_warm_up:
+            lazy_app = warmup.create_app()
+
+        self.assertEqual(lazy_app.status, warmup.READY)
+        mock_warm_up.assert_called_once()
+
+    def test_warm_up_runs_the_corpus(self):
+        with patch("src.anonymizer_logic.analyze_text", wraps=anonymizer_logic.analyze_text) as mock_analyze_text:
+            warmup._warm_up()
+        # Every text in regex mode, then through the single-text path in full mode, then in regex mode for
+        # every named profile
+        named_profiles = len(anonymizer_logic.current_policy().profiles) - 1
+        self.assertEqual(mock_analyze_text.call_count, (2 + named_profiles) * len(warmup.WARMUP_TEXTS))
+
+if __name__ == "__main__":
+    unittest.main()